@@ -0,0 +1,69 @@
+"""
+Compare training on every dataset row with training on collapsed unique rows
+Reports the compression ratio and fit time, and checks that the collapsed
+model's predicted distributions differ from the full model's no more than a
+second full model trained with another seed (on the same split) does
+"""
+
+import sys
+import os
+import tempfile
+import time
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from feature_builder import build_features, collapse_duplicates
+from train_rf_model import train_random_forest
+from train_xgb_model import train_xgb_model
+
+# Collapsed-vs-full distance allowed, as a multiple of the seed-to-seed distance
+TOLERANCE = 1.25
+
+
+def random_rows(n_features, n_rows=500, seed=42):
+    """Random 1-6 symptom rows"""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    for row in X:
+        row[rng.choice(n_features, rng.integers(1, 7), replace=False)] = 1
+    return X
+
+
+def mean_tv(a, b, X):
+    """Mean total-variation distance between two models' distributions"""
+    return 0.5 * np.abs(a.predict_proba(X) - b.predict_proba(X)).sum(axis=1).mean()
+
+
+if __name__ == "__main__":
+    X, y, symptom_names, _ = build_features()
+    dataset_rows, _, _ = collapse_duplicates(X, y)
+    inputs = {"dataset": dataset_rows, "random": random_rows(len(symptom_names))}
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, train in [("rf", train_random_forest), ("xgb", train_xgb_model)]:
+            models, times = {}, {}
+            for run, collapse, seed in [("full", False, 42), ("reseeded", False, 43),
+                                        ("collapsed", True, 42)]:
+                start = time.perf_counter()
+                models[run] = train(save_path=os.path.join(tmp, f"{name}_{run}"),
+                                    collapse=collapse, model_seed=seed)[0]
+                times[run] = time.perf_counter() - start
+
+            for label, rows in inputs.items():
+                results.append((name, label, times["full"], times["collapsed"],
+                                mean_tv(models["full"], models["collapsed"], rows),
+                                mean_tv(models["full"], models["reseeded"], rows)))
+
+    print(f"\n{'model':<6}{'rows':<9}{'full s':>8}{'collapsed s':>13}"
+          f"{'TV collapsed':>14}{'TV reseeded':>13}")
+    ok = True
+    for name, label, t_full, t_collapsed, tv_collapsed, tv_seed in results:
+        print(f"{name:<6}{label:<9}{t_full:>8.2f}{t_collapsed:>13.2f}"
+              f"{tv_collapsed:>14.4f}{tv_seed:>13.4f}")
+        ok &= tv_collapsed <= TOLERANCE * tv_seed + 1e-3
+    print(f"\nCollapsed distributions {'match' if ok else 'DIFFER FROM'} the full "
+          f"models (within {TOLERANCE}x the seed-to-seed distance)")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,84 @@
+"""
+Benchmark the static-embedding normalizer backend against the full model
+Build the table first: python src/static_embedder.py
+"""
+
+import random
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from symptom_normalizer import SymptomNormalizer
+
+
+def perturb(phrase, rng):
+    """Return a lightly corrupted variant of a symptom phrase"""
+    words = phrase.split()
+    kind = rng.choice(["typo", "swap", "reorder", "filler", "ache"])
+
+    if kind == "typo" and len(phrase) > 4:
+        i = rng.randrange(len(phrase) - 1)
+        return phrase[:i] + phrase[i + 1] + phrase[i] + phrase[i + 2:]
+    if kind == "swap" and len(phrase) > 4:
+        i = rng.randrange(len(phrase))
+        return phrase[:i] + rng.choice("aeiou") + phrase[i + 1:]
+    if kind == "reorder" and len(words) > 1:
+        rng.shuffle(words)
+        return " ".join(words)
+    if kind == "ache" and "pain" in words:
+        return phrase.replace("pain", "ache")
+    return rng.choice(["i have ", "feeling ", "some "]) + phrase + rng.choice(["", " lately", " since yesterday"])
+
+
+def compare(reference, candidate, phrases, threshold=0.45):
+    """Agreement of the semantic path (lexical tiers bypassed) on phrases"""
+    start = time.perf_counter()
+    ref = reference._best_embedding_matches(phrases)
+    ref_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cand = candidate._best_embedding_matches(phrases)
+    cand_time = time.perf_counter() - start
+
+    def label(match):
+        return match[0] if match[1] >= threshold else None
+
+    agree = sum(label(r) == label(c) for r, c in zip(ref, cand))
+    return {
+        "agreement": agree / len(phrases),
+        "ref_ms_per_phrase": 1000 * ref_time / len(phrases),
+        "static_ms_per_phrase": 1000 * cand_time / len(phrases),
+    }
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+
+    full = SymptomNormalizer()
+    static_only = SymptomNormalizer(embedding_backend="static", fallback_margin=None)
+    static_fallback = SymptomNormalizer(embedding_backend="static", fallback_margin=0.05)
+
+    dataset_phrases = sorted({full.clean_symptom(s) for s in full.symptom_map})
+    dataset_phrases = [" ".join(p.split()) for p in dataset_phrases]
+    perturbed = [perturb(p, rng) for p in dataset_phrases for _ in range(5)]
+
+    # Warm up model and static table so load time is not measured
+    full._best_embedding_matches(dataset_phrases[:4])
+    static_fallback._best_embedding_matches(dataset_phrases[:4])
+    static_fallback.model
+
+    print(f"{'set':<12}{'backend':<18}{'agree':>8}{'full ms':>10}{'static ms':>11}")
+    for set_name, phrases in [("dataset", dataset_phrases), ("perturbed", perturbed)]:
+        for backend_name, backend in [("static", static_only),
+                                      ("static+fallback", static_fallback)]:
+            r = compare(full, backend, phrases)
+            print(f"{set_name:<12}{backend_name:<18}{r['agreement']:>8.1%}"
+                  f"{r['ref_ms_per_phrase']:>10.3f}{r['static_ms_per_phrase']:>11.3f}")
+
+    margins = [m for _, _, m in static_fallback.static_matcher.match(perturbed)]
+    fallback_rate = sum(m < static_fallback.fallback_margin for m in margins) / len(margins)
+    print(f"\nFallback rate on perturbed phrases (margin < "
+          f"{static_fallback.fallback_margin}): {fallback_rate:.1%}")
@@ -0,0 +1,51 @@
+"""
+Benchmark the compiled tree engine against the library predict_proba
+Compares single-row latency and checks the probabilities agree
+"""
+
+import random
+import sys
+import os
+import time
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from rf_predictor import RFPredictor
+from xgb_predictor import XGBPredictor
+
+
+def time_per_call(fn, inputs, repeats=3):
+    """Best-of-repeats mean latency of fn over inputs, in ms"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for x in inputs:
+            fn(x)
+        best = min(best, (time.perf_counter() - start) / len(inputs))
+    return 1000 * best
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+
+    print(f"{'model':<8}{'library ms':>12}{'compiled ms':>13}{'speedup':>9}{'max |diff|':>12}")
+    for name, cls, path in [("rf", RFPredictor, "models/rf_model"),
+                            ("xgb", XGBPredictor, "models/xgb_model")]:
+        library = cls(path, use_compiled=False)
+        compiled = cls(path, use_compiled=True)
+
+        rows = []
+        for _ in range(200):
+            symptoms = rng.sample(library.symptom_names, rng.randint(1, 6))
+            x = np.zeros((1, len(library.symptom_names)))
+            x[0, [library.symptom_to_idx[s] for s in symptoms]] = 1
+            rows.append(x)
+
+        lib_ms = time_per_call(library.model.predict_proba, rows)
+        comp_ms = time_per_call(compiled.compiled.predict_proba, rows)
+
+        X = np.vstack(rows)
+        diff = np.abs(library.model.predict_proba(X) - compiled.compiled.predict_proba(X)).max()
+        print(f"{name:<8}{lib_ms:>12.3f}{comp_ms:>13.3f}{lib_ms / comp_ms:>8.1f}x{diff:>12.2e}")
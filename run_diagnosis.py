@@ -20,7 +20,7 @@ if __name__ == "__main__":
     print(f"\nDiagnosing symptoms: {', '.join(symptoms)}\n")
     
     # Check if model exists
-    if not os.path.exists("models/rf_model.pkl"):
+    if not (os.path.exists("models/rf_model") or os.path.exists("models/rf_model.pkl")):
         print("❌ Error: Random Forest model not found!")
         print("Please run 'python run_training.py' first to train the model.")
         sys.exit(1)
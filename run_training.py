@@ -3,6 +3,7 @@ Quick script to train the Random Forest model
 Run this before using the diagnostic system
 """
 
+import argparse
 import sys
 import os
 
@@ -10,13 +11,25 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from train_rf_model import train_random_forest
+from incremental_training import train_incremental
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the Random Forest prior")
+    parser.add_argument("--collapse", action="store_true",
+                        help="fit unique rows weighted by their number of copies")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fit rows appended to the dataset since the last training "
+                             "(falls back to a full rebuild when needed)")
+    args = parser.parse_args()
+
     print("Training Random Forest Model...")
     print("This may take a few minutes...\n")
     
     try:
-        train_random_forest()
+        if args.incremental:
+            train_incremental("models/rf_model", kind="rf", collapse=args.collapse)
+        else:
+            train_random_forest(collapse=args.collapse)
         print("\n✅ Training completed successfully!")
         print("You can now use the diagnostic system.")
     except Exception as e:
@@ -0,0 +1,262 @@
+"""
+Precomputed answer table for small symptom combinations
+Enumerates every canonical symptom combination up to a size offline, stores
+the prior probabilities and rule-based scores of the diseases each one
+matches, and serves them by binary search over sorted integer keys
+"""
+
+import itertools
+import json
+import os
+import shutil
+import sys
+import numpy as np
+from scipy import sparse
+sys.path.insert(0, os.path.dirname(__file__))
+from embedding_store import file_digest
+from model_artifact import replace_directory
+
+TABLE_VERSION = 2
+DEFAULT_TABLE_DIR = "models/answer_table"
+
+# Symptom index + 1 per byte, so at most 8 symptoms and 255 symptom names
+KEY_BITS = 8
+MAX_COMBINATION_SIZE = 64 // KEY_BITS
+
+# Scores and probabilities are stored as float64, so a lookup returns
+# exactly what live inference computes
+ARRAYS = ("keys", "indptr", "disease", "count", "rule", "prior")
+
+
+def pack_keys(combos):
+    """
+    Pack sorted symptom index combinations into uint64 keys
+
+    Args:
+        combos: (n, r) int array, each row sorted ascending
+
+    Returns:
+        (n,) uint64 keys; combinations of different sizes never collide
+    """
+    combos = np.asarray(combos, dtype=np.uint64)
+    keys = np.zeros(len(combos), dtype=np.uint64)
+    for col in range(combos.shape[1]):
+        keys = (keys << np.uint64(KEY_BITS)) | (combos[:, col] + np.uint64(1))
+    return keys
+
+
+def source_digests(priors, scorer):
+    """
+    Digests of the artifacts (and prior weights) a table is computed from
+
+    Args:
+        priors: EnsemblePredictor.current_priors() snapshot
+        scorer: RuleBasedScorer
+    """
+    return {
+        "priors": {
+            name: {"sha256": file_digest(predictor.artifact_file), "weight": weight}
+            for name, predictor, weight in priors
+        },
+        "dataset": file_digest(scorer.dataset_path),
+        "severity": file_digest(scorer.severity_path),
+    }
+
+
+def build_answer_table(ensemble, out_dir=DEFAULT_TABLE_DIR, max_size=3,
+                       chunk_size=1024):
+    """
+    Enumerate and score every symptom combination up to max_size
+
+    For each combination the table keeps every disease with at least one
+    matched symptom (the only diseases an ensemble prediction with
+    min_matches >= 1 can return), with its match count, rule-based score
+    and weighted prior probability.
+
+    Args:
+        ensemble: EnsemblePredictor whose priors and rule scorer are tabulated
+        out_dir: Output directory (.npy arrays + manifest.json)
+        max_size: Largest combination to enumerate
+        chunk_size: Combinations scored per batch
+
+    Returns:
+        Path to the output directory
+    """
+    scorer = ensemble.rule_scorer
+    profiles = scorer.profiles
+    priors = ensemble.current_priors()
+    vocabulary = profiles.symptom_names
+    if max_size > MAX_COMBINATION_SIZE or len(vocabulary) >= 2 ** KEY_BITS:
+        raise ValueError(f"Keys hold at most {MAX_COMBINATION_SIZE} of "
+                         f"{2 ** KEY_BITS - 1} symptoms")
+
+    # Enumerate in key order so the arrays come out sorted
+    combos, keys = [], []
+    for size in range(1, max_size + 1):
+        block = np.array(list(itertools.combinations(range(len(vocabulary)), size)),
+                         dtype=np.int64).reshape(-1, size)
+        combos.extend(map(tuple, block))
+        keys.append(pack_keys(block))
+    keys = np.concatenate(keys)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    combos = [combos[i] for i in order]
+    print(f"Scoring {len(combos)} symptom combinations (up to {max_size} symptoms)...")
+
+    weights_t = profiles.weight_matrix.T.tocsr()
+    profiles_t = profiles.profile_matrix.T.tocsr()
+
+    counts_per_row = []
+    parts = {name: [] for name in ("disease", "count", "rule", "prior")}
+    for start in range(0, len(combos), chunk_size):
+        chunk = combos[start:start + chunk_size]
+        rows = np.repeat(np.arange(len(chunk)), [len(c) for c in chunk])
+        cols = np.concatenate([np.asarray(c) for c in chunk])
+        X = sparse.csr_matrix((np.ones(len(cols)), (rows, cols)),
+                              shape=(len(chunk), len(vocabulary)))
+
+        # Rule-based scores for every (combination, disease) pair
+        matched_weight = (X @ weights_t).toarray()
+        match_counts = (X @ profiles_t).toarray()
+        rule_scores = profiles._combine(matched_weight, match_counts, slice(None))
+
+        # Weighted prior probabilities in the scorer's disease order
+        symptom_sets = [scorer.normalizer.wrap([vocabulary[i] for i in c]) for c in chunk]
+        prior_probs = ensemble.prior_matrix(symptom_sets, chunk_size, priors, profiles)
+
+        row_idx, disease_idx = np.nonzero(match_counts > 0)
+        counts_per_row.append(np.bincount(row_idx, minlength=len(chunk)))
+        parts["disease"].append(disease_idx.astype(np.uint16))
+        parts["count"].append(match_counts[row_idx, disease_idx].astype(np.uint8))
+        parts["rule"].append(rule_scores[row_idx, disease_idx])
+        parts["prior"].append(prior_probs[row_idx, disease_idx])
+
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    arrays["keys"] = keys
+    arrays["indptr"] = np.concatenate([[0], np.cumsum(np.concatenate(counts_per_row))]).astype(np.int64)
+
+    # Written next to out_dir and swapped in whole, so a reader never maps
+    # arrays that do not belong to the manifest
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), arrays[name])
+
+    manifest = {
+        "version": TABLE_VERSION,
+        "max_size": max_size,
+        "symptom_names": list(vocabulary),
+        "disease_names": list(profiles.disease_names),
+        "sources": source_digests(priors, scorer),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    replace_directory(tmp_dir, out_dir)
+
+    size_mb = sum(arrays[name].nbytes for name in ARRAYS) / 1e6
+    print(f"Answer table saved to: {out_dir} ({len(keys)} keys, "
+          f"{len(arrays['disease'])} entries, {size_mb:.1f} MB)")
+    return out_dir
+
+
+class AnswerTable:
+    """Memory-mapped answer table written by build_answer_table()"""
+
+    def __init__(self, table_dir=DEFAULT_TABLE_DIR):
+        with open(os.path.join(table_dir, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != TABLE_VERSION:
+            raise ValueError(f"Unsupported answer table version in {table_dir}")
+
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(table_dir, f"{name}.npy"), mmap_mode="r"))
+        self.max_size = self.manifest["max_size"]
+        self.disease_names = self.manifest["disease_names"]
+        self.symptom_to_idx = {s: i for i, s in enumerate(self.manifest["symptom_names"])}
+        self.sources = self.manifest["sources"]
+
+    def matches(self, priors, scorer, profiles=None):
+        """
+        Whether the table was built from these exact artifacts and weights
+
+        Args:
+            priors: current_priors() snapshot
+            scorer: RuleBasedScorer (its files are hashed)
+            profiles: CompiledProfiles the lookups will be combined with
+                (default: the scorer's current ones)
+        """
+        profiles = profiles or scorer.profiles
+        return (self.disease_names == list(profiles.disease_names)
+                and self.sources == source_digests(priors, scorer))
+
+    def lookup(self, normalized):
+        """
+        Stored results for a canonical symptom set
+
+        Args:
+            normalized: Set of canonical symptom names
+
+        Returns:
+            Tuple of (disease_indices, match_counts, rule_scores, prior_probs)
+            aligned with disease_names, or None if the set is not in the table
+            (too large, or holds a symptom outside the vocabulary)
+        """
+        if not 0 < len(normalized) <= self.max_size:
+            return None
+        indices = []
+        for s in normalized:
+            idx = self.symptom_to_idx.get(s)
+            if idx is None:
+                return None
+            indices.append(idx)
+
+        key = pack_keys([sorted(indices)])[0]
+        pos = int(np.searchsorted(self.keys, key))
+        if pos == len(self.keys) or self.keys[pos] != key:
+            return None
+
+        lo, hi = self.indptr[pos], self.indptr[pos + 1]
+        return (
+            np.asarray(self.disease[lo:hi]),
+            np.asarray(self.count[lo:hi]),
+            np.asarray(self.rule[lo:hi]),
+            np.asarray(self.prior[lo:hi]),
+        )
+
+
+def load_answer_table(ensemble, table_dir=DEFAULT_TABLE_DIR, priors=None, profiles=None):
+    """
+    Load the answer table if it exists and is current for an ensemble
+
+    Hashes the artifacts and data files, so it belongs on a loader thread
+    (the model registry watcher), not in a request.
+
+    Args:
+        ensemble: EnsemblePredictor
+        table_dir: Table directory
+        priors: current_priors() snapshot to validate against
+        profiles: CompiledProfiles to validate against (default: the
+            ensemble scorer's current ones)
+
+    Returns:
+        AnswerTable, or None if missing or built from other artifacts
+    """
+    if not os.path.exists(os.path.join(table_dir, "manifest.json")):
+        return None
+    try:
+        table = AnswerTable(table_dir)
+    except ValueError as e:
+        print(f"{e}; using live inference")
+        return None
+    if not table.matches(priors or ensemble.current_priors(), ensemble.rule_scorer, profiles):
+        print(f"Answer table in {table_dir} is stale; using live inference")
+        return None
+    print(f"Loaded answer table with {len(table.keys)} symptom combinations")
+    return table
+
+
+if __name__ == "__main__":
+    from ensemble_predictor import get_ensemble
+
+    build_answer_table(get_ensemble())
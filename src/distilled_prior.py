@@ -0,0 +1,401 @@
+"""
+Distilled disease prior
+A multinomial logistic regression fitted to a tree prior's softened
+probabilities over enumerated symptom subsets. Serving it is one small
+matrix product (for a single patient, a sum of weight rows) instead of a
+pass over hundreds of trees.
+
+    models/distilled_prior/
+        manifest.json     teacher, symptoms, classes, fit and evaluation
+        weights.npy       (n_symptoms, n_classes)
+        bias.npy          (n_classes,)
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+sys.path.insert(0, os.path.dirname(__file__))
+from embedding_store import file_digest
+from normalization_cache import artifact_fingerprint
+from model_artifact import MANIFEST_FILE, replace_directory
+from prior_predictor import PriorPredictor
+
+SCHEMA_VERSION = 1
+DEFAULT_STUDENT_DIR = "models/distilled_prior"
+
+
+def softmax(logits):
+    """Row-wise softmax of a 1-D or 2-D logit array"""
+    z = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+
+class DistilledPrior(PriorPredictor):
+    """Softmax regression student of a tree prior"""
+
+    # Fitted to the teacher's already softened probabilities
+    softening = 1.0
+
+    def __init__(self, model_path=DEFAULT_STUDENT_DIR, use_compiled=True, cache_size=1024):
+        """
+        Load a distilled prior
+
+        Args:
+            model_path: Directory written by distill_prior()
+            use_compiled: Unused (there are no trees to compile)
+            cache_size: Symptom sets whose probabilities are memoized
+        """
+        super().__init__(model_path, use_compiled, cache_size)
+
+        print(f"Loaded distilled prior with {len(self.symptom_names)} symptoms and "
+              f"{len(self.class_names)} diseases")
+
+    def _load_artifact(self, path):
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        fingerprint = artifact_fingerprint(manifest_path)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("kind") != "distilled" or manifest.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"{path} is not a distilled prior (schema {SCHEMA_VERSION})")
+
+        self.fingerprint = fingerprint
+        self.artifact = None
+        self.artifact_file = manifest_path
+        self.manifest = manifest
+        self._model = None
+        self.label_encoder = None
+        self.compiled = None
+        self.symptom_names = manifest["symptom_names"]
+        self.class_names = np.asarray(manifest["classes"])
+        self.weights = np.load(os.path.join(path, "weights.npy"))
+        self.bias = np.load(os.path.join(path, "bias.npy"))
+
+    def _model_proba(self, X):
+        return softmax(np.asarray(X @ self.weights) + self.bias)
+
+    def _compute_proba(self, normalized):
+        # One patient: the product with a binary row is a sum of weight rows
+        idx = [self.symptom_to_idx[s] for s in normalized if s in self.symptom_to_idx]
+        if not idx:
+            return None
+        return softmax(self.bias + self.weights[idx].sum(axis=0))
+
+
+def enumerate_subsets(n_features, max_size):
+    """
+    Every symptom combination of 1..max_size features
+
+    Returns:
+        CSR matrix with one binary row per combination
+    """
+    blocks = []
+    for size in range(1, max_size + 1):
+        combos = np.array(list(itertools.combinations(range(n_features), size)),
+                          dtype=np.int64).reshape(-1, size)
+        rows = np.repeat(np.arange(len(combos)), size)
+        blocks.append(sparse.csr_matrix((np.ones(combos.size), (rows, combos.ravel())),
+                                        shape=(len(combos), n_features)))
+    return sparse.vstack(blocks).tocsr()
+
+
+def sample_row_subsets(X, n_samples, seed=42):
+    """
+    Random non-empty symptom subsets of dataset rows, so the student also
+    sees the larger combinations real patients report
+
+    Args:
+        X: Binary feature rows to draw from
+        n_samples: Subsets to draw
+
+    Returns:
+        CSR matrix of n_samples binary rows
+    """
+    rng = np.random.default_rng(seed)
+    X = sparse.csr_matrix(X)
+    rows, cols = [], []
+    for i, r in enumerate(rng.integers(0, X.shape[0], n_samples)):
+        present = X.indices[X.indptr[r]:X.indptr[r + 1]]
+        chosen = rng.choice(present, rng.integers(1, len(present) + 1), replace=False)
+        rows.extend([i] * len(chosen))
+        cols.extend(chosen)
+    return sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_samples, X.shape[1]))
+
+
+def teacher_proba(teacher, X, chunk_size=8192):
+    """Teacher's softened probabilities for binary rows (none may be empty)"""
+    out = np.empty((X.shape[0], len(teacher.class_names)))
+    for start in range(0, X.shape[0], chunk_size):
+        chunk = X[start:start + chunk_size]
+        out[start:start + chunk_size] = teacher._soften(teacher._model_proba(chunk.toarray()))
+    return out
+
+
+def fit_softmax_regression(X, P, sample_weight=None, l2=1e-4, max_iter=1000):
+    """
+    Multinomial logistic regression on soft targets with L-BFGS
+
+    Minimizes the weighted mean cross-entropy of softmax(X W + b) against
+    the target rows P (equivalently the mean KL divergence) plus
+    l2/2 * |W|^2.
+
+    Returns:
+        Tuple of (W, b, scipy OptimizeResult)
+    """
+    n, d = X.shape
+    c = P.shape[1]
+    X_t = X.T.tocsr()
+    w = np.ones(n) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    w = (w / w.sum())[:, None]
+
+    def loss_and_grad(theta):
+        W, b = theta[:d * c].reshape(d, c), theta[d * c:]
+        logits = np.asarray(X @ W) + b
+        logits -= logits.max(axis=1, keepdims=True)
+        log_z = np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        log_q = logits - log_z
+        loss = -(w * P * log_q).sum() + 0.5 * l2 * (W ** 2).sum()
+        G = (np.exp(log_q) - P) * w
+        grad_W = np.asarray(X_t @ G) + l2 * W
+        return loss, np.concatenate([grad_W.ravel(), G.sum(axis=0)])
+
+    # Start from the log of the mean target distribution
+    b0 = np.log(np.maximum((w * P).sum(axis=0), 1e-12))
+    theta0 = np.concatenate([np.zeros(d * c), b0 - b0.mean()])
+    result = minimize(loss_and_grad, theta0, jac=True, method="L-BFGS-B",
+                      options={"maxiter": max_iter})
+    return result.x[:d * c].reshape(d, c), result.x[d * c:], result
+
+
+def kl_divergence(P, Q):
+    """Row-wise KL(P || Q)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(P > 0, P * (np.log(P) - np.log(np.maximum(Q, 1e-300))), 0.0)
+    return terms.sum(axis=1)
+
+
+def ensemble_top_k(rule_scores, match_counts, prior, k, alpha, min_score, min_matches):
+    """
+    Top-k disease indices of the ensemble ranking (EnsemblePredictor.combine)
+    for many patients at once
+
+    Returns:
+        (n, k) disease indices, -1 past the end of shorter result lists
+    """
+    final = np.minimum(np.clip(rule_scores, 0, 1) * (1 + alpha * np.clip(prior, 0, 1)), 1.0)
+    keep = (match_counts >= min_matches) & (final >= min_score)
+    # Sort by displayed confidence, then by exact score; filtered ones last
+    confidence = np.where(keep, np.round(final, 3), -1.0)
+    order = np.lexsort((-np.where(keep, final, -1.0), -confidence), axis=-1)[:, :k]
+    return np.where(np.take_along_axis(keep, order, axis=1), order, -1)
+
+
+def evaluate_student(teacher, W, b, scorer, X, chunk_size=8192, alpha=0.4,
+                     min_score=0.1, min_matches=2, top_k=(1, 3, 5)):
+    """
+    Compare teacher and student on binary symptom rows
+
+    Args:
+        X: CSR rows in the teacher's symptom columns (none empty)
+        alpha, min_score, min_matches: Ensemble settings of the ranking
+
+    Returns:
+        Dict of mean/max KL(teacher || student), prior top-1 agreement and,
+        per k, the share of rows whose ensemble top-k list is identical
+        under both priors (among rows with any ensemble result)
+    """
+
+    # Teacher symptom columns -> scorer symptom columns, classes -> diseases
+    profiles = scorer.profiles
+    scorer_cols = [profiles.symptom_to_idx.get(s, -1) for s in teacher.symptom_names]
+    known = [i for i, j in enumerate(scorer_cols) if j >= 0]
+    to_scorer = sparse.csr_matrix((np.ones(len(known)), (known, [scorer_cols[i] for i in known])),
+                                  shape=(len(scorer_cols), len(profiles.symptom_names)))
+    disease_cols = np.array([profiles.disease_to_idx[c] for c in teacher.class_names])
+    weights_t = profiles.weight_matrix.T.tocsr()
+    profiles_t = profiles.profile_matrix.T.tocsr()
+
+    kl, top1 = [], []
+    same = {k: [] for k in top_k}
+    for start in range(0, X.shape[0], chunk_size):
+        chunk = X[start:start + chunk_size]
+        P = teacher_proba(teacher, chunk)
+        Q = softmax(np.asarray(chunk @ W) + b)
+        kl.append(kl_divergence(P, Q))
+        top1.append(P.argmax(axis=1) == Q.argmax(axis=1))
+
+        # Rule-based scores and both priors in the scorer's disease order
+        X_s = chunk @ to_scorer
+        matched_weight = (X_s @ weights_t).toarray()
+        match_counts = (X_s @ profiles_t).toarray()
+        rule_scores = profiles._combine(matched_weight, match_counts, slice(None))
+        priors = []
+        for probs in (P, Q):
+            prior = np.zeros_like(rule_scores)
+            prior[:, disease_cols] = probs
+            priors.append(prior)
+
+        for k in top_k:
+            ranked = [ensemble_top_k(rule_scores, match_counts, prior, k, alpha,
+                                     min_score, min_matches) for prior in priors]
+            has_results = ranked[0][:, 0] >= 0
+            same[k].append((ranked[0] == ranked[1]).all(axis=1)[has_results])
+
+    kl = np.concatenate(kl)
+    metrics = {
+        "rows": int(X.shape[0]),
+        "kl_mean": float(kl.mean()),
+        "kl_max": float(kl.max()),
+        "prior_top1_agreement": float(np.concatenate(top1).mean()),
+    }
+    for k in top_k:
+        metrics[f"ensemble_top{k}_agreement"] = float(np.concatenate(same[k]).mean())
+    return metrics
+
+
+def single_row_latency(model_proba, X, repeats=3):
+    """
+    Best-of-repeats mean latency of one-row model_proba calls, in microseconds
+
+    Args:
+        model_proba: Function of a (1, n_features) row, e.g. a predictor's
+            _model_proba
+        X: CSR matrix of rows to time
+    """
+    rows = [X[i].toarray() for i in range(X.shape[0])]
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for x in rows:
+            model_proba(x)
+        best = min(best, (time.perf_counter() - start) / len(rows))
+    return 1e6 * best
+
+
+def distill_prior(teacher_path="models/rf_model", out_dir=DEFAULT_STUDENT_DIR,
+                  train_size=2, eval_size=3, dataset_samples=50000, l2=1e-4,
+                  max_iter=1000, dataset_path=None):
+    """
+    Fit, evaluate and save a distilled student of a tree prior
+
+    The student is trained on every subset of up to train_size symptoms
+    plus random subsets of dataset rows, the two groups weighted equally (a
+    linear student cannot match the trees everywhere, and either group
+    alone pulls it away from the other). It is evaluated on every subset of
+    up to eval_size symptoms and on held-out random dataset row subsets.
+
+    Args:
+        teacher_path: Artifact of the RF or XGB prior to distill
+        out_dir: Output directory
+        train_size: Largest enumerated training combination
+        eval_size: Largest enumerated evaluation combination
+        dataset_samples: Random subsets of dataset rows added to training
+            (and a fifth as many held out for evaluation)
+        l2: Weight decay of the regression
+        max_iter: L-BFGS iteration limit
+        dataset_path: Path to dataset.csv
+
+    Returns:
+        Metrics dict (also stored in the manifest)
+    """
+    from feature_builder import build_features
+    from model_registry import PRIOR_CLASSES, infer_kind
+    from rule_based_scorer import RuleBasedScorer
+
+    teacher = PRIOR_CLASSES[infer_kind(teacher_path)](teacher_path, cache_size=0)
+    n_features = len(teacher.symptom_names)
+
+    # Training inputs in the teacher's symptom columns
+    X_data, _, data_symptoms, _ = build_features(dataset_path, as_sparse=True)
+    to_teacher = [teacher.symptom_to_idx.get(s, -1) for s in data_symptoms]
+    known = [i for i, j in enumerate(to_teacher) if j >= 0]
+    remap = sparse.csr_matrix((np.ones(len(known)), (known, [to_teacher[i] for i in known])),
+                              shape=(len(data_symptoms), n_features))
+    X_data = (X_data @ remap).tocsr()
+    X_data = X_data[np.diff(X_data.indptr) > 0]
+    groups = [enumerate_subsets(n_features, train_size)]
+    if dataset_samples:
+        groups.append(sample_row_subsets(X_data, dataset_samples))
+    X_train = sparse.vstack(groups).tocsr()
+    sample_weight = np.concatenate([np.full(g.shape[0], 1.0 / g.shape[0]) for g in groups])
+
+    print(f"Distilling {teacher_path} on {X_train.shape[0]} symptom sets...")
+    P = teacher_proba(teacher, X_train)
+    start = time.perf_counter()
+    W, b, result = fit_softmax_regression(X_train, P, sample_weight, l2=l2, max_iter=max_iter)
+    fit_s = time.perf_counter() - start
+    print(f"Fitted in {fit_s:.1f}s ({result.nit} L-BFGS iterations, "
+          f"train KL {kl_divergence(P, softmax(np.asarray(X_train @ W) + b)).mean():.4f})")
+
+    scorer = RuleBasedScorer(dataset_path, cache_size=0)
+    metrics = {"enumerated": evaluate_student(teacher, W, b, scorer,
+                                              enumerate_subsets(n_features, eval_size))}
+    metrics["enumerated"]["max_size"] = eval_size
+    if dataset_samples:
+        held_out = sample_row_subsets(X_data, max(dataset_samples // 5, 1), seed=1)
+        metrics["dataset_subsets"] = evaluate_student(teacher, W, b, scorer, held_out)
+    metrics["fit_s"] = fit_s
+
+    # Per-patient cost of the model itself, teacher vs student (the same
+    # product DistilledPrior._model_proba computes)
+    sample = enumerate_subsets(n_features, eval_size)
+    sample = sample[np.random.default_rng(0).choice(sample.shape[0], min(500, sample.shape[0]),
+                                                    replace=False)]
+    metrics["teacher_latency_us"] = single_row_latency(teacher._model_proba, sample)
+    metrics["student_latency_us"] = single_row_latency(
+        lambda x: softmax(np.asarray(x @ W) + b), sample
+    )
+
+    # Assembled next to out_dir and swapped in whole; a directory left by a
+    # crashed run is cleared first so none of its files are carried over
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "weights.npy"), W)
+    np.save(os.path.join(tmp_dir, "bias.npy"), b)
+    manifest = {
+        "schema_version": SCHEMA_VERSION,
+        "kind": "distilled",
+        "teacher": {"path": teacher_path, "sha256": file_digest(teacher.artifact_file)},
+        "symptom_names": list(teacher.symptom_names),
+        "classes": teacher.class_names.tolist(),
+        "fit": {"train_rows": int(X_train.shape[0]), "train_size": train_size,
+                "dataset_samples": dataset_samples, "l2": l2},
+        "metrics": metrics,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    replace_directory(tmp_dir, out_dir)
+    print(f"Distilled prior saved to: {out_dir}")
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill a tree prior into a softmax regression")
+    parser.add_argument("--teacher", default="models/rf_model")
+    parser.add_argument("--out", default=DEFAULT_STUDENT_DIR)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    metrics = distill_prior(args.teacher, args.out, l2=args.l2)
+    for name, label in [("enumerated", "every subset of up to "
+                         f"{metrics['enumerated']['max_size']} symptoms"),
+                        ("dataset_subsets", "held-out subsets of dataset rows")]:
+        if name not in metrics:
+            continue
+        m = metrics[name]
+        print(f"\nOn {m['rows']} symptom sets ({label}):")
+        print(f"  KL(teacher || student): mean {m['kl_mean']:.4f}, max {m['kl_max']:.4f}")
+        print(f"  Prior top-1 agreement: {m['prior_top1_agreement']:.1%}")
+        for key, value in m.items():
+            if key.startswith("ensemble_top"):
+                print(f"  Ensemble {key.split('_')[1]} lists identical: {value:.1%}")
+    print(f"\nModel latency per patient: teacher {metrics['teacher_latency_us']:.1f}us, "
+          f"student {metrics['student_latency_us']:.1f}us "
+          f"({metrics['teacher_latency_us'] / metrics['student_latency_us']:.0f}x)")
@@ -0,0 +1,115 @@
+"""
+Persistent embedding store
+Keeps canonical symptom embeddings on disk so processes memory-map them
+instead of re-encoding the vocabulary at startup
+"""
+
+import hashlib
+import os
+import numpy as np
+
+# Bump when the layout or meaning of stored arrays changes
+STORE_VERSION = 1
+
+DEFAULT_STORE_DIR = "models/embeddings"
+
+
+def file_digest(path, chunk_size=1 << 20, limit=None):
+    """
+    Content hash of a file
+
+    Args:
+        path: File to hash
+        chunk_size: Read size in bytes
+        limit: Hash only the first limit bytes
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    h = hashlib.sha256()
+    remaining = float("inf") if limit is None else limit
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(int(min(chunk_size, remaining)))
+            if not chunk:
+                break
+            h.update(chunk)
+            remaining -= len(chunk)
+    return h.hexdigest()
+
+
+def embedding_key(model_name, dataset_digest, texts):
+    """
+    Build the store key for a set of encoded texts
+
+    Args:
+        model_name: SentenceTransformer model name
+        dataset_digest: Content hash of the dataset the texts came from
+        texts: Ordered list of texts that will be encoded (includes aliases)
+
+    Returns:
+        Short hex key; changes whenever any input changes
+    """
+    h = hashlib.sha256()
+    h.update(f"v{STORE_VERSION}\0{model_name}\0{dataset_digest}".encode("utf-8"))
+    for text in texts:
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+class EmbeddingStore:
+    """Directory of float32 .npy embedding matrices addressed by key"""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+
+    def path_for(self, key):
+        return os.path.join(self.store_dir, f"{key}.npy")
+
+    def load(self, key):
+        """
+        Memory-map a stored matrix
+
+        Returns:
+            Read-only np.memmap, or None if the key is not stored
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except (ValueError, OSError):
+            # Truncated or foreign file - treat as a miss and re-encode
+            return None
+
+    def save(self, key, embeddings):
+        """
+        Write a matrix atomically and return it memory-mapped
+
+        The temporary file + os.replace means concurrent workers never
+        observe a partially written array.
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+
+    def get_or_create(self, key, encode_fn):
+        """
+        Load the matrix for key, encoding and storing it on a miss
+
+        Args:
+            key: Store key from embedding_key()
+            encode_fn: Zero-argument callable returning the embeddings
+
+        Returns:
+            Tuple of (embeddings, was_cached)
+        """
+        embeddings = self.load(key)
+        if embeddings is not None:
+            return embeddings, True
+        return self.save(key, encode_fn()), False
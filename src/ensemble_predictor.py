@@ -1,80 +1,320 @@
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
-from xgb_predictor import get_predictor
+import weakref
+import numpy as np
+from model_registry import get_registry
 from rule_based_scorer import get_scorer
-from symptom_normalizer import normalize_symptoms
+from symptom_normalizer import prepare_symptoms, get_normalizer
+from answer_table import DEFAULT_TABLE_DIR, load_answer_table
+from normalization_cache import artifact_fingerprint
+
+
+class EnsembleSnapshot:
+    """
+    The components one ensemble request runs on
+    
+    Built by EnsemblePredictor.refresh() and published with a single
+    reference swap. A request reads it once, so the priors, the rule
+    profiles and the answer table validated against both always belong
+    together.
+    """
+    
+    def __init__(self, priors, profiles, answer_table, sources):
+        self.priors = priors
+        self.profiles = profiles
+        self.answer_table = answer_table
+        # What they were built from, compared by refresh()
+        self.sources = sources
 
 
 class EnsemblePredictor:
-    def __init__(self, rf_model_path="models/rf_model.pkl", 
+    def __init__(self, priors=None,
                  dataset_path="data/dataset.csv",
                  severity_path="data/Symptom-severity.csv",
-                 alpha=0.4, beta=0.6):
-
+                 alpha=0.4, beta=0.6, answer_table_dir=DEFAULT_TABLE_DIR,
+                 registry=None):
+        """
+        Args:
+            priors: Dict of model registry name -> weight; the prior is the
+                weighted mean of their probabilities (default {"rf": 1.0})
+            dataset_path: Dataset for the rule-based scorer
+            severity_path: Symptom severity weights
+            alpha: Default prior weight (predict() can override it per call)
+            beta: Default rule-based weight
+            answer_table_dir: Precomputed answer table (None = always live)
+            registry: ModelRegistry holding the priors (default: global one)
+        """
         self.alpha = alpha
         self.beta = beta
-        self.rf_predictor = get_predictor(rf_model_path)
+        self.registry = registry or get_registry()
+        self.prior_weights = dict(priors or {"rf": 1.0})
+        for name in self.prior_weights:
+            self.registry.get(name)
         self.rule_scorer = get_scorer(dataset_path, severity_path)
         
-        print(f"Ensemble predictor initialized (RF: {alpha}, Rule-based: {beta})")
+        # Per predictor: the profiles and its probability column for each of
+        # their diseases (-1 = none)
+        self._columns = weakref.WeakKeyDictionary()
+        
+        # Precomputed results for small symptom sets (None = always live)
+        self.answer_table_dir = answer_table_dir
+        self._snapshot = None
+        self.refresh()
+        # Later changes are picked up on the registry's watcher thread
+        self.registry.subscribe(self.refresh)
+        
+        print(f"Ensemble predictor initialized (priors: {self.prior_weights}, "
+              f"alpha: {alpha}, Rule-based: {beta})")
     
-    def predict(self, user_symptoms, min_score=0.1, min_matches=2):
-        # Normalize symptoms
-        normalized = normalize_symptoms(user_symptoms)
+    def refresh(self):
+        """
+        Revalidate the components and publish a new snapshot if any changed
+        
+        Reloads the rule profiles if the dataset or severity file changed,
+        takes the registry's current priors and, when either or the answer
+        table on disk changed, revalidates the table. Runs on the registry
+        watcher thread; requests only read the published snapshot.
+        
+        Returns:
+            True if a new snapshot was published
+        """
+        try:
+            self.rule_scorer.refresh()
+        except (OSError, ValueError, KeyError) as e:
+            # Mid-write or removed: keep serving the current profiles
+            print(f"Could not reload the rule profiles: {e}")
+        
+        priors = [(name, self.registry.get(name), weight)
+                  for name, weight in self.prior_weights.items()]
+        profiles = self.rule_scorer.profiles
+        table_manifest = None
+        if self.answer_table_dir:
+            table_manifest = os.path.join(self.answer_table_dir, "manifest.json")
+        # Predictors and profiles are immutable: identity means unchanged
+        sources = (tuple(predictor for _, predictor, _ in priors), profiles,
+                   artifact_fingerprint(table_manifest) if table_manifest else None)
+        
+        current = self._snapshot
+        if current is not None and current.sources == sources:
+            return False
+        
+        table = None
+        if table_manifest:
+            try:
+                table = load_answer_table(self, self.answer_table_dir, priors, profiles)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not load the answer table: {e}; using live inference")
+        self._snapshot = EnsembleSnapshot(priors, profiles, table, sources)
+        return True
+    
+    def current_priors(self):
+        """
+        Snapshot of (name, predictor, weight) for the current models
+        
+        A request takes one snapshot and uses it throughout, so a hot swap
+        in the registry never mixes old and new models within a request.
+        """
+        return self._snapshot.priors
+    
+    @property
+    def answer_table(self):
+        """Answer table of the current snapshot (None if missing or stale)"""
+        return self._snapshot.answer_table
+    
+    @property
+    def rf_predictor(self):
+        """Current predictor of the first (for a single prior, the only) model"""
+        return self.current_priors()[0][1]
+    
+    def with_weights(self, alpha=None, beta=None):
+        """
+        Lightweight view with its own alpha/beta over these shared components
+        
+        Returns:
+            EnsembleView (nothing is loaded or copied)
+        """
+        return EnsembleView(
+            self,
+            self.alpha if alpha is None else alpha,
+            self.beta if beta is None else beta,
+        )
+    
+    def _prior_columns(self, predictor, profiles):
+        """Index into predictor.class_names for each disease of profiles"""
+        cached = self._columns.get(predictor)
+        if cached is not None and cached[0] is profiles:
+            return cached[1]
+        column = {name: i for i, name in enumerate(predictor.class_names)}
+        cols = np.array([column.get(d, -1) for d in profiles.disease_names])
+        self._columns[predictor] = (profiles, cols)
+        return cols
+    
+    def prior_vector(self, normalized, priors=None, profiles=None):
+        """
+        Weighted prior probabilities aligned with the rule scorer's diseases
+        
+        Args:
+            normalized: NormalizedSymptoms
+            priors: current_priors() snapshot (default: take one)
+            profiles: CompiledProfiles giving the disease order (default:
+                the current snapshot's)
+        
+        Returns:
+            1-D array (zeros where no model knows a symptom or the disease)
+        """
+        snapshot = self._snapshot
+        priors = priors or snapshot.priors
+        profiles = profiles or snapshot.profiles
+        total = sum(weight for _, _, weight in priors)
+        out = np.zeros(len(profiles.disease_names))
+        for _, predictor, weight in priors:
+            probs = predictor.predict_proba(normalized)
+            if probs is None:
+                continue
+            cols = self._prior_columns(predictor, profiles)
+            out += weight / total * np.where(cols >= 0, probs[cols], 0.0)
+        return out
+    
+    def prior_matrix(self, symptom_sets, chunk_size=None, priors=None, profiles=None):
+        """
+        Weighted prior probabilities for many patients
+        
+        Args:
+            symptom_sets: List of NormalizedSymptoms
+            chunk_size: Rows per model call
+            priors: current_priors() snapshot (default: take one)
+            profiles: CompiledProfiles giving the disease order (default:
+                the current snapshot's)
+        
+        Returns:
+            (len(symptom_sets), n_diseases) array aligned with
+            profiles.disease_names
+        """
+        snapshot = self._snapshot
+        priors = priors or snapshot.priors
+        profiles = profiles or snapshot.profiles
+        total = sum(weight for _, _, weight in priors)
+        out = np.zeros((len(symptom_sets), len(profiles.disease_names)))
+        for _, predictor, weight in priors:
+            cols = self._prior_columns(predictor, profiles)
+            probs = predictor.predict_many(symptom_sets, chunk_size=chunk_size)
+            out += weight / total * np.where(cols >= 0, probs[:, cols], 0.0)
+        return out
+    
+    def predict(self, user_symptoms, min_score=0.1, min_matches=2, alpha=None, beta=None):
+        """
+        Ensemble predictions for one patient
+        
+        Args:
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
+                (normalized once here and shared with every component)
+            min_score: Minimum final score
+            min_matches: Minimum symptom matches
+            alpha: Prior weight for this call (default: self.alpha)
+            beta: Rule-based weight for this call (default: self.beta)
+        
+        Returns:
+            Ranked list of predictions
+        """
+        alpha = self.alpha if alpha is None else alpha
+        
+        # Normalize symptoms once
+        normalized = prepare_symptoms(user_symptoms)
         
         if len(normalized) < min_matches:
             return []
         
-        # Get RF probabilities
-        rf_probs = self.rf_predictor.predict(user_symptoms)
+        # One snapshot for the whole request
+        snapshot = self._snapshot
+        priors, profiles = snapshot.priors, snapshot.profiles
+        
+        # Small symptom sets are served from the precomputed table
+        served = self._predict_from_table(normalized, min_score, min_matches, snapshot, alpha)
+        if served is not None:
+            return served
+        
+        # Rule-based scores for the diseases with enough matches
+        diseases, rule_scores, match_counts = profiles.score_arrays(
+            normalized, min_matches=min_matches
+        )
+        
+        # Prior probabilities for the same diseases
+        prior_probs = self.prior_vector(normalized, priors, profiles)[diseases]
         
-        # Get rule-based scores
-        rule_scores = self.rule_scorer.score_all_diseases(user_symptoms)
+        return self.combine(diseases, rule_scores, match_counts, prior_probs,
+                            normalized, min_score, min_matches, alpha, profiles)
+    
+    def _predict_from_table(self, normalized, min_score, min_matches, snapshot, alpha):
+        """
+        predict() output built from the snapshot's answer table, or None to
+        run live
+        
+        The table holds diseases with at least one match, so it can only
+        answer when zero-match diseases are filtered out anyway.
+        """
+        if snapshot.answer_table is None or (min_matches < 1 and min_score <= 0):
+            return None
+        
+        hit = snapshot.answer_table.lookup(normalized)
+        if hit is None:
+            return None
+        
+        diseases, match_counts, rule_scores, prior_probs = hit
+        return self.combine(diseases, rule_scores, match_counts, prior_probs,
+                            normalized, min_score, min_matches, alpha, snapshot.profiles)
+    
+    def combine(self, diseases, rule_scores, match_counts, prior_probs, normalized,
+                min_score=0.1, min_matches=2, alpha=None, profiles=None):
+        """
+        Combine prior probabilities with rule-based scores
+        
+        Args:
+            diseases: Indices into profiles.disease_names
+            rule_scores, match_counts, prior_probs: Arrays aligned with diseases
+            normalized: Canonical symptom set (for matched/missing lists)
+            min_score: Minimum final score
+            min_matches: Minimum symptom matches
+            alpha: Prior weight (default: self.alpha)
+            profiles: CompiledProfiles the indices refer to (default: the
+                current snapshot's)
+        
+        Returns:
+            Ranked list of predictions
+        """
+        alpha = self.alpha if alpha is None else alpha
+        profiles = profiles or self._snapshot.profiles
+        
+        # Normalize both to 0-1 range (they should already be, but ensure)
+        prior_probs = np.clip(prior_probs, 0.0, 1.0)
+        rule_scores = np.clip(rule_scores, 0.0, 1.0)
+        
+        # Ensemble combination
+        final_scores = np.minimum(rule_scores * (1 + alpha * prior_probs), 1.0)
+        
+        keep = np.flatnonzero((match_counts >= min_matches) & (final_scores >= min_score))
+        
+        # Sort by displayed confidence, then by exact score
+        confidence = np.round(final_scores[keep], 3)
+        keep = keep[np.lexsort((-final_scores[keep], -confidence))]
         
-        # Combine predictions
         results = []
+        for i in keep:
+            disease = profiles.disease_names[diseases[i]]
+            matched, missing = profiles.matched_missing(disease, normalized)
+            results.append({
+                "disease": disease,
+                "confidence": round(float(final_scores[i]), 3),
+                "prior_support": round(float(prior_probs[i]), 3),
+                "evidence_score": round(float(rule_scores[i]), 3),
+                "matched_symptoms": matched,
+                "missing_symptoms": missing
+            })
         
-        # Get all unique diseases
-        all_diseases = set(rf_probs.keys()) | set(rule_scores.keys())
-        
-        for disease in all_diseases:
-            # Get RF probability (default to 0 if not in RF predictions)
-            rf_prob = rf_probs.get(disease, 0.0)
-            
-            # Get rule-based score and details
-            rule_data = rule_scores.get(disease, {'score': 0.0, 'matched': [], 'missing': []})
-            rule_score = rule_data['score']
-            matched = rule_data['matched']
-            missing = rule_data['missing']
-            
-            # Skip if not enough matches
-            if len(matched) < min_matches:
-                continue
-            
-            # Ensemble combination
-            # Normalize both to 0-1 range (they should already be, but ensure)
-            rf_prob = max(0.0, min(1.0, rf_prob))
-            rule_score = max(0.0, min(1.0, rule_score))
-            
-            final_score = rule_score * (1 + self.alpha * rf_prob)
-            final_score = min(final_score, 1.0)
-
-            
-            if final_score >= min_score:
-                results.append({
-                    "disease": disease,
-                    "confidence": round(final_score, 3),
-                    "prior_support": round(rf_prob, 3),
-                    "evidence_score": round(rule_score, 3),
-                    "matched_symptoms": matched,
-                    "missing_symptoms": missing
-                })
-        
-        # Sort by final score
-        return sorted(results, key=lambda x: x["confidence"], reverse=True)
+        return results
     
-    def predict_top_k(self, user_symptoms, k=5, min_score=0.1, min_matches=2):
+    def predict_top_k(self, user_symptoms, k=5, min_score=0.1, min_matches=2,
+                      alpha=None, beta=None):
         """
         Get top K ensemble predictions
         
@@ -83,25 +323,140 @@ class EnsemblePredictor:
             k: Number of top predictions
             min_score: Minimum final score
             min_matches: Minimum symptom matches
+            alpha, beta: Weights for this call (default: the instance's)
         
         Returns:
             Top K predictions
         """
-        predictions = self.predict(user_symptoms, min_score, min_matches)
+        predictions = self.predict(user_symptoms, min_score, min_matches, alpha, beta)
         return predictions[:k]
+    
+    def cache_stats(self):
+        """Prediction cache counters of the prior and the rule scorer"""
+        return {
+            "priors": {name: predictor.cache_stats()
+                       for name, predictor, _ in self.current_priors()},
+            "rules": self._snapshot.profiles.cache_stats(),
+        }
+    
+    def start_session(self, user_symptoms=(), alpha=None, beta=None):
+        """
+        Start an incremental session for interactive diagnosis
+        
+        Args:
+            user_symptoms: Initial symptom strings
+            alpha, beta: Weights for the session (default: the instance's)
+        
+        Returns:
+            EnsembleSession
+        """
+        return EnsembleSession(self, user_symptoms, alpha, beta)
 
 
-# Global instance
-_ensemble = None
+class EnsembleView:
+    """
+    An EnsemblePredictor with its own alpha/beta
+    
+    Views share the ensemble's loaded models, scorer, caches and answer
+    table, so per-tenant weights cost one small object rather than a new
+    ensemble. Everything not overridden here is read from the ensemble.
+    """
+    
+    def __init__(self, ensemble, alpha, beta):
+        self.ensemble = ensemble
+        self.alpha = alpha
+        self.beta = beta
+    
+    def predict(self, user_symptoms, min_score=0.1, min_matches=2):
+        return self.ensemble.predict(user_symptoms, min_score, min_matches,
+                                     self.alpha, self.beta)
+    
+    def predict_top_k(self, user_symptoms, k=5, min_score=0.1, min_matches=2):
+        return self.ensemble.predict_top_k(user_symptoms, k, min_score, min_matches,
+                                           self.alpha, self.beta)
+    
+    def start_session(self, user_symptoms=()):
+        return self.ensemble.start_session(user_symptoms, self.alpha, self.beta)
+    
+    def __getattr__(self, name):
+        return getattr(self.ensemble, name)
+
+
+class EnsembleSession:
+    """
+    Ensemble predictions for a symptom set that changes one symptom at a time
+    
+    Rule-based scores live in a ScoringState, so adding or rejecting a
+    symptom applies a delta over the diseases containing it. Prior
+    probabilities are recomputed lazily, only when the set has changed.
+    """
+    
+    def __init__(self, ensemble, user_symptoms=(), alpha=None, beta=None):
+        self.ensemble = ensemble
+        self.alpha = ensemble.alpha if alpha is None else alpha
+        self.beta = ensemble.beta if beta is None else beta
+        self.state = ensemble.rule_scorer.new_state(user_symptoms, ensemble._snapshot.profiles)
+        self._prior = None
+    
+    @property
+    def symptoms(self):
+        """Current canonical symptom set"""
+        return self.state.symptoms
+    
+    def _canonical(self, symptom):
+        if symptom in self.state.profiles.symptom_to_idx:
+            return symptom
+        canon, _ = get_normalizer().normalize_symptom(symptom)
+        return canon
+    
+    def add_symptom(self, symptom):
+        """Add a symptom (canonical name or free text); returns True if it changed the set"""
+        canon = self._canonical(symptom)
+        if canon and self.state.add(canon):
+            self._prior = None
+            return True
+        return False
+    
+    def remove_symptom(self, symptom):
+        """Remove a rejected symptom; returns True if it changed the set"""
+        canon = self._canonical(symptom)
+        if canon and self.state.remove(canon):
+            self._prior = None
+            return True
+        return False
+    
+    def predict(self, min_score=0.1, min_matches=2):
+        """Same output as EnsemblePredictor.predict for the current symptoms"""
+        if len(self.symptoms) < min_matches:
+            return []
+        
+        if self._prior is None:
+            normalized = get_normalizer().wrap(self.symptoms)
+            self._prior = self.ensemble.prior_vector(normalized, profiles=self.state.profiles)
+        
+        diseases, rule_scores, match_counts = self.state.score_arrays(min_matches=min_matches)
+        return self.ensemble.combine(diseases, rule_scores, match_counts,
+                                     self._prior[diseases], self.symptoms,
+                                     min_score, min_matches, self.alpha, self.state.profiles)
+
+
+# Global instances, one per set of loaded components
+_ensembles = {}
 
 
-def get_ensemble(alpha=0.4, beta=0.6, rf_model_path="models/rf_model.pkl",
+def get_ensemble(alpha=0.4, beta=0.6, priors=None,
                  dataset_path="data/dataset.csv", severity_path="data/Symptom-severity.csv"):
-    """Get or create the global ensemble instance"""
-    global _ensemble
-    if _ensemble is None or _ensemble.alpha != alpha or _ensemble.beta != beta:
-        _ensemble = EnsemblePredictor(rf_model_path, dataset_path, severity_path, alpha, beta)
-    return _ensemble
+    """
+    Get the shared ensemble for these components, viewed with alpha/beta
+    
+    Different weights never rebuild anything: the returned EnsembleView
+    wraps the one EnsemblePredictor loaded for (priors, dataset, severity).
+    """
+    priors = dict(priors or {"rf": 1.0})
+    key = (tuple(sorted(priors.items())), dataset_path, severity_path)
+    if key not in _ensembles:
+        _ensembles[key] = EnsemblePredictor(priors, dataset_path, severity_path, alpha, beta)
+    return _ensembles[key].with_weights(alpha, beta)
 
 
 def ensemble_predict(user_symptoms, alpha=0.4, beta=0.6, min_score=0.1, min_matches=2):
@@ -0,0 +1,209 @@
+"""
+Shared feature-matrix builder for the RF and XGB trainers
+Maps each unique raw symptom string to its canonical column once, builds the
+binary matrix with vectorized pandas/NumPy operations, and caches the result
+as an .npz keyed by the dataset hash
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from scipy import sparse
+sys.path.insert(0, os.path.dirname(__file__))
+from embedding_store import file_digest
+from symptom_normalizer import SymptomNormalizer
+
+# Bump when the feature layout or symptom mapping changes
+FEATURE_VERSION = 1
+DEFAULT_FEATURE_CACHE_DIR = "models/features"
+
+DATASET_CANDIDATES = ("data/dataset.csv", "dataset.csv", "../dataset.csv")
+
+
+def find_dataset(dataset_path=None):
+    """
+    Resolve the training dataset path
+
+    Args:
+        dataset_path: Explicit path (returned unchanged)
+
+    Returns:
+        First existing candidate of data/dataset.csv, dataset.csv,
+        ../dataset.csv
+    """
+    if dataset_path is not None:
+        return dataset_path
+    for candidate in DATASET_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"Could not find dataset.csv (looked in {', '.join(DATASET_CANDIDATES)})")
+
+
+def _canonical_cells(df, dataset_path):
+    """
+    Row positions and canonical names (None if unknown) of every non-empty
+    symptom cell of df
+    """
+    symptom_cols = [c for c in df.columns if "Symptom" in c]
+
+    # Dataset cells are canonical names: never load the embedding model. A
+    # private instance, so the process-wide normalizer (created on first
+    # use, with its mode fixed) keeps its embedding fallback
+    normalizer = SymptomNormalizer(dataset_path, embedding_cache_dir=None, lexical_only=True)
+
+    # One long (row, raw string) table; each unique string is normalized once
+    cells = df[symptom_cols].reset_index(drop=True).stack()
+    raw = pd.unique(cells.to_numpy())
+    canon = pd.Series({s: normalizer.normalize_symptom(s)[0] for s in raw}, dtype=object)
+    return cells.index.get_level_values(0).to_numpy(), canon.reindex(cells.to_numpy()).to_numpy()
+
+
+def _binary_matrix(df, rows, cols, n_cols):
+    """CSR matrix with a 1 at every known (row, column) cell; empty rows dropped"""
+    known = cols >= 0
+    X = sparse.csr_matrix(
+        (np.ones(known.sum(), dtype=np.float32), (rows[known], cols[known])),
+        shape=(len(df), n_cols),
+    )
+    # A symptom listed twice in a row is still a single 1
+    X.sum_duplicates()
+    X.data[:] = 1
+
+    # Only rows with at least one symptom
+    present = np.diff(X.indptr) > 0
+    return X[present], df["Disease"].to_numpy()[present]
+
+
+def _build(dataset_path):
+    """Binary CSR matrix, disease labels and symptom names for a dataset"""
+    df = pd.read_csv(dataset_path)
+    rows, canon = _canonical_cells(df, dataset_path)
+    symptom_names = sorted(c for c in pd.unique(canon) if c)
+    cols = pd.Index(symptom_names).get_indexer(canon)
+    X, diseases = _binary_matrix(df, rows, cols, len(symptom_names))
+    return X, diseases, symptom_names
+
+
+def encode_rows(dataset_path, symptom_names, start_row=0, end_row=None):
+    """
+    Encode dataset rows in an existing symptom column space
+
+    Args:
+        dataset_path: Path to dataset.csv
+        symptom_names: Feature columns of an existing model
+        start_row: First CSV data row to encode
+        end_row: CSV data row to stop before (None = to the end)
+
+    Returns:
+        X: Dense binary feature matrix of the rows with a known symptom
+        diseases: Their disease names
+        unknown: Canonical symptoms of the rows missing from symptom_names
+    """
+    df = pd.read_csv(dataset_path).iloc[start_row:end_row]
+    rows, canon = _canonical_cells(df, dataset_path)
+    cols = pd.Index(symptom_names).get_indexer(canon)
+    unknown = sorted(c for c in pd.unique(canon[cols < 0]) if c)
+    X, diseases = _binary_matrix(df, rows, cols, len(symptom_names))
+    return X.toarray(), diseases, unknown
+
+
+def dataset_revision(dataset_path):
+    """
+    Identify the contents of a dataset file
+
+    Returns:
+        Dict of rows (CSV data rows), bytes and sha256
+    """
+    return {
+        "rows": len(pd.read_csv(dataset_path)),
+        "bytes": os.path.getsize(dataset_path),
+        "sha256": file_digest(dataset_path),
+    }
+
+
+def is_appended(dataset_path, revision):
+    """Whether dataset_path is the file of revision with rows appended"""
+    return (os.path.getsize(dataset_path) >= revision["bytes"]
+            and file_digest(dataset_path, limit=revision["bytes"]) == revision["sha256"])
+
+
+def build_features(dataset_path=None, as_sparse=False, cache_dir=DEFAULT_FEATURE_CACHE_DIR):
+    """
+    Transform dataset.csv into a binary feature matrix
+
+    Args:
+        dataset_path: Path to dataset.csv (default: see find_dataset)
+        as_sparse: Return X as a scipy CSR matrix instead of a dense array
+        cache_dir: Directory for the .npz cache (None disables it)
+
+    Returns:
+        X: Binary feature matrix (n_samples, n_symptoms), float32
+        y: Encoded disease labels
+        symptom_names: List of symptom names (columns)
+        label_encoder: LabelEncoder for diseases
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    dataset_path = find_dataset(dataset_path)
+    cache_path = None
+    if cache_dir:
+        key = f"{file_digest(dataset_path)[:20]}.v{FEATURE_VERSION}"
+        cache_path = os.path.join(cache_dir, f"features.{key}.npz")
+
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            X = sparse.csr_matrix(
+                (data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"])
+            )
+            diseases = data["diseases"]
+            symptom_names = data["symptom_names"].tolist()
+        print(f"Loaded cached features from {cache_path}")
+    else:
+        print("Loading dataset...")
+        X, diseases, symptom_names = _build(dataset_path)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, data=X.data, indices=X.indices, indptr=X.indptr,
+                     shape=np.array(X.shape), diseases=diseases.astype(str),
+                     symptom_names=np.array(symptom_names))
+            os.replace(tmp_path, cache_path)
+
+    print(f"Found {len(symptom_names)} unique symptoms")
+    print(f"Created feature matrix: {X.shape}")
+    print(f"Number of diseases: {len(set(diseases))}")
+
+    # Encode disease labels
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(diseases)
+
+    if not as_sparse:
+        X = X.toarray()
+    return X, y, symptom_names, label_encoder
+
+
+def collapse_duplicates(X, y):
+    """
+    Collapse identical (feature row, label) pairs into unique rows
+
+    Fitting on the unique rows with the counts as sample_weight is
+    equivalent to fitting on every copy, at a fraction of the rows.
+
+    Args:
+        X: Binary feature matrix (dense or CSR)
+        y: Encoded labels
+
+    Returns:
+        X_unique, y_unique, sample_weight (copies of each unique row)
+    """
+    if sparse.issparse(X):
+        X = X.toarray()
+    rows = np.column_stack([X, y])
+    unique, counts = np.unique(rows, axis=0, return_counts=True)
+    X_unique = unique[:, :-1].astype(X.dtype)
+    y_unique = unique[:, -1].astype(np.asarray(y).dtype)
+
+    print(f"Collapsed {len(X)} rows into {len(X_unique)} unique rows "
+          f"({len(X) / len(X_unique):.1f}x compression)")
+    return X_unique, y_unique, counts.astype(np.float64)
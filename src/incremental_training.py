@@ -0,0 +1,200 @@
+"""
+Incremental retraining of the RF and XGB priors
+When rows have only been appended to dataset.csv since an artifact was
+trained, the new rows are fitted on top of the saved model: a Random Forest
+grows extra trees (warm_start) and XGBoost continues boosting from the saved
+booster. The new trees see the new rows together with a stratified replay
+sample of the existing rows, weighted up to their class sizes, so they
+model the whole updated dataset rather than only the diseases that were
+appended. Fitting costs the sample plus the new rows, not a full retrain.
+A new symptom or disease, edited rows, an artifact without a recorded
+dataset revision, or an update that moves the priors of unrelated symptom
+patterns fall back to a full rebuild.
+"""
+
+import argparse
+import math
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(__file__))
+from feature_builder import dataset_revision, encode_rows, find_dataset, is_appended
+from model_artifact import ModelArtifact, resolve_model_path, save_model
+from model_registry import DEFAULT_MODEL_PATHS, infer_kind
+
+# Fewest trees (RF) or boosting rounds (XGB) an incremental update adds
+MIN_NEW_TREES = 10
+
+# Existing rows replayed per disease alongside the new rows
+REPLAY_ROWS_PER_CLASS = 20
+
+# Largest probability change allowed on existing rows of the diseases that
+# received no new rows
+DRIFT_TOLERANCE = 0.05
+
+
+def _full_rebuild(kind, model_path, dataset_path, reason, collapse):
+    print(f"Full rebuild of {model_path}: {reason}")
+    if kind == "xgb":
+        from train_xgb_model import train_xgb_model
+        train_xgb_model(dataset_path, save_path=model_path, collapse=collapse)
+    else:
+        from train_rf_model import train_random_forest
+        train_random_forest(dataset_path, save_path=model_path, collapse=collapse)
+    return {"mode": "full", "reason": reason}
+
+
+def replay_sample(X, y, per_class=REPLAY_ROWS_PER_CLASS, seed=0):
+    """
+    Stratified sample of existing training rows
+
+    Args:
+        X, y: Rows the model was trained on and their encoded labels
+        per_class: Rows drawn per class (all of a smaller class)
+
+    Returns:
+        Row indices into X and sample weights; each drawn row stands in for
+        class size / drawn rows of its class
+    """
+    rng = np.random.default_rng(seed)
+    indices, weights = [], []
+    for label in np.unique(y):
+        rows = np.flatnonzero(y == label)
+        drawn = rng.choice(rows, min(per_class, len(rows)), replace=False)
+        indices.append(np.sort(drawn))
+        weights.append(np.full(len(drawn), len(rows) / len(drawn)))
+    return np.concatenate(indices), np.concatenate(weights)
+
+
+def _grow_forest(model, X, y, weights, n_new):
+    """Add n_new trees fitted on weighted rows to a Random Forest"""
+    # scikit-learn warns against the "balanced" preset with warm_start, so
+    # the same balancing is applied to the weights here
+    class_weight = model.class_weight
+    if class_weight == "balanced":
+        class_totals = np.bincount(y, weights=weights)
+        present = np.count_nonzero(class_totals)
+        weights = weights * weights.sum() / (present * class_totals[y])
+
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new,
+                     class_weight=None)
+    model.fit(X, y, sample_weight=weights)
+    model.set_params(warm_start=False, class_weight=class_weight)
+    return model
+
+
+def _continue_boosting(model, X, y, weights, n_new):
+    """Add n_new boosting rounds fitted on weighted rows to an XGBoost model"""
+    from train_xgb_model import build_classifier
+
+    booster = model.get_booster()
+    n_rounds = booster.num_boosted_rounds()
+    updated = build_classifier(model.n_classes_, n_estimators=n_new)
+    updated.fit(X, y, sample_weight=weights, xgb_model=booster)
+    updated.set_params(n_estimators=n_rounds + n_new)
+    return updated
+
+
+def train_incremental(model_path, dataset_path=None, kind=None, collapse=False):
+    """
+    Bring a saved prior up to date with dataset.csv
+
+    Args:
+        model_path: Artifact directory (a legacy pickle is rebuilt as one)
+        dataset_path: Path to dataset.csv
+        kind: "rf" or "xgb" (default: from the artifact)
+        collapse: Collapse duplicate rows when a full rebuild is needed
+
+    Returns:
+        The training record: mode "unchanged", "incremental" or "full"
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    dataset_path = find_dataset(dataset_path)
+    path, is_artifact = resolve_model_path(model_path)
+    kind = kind or (infer_kind(model_path) if os.path.exists(path) else "rf")
+
+    if not is_artifact:
+        return _full_rebuild(kind, model_path, dataset_path, "no model artifact", collapse)
+    artifact = ModelArtifact(path)
+    revision = artifact.manifest.get("dataset_revision")
+    if revision is None:
+        return _full_rebuild(kind, model_path, dataset_path,
+                             "artifact has no dataset revision", collapse)
+
+    if dataset_revision(dataset_path)["sha256"] == revision["sha256"]:
+        print(f"{model_path} is up to date with {dataset_path}")
+        return {"mode": "unchanged"}
+    if not is_appended(dataset_path, revision):
+        return _full_rebuild(kind, model_path, dataset_path,
+                             "existing dataset rows changed", collapse)
+
+    # Appended rows, in the saved model's feature columns
+    symptom_names = artifact.symptom_names
+    X_new, diseases, unknown = encode_rows(dataset_path, symptom_names, revision["rows"])
+    if unknown:
+        return _full_rebuild(kind, model_path, dataset_path,
+                             f"new symptoms {', '.join(unknown)}", collapse)
+    new_classes = sorted(set(diseases) - set(artifact.class_names))
+    if new_classes:
+        return _full_rebuild(kind, model_path, dataset_path,
+                             f"new diseases {', '.join(new_classes)}", collapse)
+    if len(X_new) == 0:
+        print(f"No new rows with known symptoms for {model_path}")
+        return {"mode": "unchanged"}
+
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.asarray(artifact.class_names)
+    y_new = label_encoder.transform(diseases)
+
+    # New rows plus a weighted stratified replay of the existing ones
+    X_old, old_diseases, _ = encode_rows(dataset_path, symptom_names, 0, revision["rows"])
+    y_old = label_encoder.transform(old_diseases)
+    replay, replay_weights = replay_sample(X_old, y_old)
+    X = np.vstack([X_old[replay], X_new])
+    y = np.concatenate([y_old[replay], y_new])
+    weights = np.concatenate([replay_weights, np.ones(len(y_new))])
+
+    # Existing rows of diseases with no new rows: their priors should stay
+    unrelated = replay[~np.isin(y_old[replay], y_new)]
+    X_check = X_old[unrelated]
+
+    # Trees/rounds in proportion to the share of new rows
+    model = artifact.load_estimator()
+    before = model.predict_proba(X_check) if len(X_check) else None
+    n_existing = len(model.estimators_) if kind == "rf" else model.get_booster().num_boosted_rounds()
+    n_new = max(MIN_NEW_TREES, math.ceil(n_existing * len(X_new) / max(revision["rows"], 1)))
+    print(f"Adding {n_new} {'trees' if kind == 'rf' else 'boosting rounds'} "
+          f"for {len(X_new)} new rows to {model_path}...")
+
+    if kind == "rf":
+        model = _grow_forest(model, X, y, weights, n_new)
+    else:
+        model = _continue_boosting(model, X, y, weights, n_new)
+
+    drift = 0.0 if before is None else float(np.abs(model.predict_proba(X_check) - before).max())
+    print(f"Largest prior change on unrelated symptom patterns: {drift:.4f}")
+    if drift > DRIFT_TOLERANCE:
+        return _full_rebuild(kind, model_path, dataset_path,
+                             f"incremental update moved unrelated priors by {drift:.3f}", collapse)
+
+    training = {
+        "mode": "incremental",
+        "base_revision": revision,
+        "added_rows": int(len(X_new)),
+        "replayed_rows": int(len(replay)),
+        "unrelated_drift": drift,
+        "added_trees" if kind == "rf" else "added_rounds": n_new,
+    }
+    save_model(model, label_encoder, symptom_names, path, dataset_path, training)
+    return training
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update a prior with new dataset rows")
+    parser.add_argument("kind", choices=sorted(DEFAULT_MODEL_PATHS))
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--dataset", default=None)
+    args = parser.parse_args()
+
+    train_incremental(args.model_path or DEFAULT_MODEL_PATHS[args.kind], args.dataset, args.kind)
@@ -8,6 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 from main_pipeline import diagnose, get_diagnosis_summary
 from tree_of_thoughts import get_tot
+from ensemble_predictor import get_ensemble
 
 
 def interactive_diagnosis(initial_symptoms, max_iterations=5, 
@@ -32,11 +33,13 @@ def interactive_diagnosis(initial_symptoms, max_iterations=5,
     print("\nStarting diagnosis...\n")
     
     current_symptoms = initial_symptoms.copy()
+    # Session keeps rule scores up to date incrementally between rounds
+    session = get_ensemble(alpha, beta).start_session(initial_symptoms)
     tot = get_tot()
     
     for iteration in range(max_iterations):
         # Get diagnosis
-        result = diagnose(current_symptoms, alpha=alpha, beta=beta)
+        result = diagnose(current_symptoms, alpha=alpha, beta=beta, session=session)
         
         # Check if we have high confidence
         if result['confidence'] == "high" and iteration >= 1:
@@ -81,10 +84,11 @@ def interactive_diagnosis(initial_symptoms, max_iterations=5,
         # Update symptoms based on answers
         for symptom, answer in answers.items():
             if answer in ['yes', 'y']:
-                # Add symptom to current list (will be normalized in next iteration)
+                # Add symptom to current list (and its canonical name to the session)
                 symptom_readable = symptom.replace("_", " ").lower()
                 if symptom_readable not in [s.lower() for s in current_symptoms]:
                     current_symptoms.append(symptom_readable)
+                    session.add_symptom(symptom)
         
         # Update tree with answers
         result['tree'] = tot.update_tree_with_answers(result['tree'], answers)
@@ -0,0 +1,173 @@
+"""
+Lexical symptom index
+Resolves typed symptom names (exact aliases, reordered words, small typos)
+to canonical symptoms without running the embedding model
+"""
+
+# Function words ignored when comparing token sets
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "to", "my", "i", "im",
+    "have", "has", "having", "feel", "feeling", "some", "with",
+}
+
+# Scores reported for each kind of lexical match
+EXACT_SCORE = 1.0
+TOKEN_SET_SCORE = 0.95
+
+
+def _collapse(text):
+    """Collapse runs of whitespace"""
+    return " ".join(text.split())
+
+
+def _token_key(text):
+    """Order-insensitive key over the content words of a phrase"""
+    tokens = {t for t in text.split() if t not in STOPWORDS}
+    return " ".join(sorted(tokens))
+
+
+def _deletes(term):
+    """All strings obtained by deleting one character from term"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent swaps)
+
+    Args:
+        a, b: Strings to compare
+        max_distance: Stop early once every alignment exceeds this
+
+    Returns:
+        Distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
+
+
+class LexicalIndex:
+    """
+    Exact, token-set and typo lookup over canonical symptom aliases
+
+    Typo candidates come from a single-deletion neighbourhood index
+    (SymSpell style), so a lookup touches only the handful of aliases that
+    share a deletion with the query rather than the whole vocabulary.
+    """
+
+    def __init__(self, canonical_symptoms, extra_aliases=None, max_edits=2,
+                 min_typo_length=4):
+        """
+        Args:
+            canonical_symptoms: Dict of canonical key -> list of alias strings
+            extra_aliases: Optional dict of canonical key -> list of synonym
+                phrases; matched exactly or by token set, but not indexed
+                for typos (keeps the deletion index small for large tables)
+            max_edits: Largest edit distance accepted for long queries
+            min_typo_length: Queries shorter than this must match exactly
+        """
+        self.max_edits = max_edits
+        self.min_typo_length = min_typo_length
+
+        self.exact = {}
+        self.token_sets = {}
+        self.deletes = {}
+
+        for key, aliases in canonical_symptoms.items():
+            for alias in [key.replace("_", " ").lower()] + list(aliases):
+                alias = _collapse(alias)
+                if not alias:
+                    continue
+                self._add(self.exact, alias, key)
+                self._add(self.token_sets, _token_key(alias), key)
+                for d in _deletes(alias):
+                    self.deletes.setdefault(d, set()).add(alias)
+
+        for key, phrases in (extra_aliases or {}).items():
+            for phrase in phrases:
+                phrase = _collapse(phrase)
+                if phrase:
+                    self._add(self.exact, phrase, key)
+                    self._add(self.token_sets, _token_key(phrase), key)
+
+        # Phrases shared by several canonical symptoms are ambiguous and
+        # left to the embedding model
+        self.exact = {k: v for k, v in self.exact.items() if v is not None}
+        self.token_sets = {k: v for k, v in self.token_sets.items() if v is not None}
+
+    @staticmethod
+    def _add(table, phrase, key):
+        if table.get(phrase, key) != key:
+            table[phrase] = None
+        else:
+            table[phrase] = key
+
+    def _allowed_edits(self, text):
+        if len(text) < self.min_typo_length:
+            return 0
+        if len(text) < 9:
+            return min(1, self.max_edits)
+        return self.max_edits
+
+    def lookup(self, text):
+        """
+        Resolve a cleaned symptom string
+
+        Args:
+            text: Lower-case symptom text (see SymptomNormalizer.clean_symptom)
+
+        Returns:
+            Tuple of (canonical_name, score) or (None, None)
+        """
+        text = _collapse(text)
+        if not text:
+            return None, None
+
+        if text in self.exact:
+            return self.exact[text], EXACT_SCORE
+
+        key = self.token_sets.get(_token_key(text))
+        if key:
+            return key, TOKEN_SET_SCORE
+
+        allowed = self._allowed_edits(text)
+        if allowed == 0:
+            return None, None
+
+        candidates = set(self.deletes.get(text, ()))
+        for d in _deletes(text):
+            if d in self.exact:
+                candidates.add(d)
+            candidates.update(self.deletes.get(d, ()))
+
+        best_distance = allowed + 1
+        best_keys = set()
+        for alias in candidates:
+            distance = edit_distance(text, alias, allowed)
+            if distance < best_distance:
+                best_distance = distance
+                best_keys = {self.exact.get(alias)}
+            elif distance == best_distance:
+                best_keys.add(self.exact.get(alias))
+
+        # Ties between different symptoms are left to the embedding model
+        if best_distance > allowed or len(best_keys) != 1 or None in best_keys:
+            return None, None
+
+        score = 1.0 - best_distance / max(len(text), 1)
+        return best_keys.pop(), round(score, 3)
@@ -9,20 +9,31 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from ensemble_predictor import get_ensemble
 from tree_of_thoughts import get_tot
+from symptom_extractor import extract_symptoms
 from rag_probability_explainer import build_probability_explanation
 
 
 def diagnose(user_input, age=None, sex=None, alpha=0.4, beta=0.6,
-             top_k=5, min_score=0.1, min_matches=2):
+             top_k=5, min_score=0.1, min_matches=2, session=None):
     """
     Main diagnosis function
+
+    user_input is a list of symptom strings, or raw free text from which
+    symptoms are extracted first. When an EnsembleSession holding the same
+    symptoms is given, its incrementally maintained scores are used.
     """
 
+    if isinstance(user_input, str):
+        user_input = sorted(extract_symptoms(user_input))
+
     # --------------------------------------------------
     # Ensemble prediction
     # --------------------------------------------------
-    ensemble = get_ensemble(alpha, beta)
-    ranked = ensemble.predict(user_input, min_score, min_matches)
+    if session is not None:
+        ranked = session.predict(min_score, min_matches)
+    else:
+        ensemble = get_ensemble(alpha, beta)
+        ranked = ensemble.predict(user_input, min_score, min_matches)
 
     # --------------------------------------------------
     # ⭐ Attach RAG probability justification (NEW)
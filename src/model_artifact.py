@@ -0,0 +1,252 @@
+"""
+Versioned model artifact directories
+A trained prior is saved as a directory holding a manifest (schema version,
+dataset hash, library versions, class and symptom lists) and the compiled
+tree arrays as .npy files that load with mmap, so every worker process maps
+the same pages instead of unpickling its own copy. The library estimator is
+kept alongside for retraining and is only loaded on demand.
+
+    models/rf_model/
+        manifest.json
+        trees/feature.npy, child_zero.npy, child_one.npy, value.npy, ...
+        estimator.pkl        (RandomForest)  or  booster.ubj  (XGBoost)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import platform
+import shutil
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(__file__))
+from embedding_store import file_digest
+from feature_builder import dataset_revision
+from tree_engine import ENGINE_VERSION, CompiledForest, compile_model, export_compiled
+
+SCHEMA_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+TREES_DIR = "trees"
+ESTIMATOR_FILES = {"rf": "estimator.pkl", "xgb": "booster.ubj"}
+
+
+def library_versions(kind):
+    """Versions of the libraries the estimator payload depends on"""
+    import sklearn
+    versions = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+    if kind == "xgb":
+        import xgboost
+        versions["xgboost"] = xgboost.__version__
+    return versions
+
+
+def is_artifact(path):
+    """Whether path is an artifact directory"""
+    return os.path.isfile(ModelArtifact.manifest_file(path))
+
+
+def resolve_model_path(model_path):
+    """
+    Locate a saved model
+
+    Args:
+        model_path: Artifact directory, or legacy pickle path. A directory
+            path without an artifact falls back to "<path>.pkl".
+
+    Returns:
+        Tuple of (path, is_artifact)
+    """
+    if is_artifact(model_path):
+        return model_path, True
+    if not os.path.isfile(model_path) and os.path.isfile(model_path + ".pkl"):
+        return model_path + ".pkl", False
+    return model_path, False
+
+
+def replace_directory(tmp_dir, out_dir):
+    """Swap a finished directory into place of out_dir"""
+    old_dir = None
+    if os.path.exists(out_dir):
+        old_dir = f"{out_dir.rstrip(os.sep)}.old-{os.getpid()}"
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def save_model_artifact(model, label_encoder, symptom_names, out_dir, dataset_path=None,
+                        training=None):
+    """
+    Write a trained model as an artifact directory
+
+    The directory is assembled next to out_dir and swapped in at the end,
+    so readers never see a half-written artifact.
+
+    Args:
+        model: Fitted RandomForestClassifier or XGBClassifier
+        label_encoder: LabelEncoder used for the training labels
+        symptom_names: Feature column names
+        out_dir: Artifact directory to create or replace
+        dataset_path: Training dataset (its sha256 and revision go in the
+            manifest)
+        training: How the model was trained, e.g. the incremental update
+            it came from (stored in the manifest as is)
+
+    Returns:
+        out_dir
+    """
+    kind = "xgb" if hasattr(model, "get_booster") else "rf"
+    compiled = compile_model(model)
+
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, TREES_DIR))
+
+    for name, array in compiled.arrays().items():
+        np.save(os.path.join(tmp_dir, TREES_DIR, f"{name}.npy"), np.ascontiguousarray(array))
+
+    estimator_file = ESTIMATOR_FILES[kind]
+    if kind == "xgb":
+        model.save_model(os.path.join(tmp_dir, estimator_file))
+    else:
+        with open(os.path.join(tmp_dir, estimator_file), "wb") as f:
+            pickle.dump(model, f)
+
+    # Per-file digests make the manifest's own digest identify the contents
+    files = {}
+    for root, _, names in os.walk(tmp_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, tmp_dir)] = file_digest(path)
+
+    manifest = {
+        "schema_version": SCHEMA_VERSION,
+        "kind": kind,
+        "dataset_sha256": file_digest(dataset_path) if dataset_path else None,
+        "dataset_revision": dataset_revision(dataset_path) if dataset_path else None,
+        "training": training or {"mode": "full"},
+        "library_versions": library_versions(kind),
+        "classes": np.asarray(label_encoder.classes_)[model.classes_].tolist(),
+        "symptom_names": list(symptom_names),
+        "engine": {
+            "version": ENGINE_VERSION,
+            "kind": compiled.kind,
+            "n_features": compiled.n_features,
+            "n_classes": compiled.n_classes,
+            "max_depth": compiled.max_depth,
+        },
+        "estimator": estimator_file,
+        "files": files,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    replace_directory(tmp_dir, out_dir)
+    print(f"Model artifact saved to: {out_dir}")
+    return out_dir
+
+
+def save_model(model, label_encoder, symptom_names, save_path, dataset_path=None,
+               training=None):
+    """
+    Save a trained prior: artifact directory, or legacy pickle for *.pkl paths
+
+    Returns:
+        save_path
+    """
+    if not save_path.endswith(".pkl"):
+        return save_model_artifact(model, label_encoder, symptom_names, save_path,
+                                   dataset_path, training)
+
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    with open(save_path, "wb") as f:
+        pickle.dump({
+            "model": model,
+            "label_encoder": label_encoder,
+            "symptom_names": symptom_names
+        }, f)
+    print(f"Model saved to: {save_path}")
+    export_compiled(model, save_path)
+    return save_path
+
+
+class ModelArtifact:
+    """A loaded artifact directory; tree arrays are memory-mapped"""
+
+    def __init__(self, artifact_dir, mmap_mode="r"):
+        """
+        Args:
+            artifact_dir: Directory written by save_model_artifact()
+            mmap_mode: np.load mmap mode for the tree arrays (None = read
+                into memory)
+        """
+        self.artifact_dir = artifact_dir
+        self.manifest_path = self.manifest_file(artifact_dir)
+        with open(self.manifest_path) as f:
+            self.manifest = json.load(f)
+
+        version = self.manifest.get("schema_version")
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported model artifact schema {version} in {artifact_dir}")
+
+        self.kind = self.manifest["kind"]
+        self.class_names = np.asarray(self.manifest["classes"])
+        self.symptom_names = self.manifest["symptom_names"]
+
+        engine = self.manifest["engine"]
+        if engine["version"] != ENGINE_VERSION:
+            raise ValueError(f"Tree arrays in {artifact_dir} need engine version "
+                             f"{engine['version']}")
+        trees_dir = os.path.join(artifact_dir, TREES_DIR)
+        arrays = {
+            name[:-len(".npy")]: np.load(os.path.join(trees_dir, name), mmap_mode=mmap_mode)
+            for name in os.listdir(trees_dir) if name.endswith(".npy")
+        }
+        self.compiled = CompiledForest(engine["kind"], engine["n_features"],
+                                       engine["n_classes"], engine["max_depth"], arrays)
+
+    @staticmethod
+    def manifest_file(artifact_dir):
+        """Manifest path; it is written last, so it changes with every save"""
+        return os.path.join(artifact_dir, MANIFEST_FILE)
+
+    def load_estimator(self):
+        """
+        Load the library estimator (for retraining or library inference)
+
+        Warns when the installed library versions differ from the ones that
+        wrote it; the compiled arrays do not depend on them. The estimator
+        file is checked against the digest in the manifest read at load
+        time, so an artifact swapped in since then is never paired with
+        this manifest's classes and symptoms.
+
+        Raises:
+            ValueError: The estimator file does not match the manifest
+        """
+        saved = self.manifest.get("library_versions", {})
+        current = library_versions(self.kind)
+        for lib in ("scikit-learn", "xgboost"):
+            if lib in saved and saved[lib] != current.get(lib):
+                print(f"Warning: {self.artifact_dir} was written with {lib} "
+                      f"{saved[lib]}, running {current.get(lib)}")
+
+        estimator_file = self.manifest["estimator"]
+        path = os.path.join(self.artifact_dir, estimator_file)
+        # Hash and load the same bytes
+        with open(path, "rb") as f:
+            payload = f.read()
+        if hashlib.sha256(payload).hexdigest() != self.manifest["files"].get(estimator_file):
+            raise ValueError(f"{path} does not match the manifest it was loaded with "
+                             f"(artifact replaced since); reload the artifact")
+
+        if self.kind == "xgb":
+            from xgboost import XGBClassifier
+            model = XGBClassifier()
+            model.load_model(bytearray(payload))
+            return model
+        return pickle.loads(payload)
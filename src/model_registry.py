@@ -0,0 +1,187 @@
+"""
+Registry of named disease prior models
+Loads priors (RF, XGB, distilled, or any PriorPredictor subclass) by artifact path and
+hot-swaps them when a new artifact is written. Replacements are loaded on a
+watcher thread and published with a single reference swap, so requests
+never wait on a reload and in-flight ones finish on the model they started
+with. Components built on the priors (the ensemble's rule profiles and
+answer table) subscribe to the watcher and are revalidated on it too.
+"""
+
+import os
+import sys
+import json
+import pickle
+import threading
+import weakref
+sys.path.insert(0, os.path.dirname(__file__))
+from normalization_cache import artifact_fingerprint
+from model_artifact import ModelArtifact, resolve_model_path
+from rf_predictor import RFPredictor
+from xgb_predictor import XGBPredictor
+from distilled_prior import DEFAULT_STUDENT_DIR, DistilledPrior
+
+PRIOR_CLASSES = {"rf": RFPredictor, "xgb": XGBPredictor, "distilled": DistilledPrior}
+
+DEFAULT_MODEL_PATHS = {
+    "rf": "models/rf_model",
+    "xgb": "models/xgb_model",
+    "distilled": DEFAULT_STUDENT_DIR,
+}
+
+
+def infer_kind(model_path):
+    """
+    Prior kind of a saved model: from the artifact manifest, or for legacy
+    pickles from the file name
+    """
+    path, is_artifact = resolve_model_path(model_path)
+    if is_artifact:
+        with open(ModelArtifact.manifest_file(path)) as f:
+            return json.load(f)["kind"]
+    return "xgb" if "xgb" in os.path.basename(path).lower() else "rf"
+
+
+class ModelRegistry:
+    """Named prior predictors with background hot-swap"""
+
+    def __init__(self, poll_interval=2.0):
+        """
+        Args:
+            poll_interval: Seconds between artifact checks of the watcher
+        """
+        self.poll_interval = poll_interval
+        self._models = {}
+        self._specs = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._failed = {}
+        self._subscribers = []
+        self.swaps = 0
+
+    def _load(self, path, kind):
+        return PRIOR_CLASSES[kind](path)
+
+    def register(self, name, model_path, kind=None):
+        """
+        Load a prior and publish it under name (replacing any previous one)
+
+        Args:
+            name: Registry name, e.g. "rf"
+            model_path: Artifact directory or legacy pickle path
+            kind: Key of PRIOR_CLASSES (default: read from the artifact)
+
+        Returns:
+            The loaded predictor
+        """
+        kind = kind or infer_kind(model_path)
+        if kind not in PRIOR_CLASSES:
+            raise ValueError(f"Unknown prior kind '{kind}' for {model_path}")
+        predictor = self._load(model_path, kind)
+        with self._lock:
+            self._specs[name] = (model_path, kind)
+            self._models[name] = predictor
+        return predictor
+
+    def get(self, name):
+        """
+        Current predictor for name; names with a default path are loaded
+        on first use
+
+        Raises:
+            KeyError: if name is neither registered nor a default prior
+        """
+        predictor = self._models.get(name)
+        if predictor is not None:
+            return predictor
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+        if name not in DEFAULT_MODEL_PATHS:
+            raise KeyError(f"No prior model registered as '{name}'")
+        return self.register(name, DEFAULT_MODEL_PATHS[name], name)
+
+    def names(self):
+        return list(self._models)
+
+    def subscribe(self, callback):
+        """
+        Call a bound method after every update check, on the watcher thread
+
+        Only a weak reference is kept: the subscription ends when the
+        method's object is garbage collected.
+        """
+        with self._lock:
+            self._subscribers.append(weakref.WeakMethod(callback))
+
+    def check_for_updates(self):
+        """
+        Reload every prior whose artifact changed and swap it in, then run
+        the subscribed callbacks
+
+        Returns:
+            Names that were swapped
+        """
+        swapped = []
+        for name, (model_path, kind) in list(self._specs.items()):
+            current = self._models[name]
+            fingerprint = artifact_fingerprint(current.artifact_file)
+            if fingerprint in (current.fingerprint, self._failed.get(name)):
+                continue
+            try:
+                replacement = self._load(model_path, kind)
+            except (OSError, EOFError, ValueError, KeyError, pickle.UnpicklingError) as e:
+                # Mid-write or removed: keep serving the current model and
+                # retry once the artifact changes again
+                print(f"Could not reload prior '{name}' from {model_path}: {e}")
+                self._failed[name] = fingerprint
+                continue
+            with self._lock:
+                if self._specs.get(name) == (model_path, kind):
+                    self._models[name] = replacement
+                    self.swaps += 1
+                    swapped.append(name)
+            print(f"Swapped in new '{name}' prior from {model_path}")
+
+        with self._lock:
+            self._subscribers = [ref for ref in self._subscribers if ref() is not None]
+            subscribers = list(self._subscribers)
+        for ref in subscribers:
+            callback = ref()
+            if callback is not None:
+                callback()
+        return swapped
+
+    def start_watching(self):
+        """Poll the registered artifacts on a daemon thread (idempotent)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name="model-registry-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check_for_updates()
+
+
+# Global instance
+_registry = None
+
+
+def get_registry():
+    """Get or create the global registry (its watcher is started)"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+        _registry.start_watching()
+    return _registry
@@ -0,0 +1,234 @@
+"""
+Cross-validated hyperparameter sweep for the RF and XGB priors
+Every (configuration, fold) pair is fitted in a process pool. The feature
+matrix is placed once in shared memory and attached by each worker, so only
+fold indices travel to the workers. Per configuration the fold means of
+top-k accuracy, log loss, fit time, served model size and single-row
+latency of the compiled trees are written to a CSV.
+
+dataset.csv repeats each symptom row many times, so by default identical
+rows are kept in the same fold: otherwise every test row also appears in the
+training folds and all configurations score the same.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.dirname(__file__))
+from feature_builder import build_features
+from tree_engine import compile_model
+
+DEFAULT_RESULTS_PATH = "models/sweep_results.csv"
+
+DEFAULT_GRIDS = {
+    "rf": {
+        "n_estimators": [50, 150, 300],
+        "max_depth": [None, 12],
+    },
+    "xgb": {
+        "n_estimators": [100, 250],
+        "max_depth": [3, 4, 6],
+    },
+}
+
+TOP_K = (1, 3, 5)
+LATENCY_ROWS = 100
+
+
+class SharedArray:
+    """A NumPy array copied into a named shared memory block"""
+
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.spec = (self.shm.name, array.shape, array.dtype.str)
+        np.ndarray(array.shape, array.dtype, buffer=self.shm.buf)[...] = array
+
+    @staticmethod
+    def attach(spec):
+        """
+        Map an array created in another process
+
+        Returns:
+            Tuple of (array view, SharedMemory handle to keep alive)
+        """
+        name, shape, dtype = spec
+        shm = shared_memory.SharedMemory(name=name)
+        return np.ndarray(shape, np.dtype(dtype), buffer=shm.buf), shm
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Per-worker views of the shared features (set by _init_worker)
+_worker = {}
+
+
+def _init_worker(X_spec, y_spec, n_classes, n_jobs):
+    _worker["X"], _worker["X_shm"] = SharedArray.attach(X_spec)
+    _worker["y"], _worker["y_shm"] = SharedArray.attach(y_spec)
+    _worker["n_classes"] = n_classes
+    _worker["n_jobs"] = n_jobs
+
+
+def parameter_grid(grid):
+    """Every combination of a {param: [values]} grid, as dicts"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def build_estimator(kind, params, n_classes, n_jobs):
+    """Prior estimator of the given kind, configured as its trainer does"""
+    if kind == "xgb":
+        import train_xgb_model
+        return train_xgb_model, train_xgb_model.build_classifier(n_classes, n_jobs=n_jobs, **params)
+    import train_rf_model
+    return train_rf_model, train_rf_model.build_classifier(n_jobs=n_jobs, **params)
+
+
+def single_row_latency(compiled, X):
+    """Median latency of one-row compiled predict_proba calls, in ms"""
+    times = []
+    for row in X[:LATENCY_ROWS]:
+        start = time.perf_counter()
+        compiled.predict_proba(row[None, :])
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def evaluate_fold(kind, params, fold, train_idx, test_idx, collapse=False):
+    """
+    Fit one configuration on one fold (runs in a worker)
+
+    Returns:
+        Dict of metrics for the fold
+    """
+    from sklearn.metrics import log_loss, top_k_accuracy_score
+
+    X, y, n_classes = _worker["X"], _worker["y"], _worker["n_classes"]
+    trainer, model = build_estimator(kind, params, n_classes, _worker["n_jobs"])
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
+
+    start = time.perf_counter()
+    if collapse:
+        model = trainer.fit_collapsed(model, X_train, y_train)
+    else:
+        model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    labels = np.arange(n_classes)
+    proba = np.zeros((len(X_test), n_classes))
+    proba[:, model.classes_] = model.predict_proba(X_test)
+    proba /= proba.sum(axis=1, keepdims=True)
+
+    compiled = compile_model(model)
+    result = {"kind": kind, **params, "fold": fold}
+    for k in TOP_K:
+        result[f"top{k}_acc"] = top_k_accuracy_score(y_test, proba, k=k, labels=labels)
+    result["log_loss"] = log_loss(y_test, proba, labels=labels)
+    result["fit_s"] = fit_s
+    result["size_kb"] = sum(a.nbytes for a in compiled.arrays().values()) / 1024
+    result["latency_ms"] = single_row_latency(compiled, X_test)
+    return result
+
+
+def run_sweep(kinds=("rf", "xgb"), grids=None, n_folds=5, workers=None,
+              dataset_path=None, out_path=DEFAULT_RESULTS_PATH, collapse=False,
+              group_duplicates=True, random_state=42):
+    """
+    Cross-validate every grid configuration of the given prior kinds
+
+    Args:
+        kinds: Prior kinds to sweep (keys of DEFAULT_GRIDS)
+        grids: {kind: {param: [values]}} overriding DEFAULT_GRIDS
+        n_folds: Stratified folds per configuration
+        workers: Worker processes (default: CPU count)
+        dataset_path: Path to dataset.csv
+        out_path: CSV written with one row per configuration
+        collapse: Fit each fold on collapsed duplicate rows
+        group_duplicates: Keep identical rows in the same fold, so test
+            folds only hold symptom patterns unseen in training
+        random_state: Fold shuffling seed
+
+    Returns:
+        DataFrame of fold-mean metrics per configuration
+    """
+    from sklearn.model_selection import StratifiedGroupKFold, StratifiedKFold
+
+    grids = {**DEFAULT_GRIDS, **(grids or {})}
+    X, y, _, label_encoder = build_features(dataset_path)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+
+    if group_duplicates:
+        groups = np.unique(np.column_stack([X, y]), axis=0, return_inverse=True)[1].ravel()
+        splitter = StratifiedGroupKFold(n_folds, shuffle=True, random_state=random_state)
+        folds = list(splitter.split(X, y, groups))
+    else:
+        splitter = StratifiedKFold(n_folds, shuffle=True, random_state=random_state)
+        folds = list(splitter.split(X, y))
+    tasks = [(kind, params, fold, train_idx, test_idx, collapse)
+             for kind in kinds
+             for params in parameter_grid(grids[kind])
+             for fold, (train_idx, test_idx) in enumerate(folds)]
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(tasks)))
+    # Inner estimator threads share the cores with the other workers
+    n_jobs = max(1, cpus // workers)
+    print(f"Sweeping {len(tasks) // n_folds} configurations x {n_folds} folds "
+          f"on {workers} workers ({n_jobs} threads each)...")
+
+    shared_X, shared_y = SharedArray(X), SharedArray(y)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(shared_X.spec, shared_y.spec, len(label_encoder.classes_), n_jobs)
+        ) as pool:
+            futures = [pool.submit(evaluate_fold, *task) for task in tasks]
+            fold_results = []
+            for i, future in enumerate(futures, 1):
+                fold_results.append(future.result())
+                if i % n_folds == 0:
+                    print(f"  {i // n_folds}/{len(tasks) // n_folds} configurations done")
+    finally:
+        shared_X.release()
+        shared_y.release()
+
+    # One row per configuration: fold means of every metric
+    per_fold = pd.DataFrame(fold_results)
+    param_cols = ["kind"] + sorted(set().union(*(grids[kind] for kind in kinds)))
+    summary = (per_fold.drop(columns="fold")
+               .groupby(param_cols, dropna=False, sort=False).mean().reset_index())
+    summary = summary.sort_values(["top1_acc", "latency_ms"], ascending=[False, True])
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    summary.to_csv(out_path, index=False)
+    print(f"Sweep results saved to: {out_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated prior hyperparameter sweep")
+    parser.add_argument("--kinds", nargs="+", default=["rf", "xgb"], choices=sorted(DEFAULT_GRIDS))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=DEFAULT_RESULTS_PATH)
+    parser.add_argument("--collapse", action="store_true",
+                        help="fit each fold on unique rows weighted by their copies")
+    parser.add_argument("--no-group-duplicates", dest="group_duplicates", action="store_false",
+                        help="let copies of a row fall into different folds")
+    args = parser.parse_args()
+
+    results = run_sweep(args.kinds, n_folds=args.folds, workers=args.workers,
+                        out_path=args.out, collapse=args.collapse,
+                        group_duplicates=args.group_duplicates)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
@@ -0,0 +1,219 @@
+"""
+Normalization cache
+Thread-safe LRU with hit/miss/eviction counters and an optional SQLite tier
+shared by every process (and restart) pointing at the same file. The LRU is
+also used by the prediction caches in front of the priors and rule scorer.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU mapping with usage statistics"""
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used) or default"""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        """Insert or refresh a value, evicting the least recently used entries"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Usage counters
+
+        Returns:
+            Dictionary with hits, misses, evictions, size, maxsize, hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def artifact_fingerprint(*paths):
+    """
+    Cheap change detector for files a cache depends on
+
+    Args:
+        paths: File paths (missing files are fingerprinted as None)
+
+    Returns:
+        Tuple of (inode, mtime_ns, size) per path; a file replaced by rename
+        changes inode even if the rest matches
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            fingerprint.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+
+class NormalizationCache:
+    """
+    Cache of free-text symptom -> best canonical match
+
+    Entries store the best (canonical_name, similarity) regardless of the
+    caller's threshold, so one entry serves every threshold. The namespace
+    (normally the normalizer's embedding key) keeps entries from different
+    models or vocabularies apart in the shared SQLite file.
+    """
+
+    def __init__(self, maxsize=5000, db_path=None, namespace=""):
+        """
+        Args:
+            maxsize: In-memory entry limit
+            db_path: SQLite file for the persistent tier (None = memory only)
+            namespace: Partition key for persistent entries
+        """
+        self.memory = LRUCache(maxsize)
+        self.db_path = db_path
+        self.namespace = namespace
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_errors = 0
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS normalization_cache ("
+                " namespace TEXT NOT NULL,"
+                " symptom TEXT NOT NULL,"
+                " canonical TEXT,"
+                " score REAL,"
+                " PRIMARY KEY (namespace, symptom))"
+            )
+            conn.commit()
+
+    def _connection(self):
+        """One SQLite connection per thread; WAL lets readers and a writer overlap"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, symptom):
+        """
+        Look up a cleaned symptom string
+
+        Returns:
+            Tuple of (canonical_name, similarity_score) or None if not cached
+        """
+        match = self.memory.get(symptom)
+        if match is not None or not self.db_path:
+            return match
+
+        try:
+            row = self._connection().execute(
+                "SELECT canonical, score FROM normalization_cache"
+                " WHERE namespace = ? AND symptom = ?",
+                (self.namespace, symptom),
+            ).fetchone()
+        except sqlite3.Error:
+            self._count("disk_errors")
+            return None
+
+        if row is None:
+            self._count("disk_misses")
+            return None
+
+        self._count("disk_hits")
+        match = (row[0], row[1])
+        self.memory.put(symptom, match)
+        return match
+
+    def put(self, symptom, match):
+        """
+        Store the best match for a cleaned symptom string
+
+        Args:
+            symptom: Cleaned symptom text
+            match: Tuple of (canonical_name, similarity_score)
+        """
+        self.memory.put(symptom, match)
+        if not self.db_path:
+            return
+
+        # The persistent tier is best effort: a locked or read-only file
+        # must not fail the request
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO normalization_cache"
+                " (namespace, symptom, canonical, score) VALUES (?, ?, ?, ?)",
+                (self.namespace, symptom, match[0], match[1]),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            self._count("disk_errors")
+
+    def clear(self):
+        """Drop in-memory entries (the persistent tier is left untouched)"""
+        self.memory.clear()
+
+    def stats(self):
+        """
+        Usage counters for both tiers
+
+        Returns:
+            Dictionary of in-memory LRU stats plus disk_hits, disk_misses
+            and disk_errors
+        """
+        stats = self.memory.stats()
+        stats.update({
+            "disk_hits": self.disk_hits,
+            "disk_misses": self.disk_misses,
+            "disk_errors": self.disk_errors,
+        })
+        return stats
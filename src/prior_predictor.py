@@ -0,0 +1,299 @@
+"""
+Shared inference for the tree-ensemble disease priors
+RFPredictor and XGBPredictor differ only in the model they load and how
+strongly they soften its probabilities
+"""
+
+import pickle
+import numpy as np
+from scipy import sparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+from symptom_normalizer import prepare_symptoms
+from tree_engine import CompiledForest, compile_model, compiled_path_for
+from normalization_cache import LRUCache, artifact_fingerprint
+from model_artifact import ModelArtifact, resolve_model_path
+
+
+class PriorPredictor:
+    """
+    Base class for disease prior models over binary symptom features
+
+    A predictor serves the artifact it was loaded from and is not modified
+    afterwards, so its prediction cache can never mix two models. Picking up
+    a new artifact means loading a new predictor: the model registry does
+    that on its watcher thread and swaps the reference.
+    """
+
+    # Exponent applied to raw probabilities before renormalizing (< 1 softens)
+    softening = 1.0
+
+    # Whether the model may be fed CSR input (XGBoost reads absent sparse
+    # entries as missing rather than 0, which changes its predictions)
+    supports_sparse = True
+
+    def __init__(self, model_path, use_compiled=True, cache_size=1024):
+        """
+        Load a trained model
+
+        Args:
+            model_path: Artifact directory, or legacy pickle path
+            use_compiled: Evaluate the trees with the compiled array engine
+                instead of the library predict_proba
+            cache_size: Symptom sets whose probabilities are memoized
+                (0 disables the cache)
+        """
+        self.model_path = model_path
+        self.use_compiled = use_compiled
+        self.cache = LRUCache(cache_size) if cache_size else None
+        self._load_model()
+
+    def _load_model(self):
+        """Load the model artifact and everything derived from it"""
+        path, is_artifact = resolve_model_path(self.model_path)
+        if is_artifact:
+            self._load_artifact(path)
+        else:
+            self._load_pickle(path)
+
+        # Create symptom index map for fast lookup
+        self.symptom_to_idx = {symptom: idx for idx, symptom in enumerate(self.symptom_names)}
+
+    def _load_artifact(self, path):
+        """
+        Artifact directory: mmap the compiled trees and defer the estimator,
+        or load the estimator now when it serves the predictions (a later
+        lazy load could see an artifact swapped in since the manifest)
+        """
+        fingerprint = artifact_fingerprint(ModelArtifact.manifest_file(path))
+        artifact = ModelArtifact(path)
+
+        self.fingerprint = fingerprint
+        self.artifact = artifact
+        self.artifact_file = artifact.manifest_path
+        self._model = None
+        # Only kept for legacy pickles; class_names carries the labels
+        self.label_encoder = None
+        self.symptom_names = artifact.symptom_names
+        self.class_names = artifact.class_names
+        self.compiled = artifact.compiled if self.use_compiled else None
+        if self.compiled is None:
+            self._model = artifact.load_estimator()
+
+    def _load_pickle(self, path):
+        """Legacy pickle holding the model, label encoder and symptom names"""
+        fingerprint = artifact_fingerprint(path)
+        with open(path, 'rb') as f:
+            model_data = pickle.load(f)
+
+        self.fingerprint = fingerprint
+        self.artifact = None
+        self.artifact_file = path
+
+        self._model = model_data['model']
+        self.label_encoder = model_data['label_encoder']
+        self.symptom_names = model_data['symptom_names']
+
+        # Disease name per probability column, resolved once
+        self.class_names = np.asarray(self.label_encoder.classes_)[self._model.classes_]
+
+        self.compiled = self._load_compiled() if self.use_compiled else None
+
+    @property
+    def model(self):
+        """Library estimator (loaded from the artifact on first use)"""
+        if self._model is None:
+            self._model = self.artifact.load_estimator()
+        return self._model
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the prediction cache (None if disabled)"""
+        return self.cache.stats() if self.cache is not None else None
+
+    def symptom_bitmask(self, normalized):
+        """Integer bitmask of the symptoms the model knows, over symptom_names"""
+        mask = 0
+        for s in normalized:
+            idx = self.symptom_to_idx.get(s)
+            if idx is not None:
+                mask |= 1 << idx
+        return mask
+
+    def _load_compiled(self):
+        """
+        Compiled trees saved by the trainer, or compiled now if that file is
+        missing or older than the pickle
+        """
+        path = compiled_path_for(self.artifact_file)
+        compiled = None
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(self.artifact_file):
+            compiled = CompiledForest.load(path)
+        if compiled is None or compiled.n_classes != len(self.class_names):
+            compiled = compile_model(self.model)
+        return compiled
+
+    def _model_proba(self, X):
+        """Raw class probabilities for a feature matrix"""
+        if self.compiled is None:
+            return self.model.predict_proba(X)
+        if sparse.issparse(X):
+            X = X.toarray()
+        return self.compiled.predict_proba(X)
+
+    def _soften(self, probs):
+        """Apply the softening exponent and renormalize (rows of a 2-D array)"""
+        probs = probs ** self.softening
+        return probs / probs.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, user_symptoms):
+        """
+        Softened probabilities aligned with class_names
+
+        Args:
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
+
+        Returns:
+            1-D probability array (read-only when cached), or None if no
+            symptom is known to the model
+        """
+        # Normalize symptoms (no-op for NormalizedSymptoms)
+        normalized = prepare_symptoms(user_symptoms)
+
+        if self.cache is None:
+            return self._compute_proba(normalized)
+
+        # Symptoms outside the model vocabulary cannot change its output,
+        # so the key only covers known ones
+        key = self.symptom_bitmask(normalized)
+        probs = self.cache.get(key, False)
+        if probs is False:
+            probs = self._compute_proba(normalized)
+            if probs is not None:
+                # Shared between callers: read-only
+                probs.setflags(write=False)
+            self.cache.put(key, probs)
+        return probs
+
+    def _compute_proba(self, normalized):
+        """Uncached predict_proba()"""
+        feature_vector = normalized.feature_vector(self.symptom_to_idx)
+
+        if feature_vector.sum() == 0:
+            return None
+
+        probs = self._model_proba(feature_vector[None, :])[0]
+        return self._soften(probs)
+
+    def feature_matrix(self, symptom_sets, as_sparse=False):
+        """
+        Binary feature matrix for many patients
+
+        Args:
+            symptom_sets: List of NormalizedSymptoms or symptom string lists
+            as_sparse: Return a CSR matrix instead of a dense array
+
+        Returns:
+            (len(symptom_sets), n_symptoms) matrix
+        """
+        rows, cols = [], []
+        for row, symptoms in enumerate(symptom_sets):
+            for s in prepare_symptoms(symptoms):
+                col = self.symptom_to_idx.get(s)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+
+        shape = (len(symptom_sets), len(self.symptom_names))
+        if as_sparse:
+            return sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        X = np.zeros(shape)
+        X[rows, cols] = 1
+        return X
+
+    def predict_many(self, symptom_sets, chunk_size=None, as_sparse=False):
+        """
+        Softened probabilities for many patients in batched predict_proba calls
+
+        Args:
+            symptom_sets: List of NormalizedSymptoms or symptom string lists
+            chunk_size: Rows per predict_proba call (None = all at once);
+                bounds the feature matrix memory
+            as_sparse: Feed the model CSR chunks (ignored for models that do
+                not support it)
+
+        Returns:
+            (len(symptom_sets), n_classes) array with columns aligned to
+            class_names; rows with no known symptom are all zero (predict()
+            returns {} for them)
+        """
+        as_sparse = as_sparse and self.supports_sparse
+        n = len(symptom_sets)
+        out = np.zeros((n, len(self.class_names)))
+        chunk_size = chunk_size or max(n, 1)
+
+        for start in range(0, n, chunk_size):
+            X = self.feature_matrix(symptom_sets[start:start + chunk_size], as_sparse)
+            row_sums = np.asarray(X.sum(axis=1)).ravel()
+            present = np.flatnonzero(row_sums > 0)
+            if len(present) == 0:
+                continue
+            probs = self._model_proba(X[present])
+            out[start + present] = self._soften(probs)
+
+        return out
+
+    def predict_arrays(self, user_symptoms, k=None):
+        """
+        Top-k predictions as arrays
+
+        Args:
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
+            k: Number of classes to return (None = all)
+
+        Returns:
+            Tuple of (class_indices, probabilities), best first; index into
+            class_names for disease names. Empty arrays if no symptom matched.
+        """
+        probs = self.predict_proba(user_symptoms)
+        if probs is None or (k is not None and k <= 0):
+            return np.array([], dtype=np.int64), np.array([])
+
+        if k is None or k >= len(probs):
+            top = np.argsort(-probs, kind="stable")
+        else:
+            # Everything tied with the k-th best, then a stable sort, so
+            # ties break by class order exactly as the full sort does
+            kth = np.partition(probs, len(probs) - k)[len(probs) - k]
+            top = np.flatnonzero(probs >= kth)
+            top = top[np.argsort(-probs[top], kind="stable")][:k]
+        return top, probs[top]
+
+    def predict(self, user_symptoms):
+        """
+        Predict disease probabilities for given symptoms
+
+        Args:
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
+                (will be normalized)
+
+        Returns:
+            Dictionary mapping disease names to probabilities, sorted by
+            probability (empty if no symptom matched)
+        """
+        indices, probs = self.predict_arrays(user_symptoms)
+        return dict(zip(self.class_names[indices].tolist(), probs.tolist()))
+
+    def predict_top_k(self, user_symptoms, k=5):
+        """
+        Get top K disease predictions
+
+        Args:
+            user_symptoms: List of symptom strings
+            k: Number of top predictions to return
+
+        Returns:
+            List of tuples (disease, probability) sorted by probability
+        """
+        indices, probs = self.predict_arrays(user_symptoms, k)
+        return list(zip(self.class_names[indices].tolist(), probs.tolist()))
@@ -4,16 +4,329 @@ Uses medical knowledge (severity weights) to score diseases
 """
 
 import pandas as pd
+import numpy as np
+from scipy import sparse
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
-from symptom_normalizer import get_normalizer
+from symptom_normalizer import get_normalizer, NormalizedSymptoms
+from normalization_cache import LRUCache, artifact_fingerprint
+
+# Generic symptoms (less important)
+GENERIC_SYMPTOMS = frozenset({"HIGH_FEVER", "FATIGUE", "HEADACHE"})
+
+
+class CompiledProfiles:
+    """
+    Disease profiles and severity weights compiled for vectorized scoring
+    
+    One instance per revision of the dataset and severity files, never
+    modified once built: RuleBasedScorer swaps in a new instance with a
+    single reference assignment. A request or session that holds an instance
+    therefore scores, indexes disease_names and reads profiles from the same
+    revision throughout. The score cache lives on the instance, so it never
+    serves results of another revision.
+    """
+    
+    def __init__(self, disease_profiles, severity_map, generic_symptoms=GENERIC_SYMPTOMS,
+                 fingerprint=None, cache_size=1024):
+        """
+        Args:
+            disease_profiles: Dict of disease -> list of canonical symptoms
+            severity_map: Dict of canonical symptom -> severity weight
+            generic_symptoms: Symptoms whose weight is reduced by 70%
+            fingerprint: artifact_fingerprint() of the files they came from
+            cache_size: Scoring outputs memoized (0 disables the cache)
+        """
+        self.disease_profiles = disease_profiles
+        self.severity_map = severity_map
+        self.generic_symptoms = frozenset(generic_symptoms)
+        self.fingerprint = fingerprint
+        
+        # Memoized score_all()/rank()/score_arrays() outputs
+        self.cache = LRUCache(cache_size) if cache_size else None
+        
+        self._compile()
+    
+    def symptom_weight(self, symptom):
+        """Severity weight of a canonical symptom, with the generic penalty applied"""
+        w = self.severity_map.get(symptom, 1)
+        
+        # Generic symptom penalty
+        if symptom in self.generic_symptoms:
+            w *= 0.3  # Reduce weight by 70%
+        return w
+    
+    def _compile(self):
+        """
+        Compile disease_profiles and severity_map into sparse matrices
+        
+        weight_matrix[d, s] holds the (generic-penalized) weight of symptom s
+        in disease d and profile_matrix[d, s] is 1 where s is in the profile.
+        Per-disease totals and profile sizes are precomputed.
+        """
+        self.disease_names = list(self.disease_profiles)
+        self.disease_to_idx = {d: i for i, d in enumerate(self.disease_names)}
+        self.symptom_names = sorted({
+            s for symptoms in self.disease_profiles.values() for s in symptoms
+        })
+        self.symptom_to_idx = {s: i for i, s in enumerate(self.symptom_names)}
+        
+        rows, cols, weights = [], [], []
+        for d, disease in enumerate(self.disease_names):
+            for s in self.disease_profiles[disease]:
+                rows.append(d)
+                cols.append(self.symptom_to_idx[s])
+                weights.append(self.symptom_weight(s))
+        
+        shape = (len(self.disease_names), len(self.symptom_names))
+        self.weight_matrix = sparse.csr_matrix(
+            (np.array(weights, dtype=np.float64), (rows, cols)), shape=shape
+        )
+        self.profile_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=shape
+        )
+        self.total_weights = np.asarray(self.weight_matrix.sum(axis=1)).ravel()
+        self.profile_sizes = np.diff(self.profile_matrix.indptr)
+        
+        # Inverted index: column j of the CSC form lists the diseases
+        # containing symptom j together with its weight in each
+        self.postings = self.weight_matrix.tocsc()
+        self.postings.sort_indices()
+        
+        for array in (self.total_weights, self.profile_sizes, self.weight_matrix.data,
+                      self.profile_matrix.data, self.postings.data):
+            array.setflags(write=False)
+    
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the score cache (None if disabled)"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def symptom_bitmask(self, normalized):
+        """Integer bitmask of the profile symptoms present, over symptom_names"""
+        mask = 0
+        for s in normalized:
+            idx = self.symptom_to_idx.get(s)
+            if idx is not None:
+                mask |= 1 << idx
+        return mask
+    
+    def _cached(self, kind, normalized, min_score, min_matches, compute):
+        """
+        Memoize a scoring output on the symptom bitmask and filters
+        
+        Symptoms outside every profile cannot change any score, so they are
+        not part of the key. Callers get their own copy of the matched and
+        missing lists (downstream code appends to them).
+        """
+        if self.cache is None:
+            return compute()
+        
+        key = (kind, self.symptom_bitmask(normalized), min_score, min_matches)
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.put(key, result)
+        return _copy_result(result)
+    
+    def symptom_vector(self, normalized):
+        """Binary indicator vector of canonical symptoms over symptom_names"""
+        if isinstance(normalized, NormalizedSymptoms):
+            return normalized.feature_vector(self.symptom_to_idx)
+        
+        x = np.zeros(len(self.symptom_names))
+        for s in normalized:
+            idx = self.symptom_to_idx.get(s)
+            if idx is not None:
+                x[idx] = 1
+        return x
+    
+    def score_vector(self, normalized):
+        """
+        Score every disease with one sparse matrix-vector product
+        
+        Args:
+            normalized: Set of canonical symptom names
+        
+        Returns:
+            Tuple of (scores, match_counts), arrays aligned with disease_names
+        """
+        x = self.symptom_vector(normalized)
+        matched_weight = self.weight_matrix @ x
+        match_counts = self.profile_matrix @ x
+        return self._combine(matched_weight, match_counts, slice(None)), match_counts
+    
+    def candidate_scores(self, normalized, min_score=0.0, min_matches=1):
+        """
+        Score only the diseases reachable from the user's symptoms
+        
+        Candidates come from the inverted index with their hit counts.
+        Diseases below min_matches, or whose best possible score (every
+        profile weight matched) is below min_score, are dropped before any
+        weighting, so the cost grows with the number of candidates rather
+        than the number of diseases.
+        
+        Args:
+            normalized: Set of canonical symptom names
+            min_score: Minimum score to keep
+            min_matches: Minimum matched symptoms to keep (at least 1)
+        
+        Returns:
+            Tuple of (disease_indices, scores, match_counts) for survivors
+        """
+        cols = [self.symptom_to_idx[s] for s in normalized if s in self.symptom_to_idx]
+        empty = np.array([], dtype=np.int64)
+        if not cols:
+            return empty, np.array([]), np.array([])
+        
+        indptr = self.postings.indptr
+        diseases = np.concatenate([self.postings.indices[indptr[j]:indptr[j + 1]] for j in cols])
+        weights = np.concatenate([self.postings.data[indptr[j]:indptr[j + 1]] for j in cols])
+        
+        candidates, inverse = np.unique(diseases, return_inverse=True)
+        counts = np.bincount(inverse)
+        
+        # Prune on hit count, then on the score upper bound for that count
+        sizes = self.profile_sizes[candidates]
+        upper_bound = 1 - 0.3 * (sizes - counts) / sizes
+        keep = (counts >= max(min_matches, 1)) & (upper_bound >= min_score)
+        if not keep.any():
+            return empty, np.array([]), np.array([])
+        
+        # Weight only the postings of surviving candidates
+        mask = keep[inverse]
+        matched_weight = np.bincount(
+            inverse[mask], weights=weights[mask], minlength=len(candidates)
+        )[keep]
+        candidates = candidates[keep]
+        counts = counts[keep]
+        
+        scores = self._combine(matched_weight, counts, candidates)
+        passing = scores >= min_score
+        return candidates[passing], scores[passing], counts[passing]
+    
+    def _filter_scores(self, normalized, min_score, min_matches):
+        """Disease indices and scores passing both filters"""
+        diseases, scores, _ = self._filter_arrays(normalized, min_score, min_matches)
+        return diseases, scores
+    
+    def _filter_arrays(self, normalized, min_score, min_matches):
+        """Disease indices, scores and match counts passing both filters"""
+        if min_matches >= 1 or min_score > 0:
+            return self.candidate_scores(normalized, min_score, min_matches)
+        
+        # Every disease qualifies: one product over the full matrix
+        scores, counts = self.score_vector(normalized)
+        return np.arange(len(scores)), scores, counts
+    
+    def score_arrays(self, normalized, min_score=0.0, min_matches=0):
+        """RuleBasedScorer.score_arrays() for a canonical symptom set"""
+        def compute():
+            arrays = self._filter_arrays(normalized, min_score, min_matches)
+            for array in arrays:
+                array.setflags(write=False)
+            return arrays
+        
+        return self._cached("arrays", normalized, min_score, min_matches, compute)
+    
+    def _combine(self, matched_weight, match_counts, diseases):
+        """Base score times the missing-symptom penalty for the given diseases"""
+        totals = self.total_weights[diseases]
+        sizes = self.profile_sizes[diseases]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            base = np.where(totals > 0, matched_weight / totals, 0.0)
+            missing_ratio = np.where(sizes > 0, (sizes - match_counts) / sizes, 0.0)
+        return base * (1 - 0.3 * missing_ratio)
+    
+    def matched_missing(self, disease, normalized):
+        """Split a disease profile into matched and missing symptoms"""
+        matched = []
+        missing = []
+        for s in self.disease_profiles[disease]:
+            if s in normalized:
+                matched.append(s)
+            else:
+                missing.append(s)
+        return matched, missing
+    
+    def score_disease(self, disease, user_symptoms):
+        """RuleBasedScorer.score_disease() for a canonical symptom set"""
+        if disease not in self.disease_profiles:
+            return 0, [], []
+        
+        d = self.disease_to_idx[disease]
+        if self.total_weights[d] == 0:
+            return 0, [], []
+        
+        matched, missing = self.matched_missing(disease, user_symptoms)
+        matched_weight = sum(self.symptom_weight(s) for s in matched)
+        score = self._combine(matched_weight, len(matched), d)
+        
+        return float(score), matched, missing
+    
+    def score_all(self, normalized, min_score=0.0, min_matches=0):
+        """RuleBasedScorer.score_all_diseases() for a canonical symptom set"""
+        def compute():
+            diseases, scores = self._filter_scores(normalized, min_score, min_matches)
+            return self._score_details(diseases, scores, normalized)
+        
+        return self._cached("all", normalized, min_score, min_matches, compute)
+    
+    def _score_details(self, diseases, scores, normalized):
+        """score_all_diseases() output for the given disease indices"""
+        disease_scores = {}
+        for d, score in zip(diseases, scores):
+            disease = self.disease_names[d]
+            matched, missing = self.matched_missing(disease, normalized)
+            disease_scores[disease] = {
+                'score': float(score),
+                'matched': matched,
+                'missing': missing
+            }
+        
+        return disease_scores
+    
+    def rank(self, normalized, min_score=0.1, min_matches=2):
+        """RuleBasedScorer.rank_diseases() for a canonical symptom set"""
+        # Safety check
+        if len(normalized) < min_matches:
+            return []
+        
+        def compute():
+            diseases, scores = self._filter_scores(normalized, min_score, min_matches)
+            return self._ranked_results(diseases, scores, normalized)
+        
+        return self._cached("rank", normalized, min_score, min_matches, compute)
+    
+    def _ranked_results(self, diseases, scores, normalized):
+        """rank_diseases() output for the given disease indices"""
+        results = []
+        for d, score in zip(diseases, scores):
+            disease = self.disease_names[d]
+            matched, missing = self.matched_missing(disease, normalized)
+            results.append({
+                "disease": disease,
+                "score": round(float(score), 3),
+                "matched_symptoms": matched,
+                "missing_symptoms": missing
+            })
+        
+        return sorted(results, key=lambda x: x["score"], reverse=True)
 
 
 class RuleBasedScorer:
-    """Rule-based disease scoring using severity weights"""
+    """
+    Rule-based disease scoring using severity weights
     
-    def __init__(self, dataset_path=None, severity_path=None):
+    The compiled profiles are held in one CompiledProfiles instance
+    (self.profiles); its attributes (disease_names, weight_matrix, ...) are
+    readable on the scorer too. refresh() builds a replacement off to the
+    side and swaps it in; scoring calls never reload. Callers that index
+    disease_names with returned indices should take self.profiles once and
+    use it throughout.
+    """
+    
+    def __init__(self, dataset_path=None, severity_path=None, cache_size=1024):
         # Handle default paths
         if dataset_path is None:
             if os.path.exists("data/dataset.csv"):
@@ -31,25 +344,85 @@ class RuleBasedScorer:
             else:
                 raise FileNotFoundError("Could not find Symptom-severity.csv")
         
+        self.dataset_path = dataset_path
+        self.severity_path = severity_path
         self.normalizer = get_normalizer(dataset_path)
-        self.df_disease = pd.read_csv(dataset_path)
-        self.df_severity = pd.read_csv(severity_path)
+        self.cache_size = cache_size
+        
+        # Generic symptoms (less important)
+        self.GENERIC_SYMPTOMS = set(GENERIC_SYMPTOMS)
         
-        # Build disease profiles
-        self._build_disease_profiles()
+        self.profiles = self.load_profiles()
+    
+    def __getattr__(self, name):
+        # Compiled data (disease_names, symptom_to_idx, ...) of the current profiles
+        if name == "profiles":
+            raise AttributeError(name)
+        return getattr(self.profiles, name)
+    
+    def load_profiles(self):
+        """
+        Read the dataset and severity files and compile them
         
-        # Build severity map
-        self._build_severity_map()
+        Returns:
+            A new CompiledProfiles (the current one is not touched)
+        """
+        fingerprint = artifact_fingerprint(self.dataset_path, self.severity_path)
+        df_disease = pd.read_csv(self.dataset_path)
+        df_severity = pd.read_csv(self.severity_path)
         
-        # Generic symptoms (less important)
-        self.GENERIC_SYMPTOMS = {"HIGH_FEVER", "FATIGUE", "HEADACHE"}
+        return CompiledProfiles(
+            self._build_disease_profiles(df_disease),
+            self._build_severity_map(df_severity),
+            self.GENERIC_SYMPTOMS, fingerprint, self.cache_size,
+        )
+    
+    def is_stale(self):
+        """Whether the dataset or severity file changed since the profiles were built"""
+        return artifact_fingerprint(self.dataset_path, self.severity_path) != self.profiles.fingerprint
     
-    def _build_disease_profiles(self):
+    def refresh(self):
+        """
+        Reload the profiles if the dataset or severity file changed on disk
+        
+        Meant for a background thread (the model registry watcher): the new
+        profiles are built while requests keep using the current ones.
+        
+        Returns:
+            True if new profiles were swapped in
+        """
+        if not self.is_stale():
+            return False
+        self.profiles = self.load_profiles()
+        return True
+    
+    def compile_profiles(self, disease_profiles=None, severity_map=None):
+        """
+        Recompile and swap in the profiles, e.g. after changing GENERIC_SYMPTOMS
+        
+        Args:
+            disease_profiles: Replacement disease -> symptoms dict (default:
+                the current profiles)
+            severity_map: Replacement symptom -> weight dict (default: the
+                current weights)
+        """
+        current = self.profiles
+        self.profiles = CompiledProfiles(
+            dict(current.disease_profiles if disease_profiles is None else disease_profiles),
+            dict(current.severity_map if severity_map is None else severity_map),
+            self.GENERIC_SYMPTOMS, current.fingerprint, self.cache_size,
+        )
+    
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the score cache (None if disabled)"""
+        return self.profiles.cache_stats()
+    
+    def _build_disease_profiles(self, df_disease):
         """Build dictionary of disease -> list of canonical symptoms"""
-        symptom_cols = [c for c in self.df_disease.columns if "Symptom" in c]
+        symptom_cols = [c for c in df_disease.columns if "Symptom" in c]
         
-        self.disease_profiles = {}
-        for _, row in self.df_disease.iterrows():
+        disease_profiles = {}
+        for _, row in df_disease.iterrows():
             disease = row["Disease"]
             symptoms = []
             
@@ -60,26 +433,44 @@ class RuleBasedScorer:
                         symptoms.append(canon)
             
             # Use set to remove duplicates, then convert back to list
-            if disease not in self.disease_profiles:
-                self.disease_profiles[disease] = set()
-            self.disease_profiles[disease].update(symptoms)
+            if disease not in disease_profiles:
+                disease_profiles[disease] = set()
+            disease_profiles[disease].update(symptoms)
         
         # Convert sets to lists
-        self.disease_profiles = {
-            k: list(v) for k, v in self.disease_profiles.items()
+        disease_profiles = {
+            k: list(v) for k, v in disease_profiles.items()
         }
         
-        print(f"Built profiles for {len(self.disease_profiles)} diseases")
+        print(f"Built profiles for {len(disease_profiles)} diseases")
+        return disease_profiles
     
-    def _build_severity_map(self):
+    def _build_severity_map(self, df_severity):
         """Build mapping from canonical symptom to severity weight"""
-        self.severity_map = {}
-        for _, row in self.df_severity.iterrows():
+        severity_map = {}
+        for _, row in df_severity.iterrows():
             canon, _ = self.normalizer.normalize_symptom(row["Symptom"])
             if canon:
-                self.severity_map[canon] = row["weight"]
+                severity_map[canon] = row["weight"]
+        
+        print(f"Loaded severity weights for {len(severity_map)} symptoms")
+        return severity_map
+    
+    def score_arrays(self, user_symptoms, min_score=0.0, min_matches=0):
+        """
+        Filtered scores as aligned arrays, without matched/missing lists
         
-        print(f"Loaded severity weights for {len(self.severity_map)} symptoms")
+        Args:
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
+            min_score: Drop diseases scoring below this
+            min_matches: Drop diseases with fewer matched symptoms
+        
+        Returns:
+            Tuple of read-only (disease_indices, scores, match_counts)
+            arrays; indices point into disease_names
+        """
+        normalized = self.normalizer.prepare(user_symptoms)
+        return self.profiles.score_arrays(normalized, min_score, min_matches)
     
     def score_disease(self, disease, user_symptoms):
         """
@@ -92,103 +483,162 @@ class RuleBasedScorer:
         Returns:
             Tuple of (score, matched_symptoms, missing_symptoms)
         """
-        if disease not in self.disease_profiles:
-            return 0, [], []
-        
-        disease_symptoms = self.disease_profiles[disease]
-        
-        total_weight = 0
-        matched_weight = 0
-        matched = []
-        missing = []
-        
-        for s in disease_symptoms:
-            w = self.severity_map.get(s, 1)
-            
-            # Generic symptom penalty
-            if s in self.GENERIC_SYMPTOMS:
-                w *= 0.3  # Reduce weight by 70%
-            
-            total_weight += w
-            
-            if s in user_symptoms:
-                matched_weight += w
-                matched.append(s)
-            else:
-                missing.append(s)
-        
-        if total_weight == 0:
-            return 0, [], []
-        
-        # Base score
-        score = matched_weight / total_weight
-        
-        # Missing symptom penalty
-        if len(matched) + len(missing) > 0:
-            missing_ratio = len(missing) / (len(matched) + len(missing))
-            score *= (1 - 0.3 * missing_ratio)
-        
-        return score, matched, missing
+        return self.profiles.score_disease(disease, user_symptoms)
     
-    def score_all_diseases(self, user_symptoms):
+    def score_all_diseases(self, user_symptoms, min_score=0.0, min_matches=0):
         """
         Score all diseases
         
         Args:
-            user_symptoms: List of symptom strings (will be normalized)
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
+                (will be normalized)
+            min_score: Drop diseases scoring below this
+            min_matches: Drop diseases with fewer matched symptoms
         
         Returns:
-            Dictionary mapping disease names to scores
+            Dictionary mapping disease names to scores (matched/missing lists
+            are only built for diseases that pass the filters)
         """
-        # Normalize symptoms
-        normalized = self.normalizer.normalize_symptoms(user_symptoms)
-        
-        disease_scores = {}
-        for disease in self.disease_profiles:
-            score, matched, missing = self.score_disease(disease, normalized)
-            disease_scores[disease] = {
-                'score': score,
-                'matched': matched,
-                'missing': missing
-            }
-        
-        return disease_scores
+        # Normalize symptoms (no-op for NormalizedSymptoms)
+        normalized = self.normalizer.prepare(user_symptoms)
+        return self.profiles.score_all(normalized, min_score, min_matches)
     
     def rank_diseases(self, user_symptoms, min_score=0.1, min_matches=2):
         """
         Rank diseases by rule-based score
         
         Args:
-            user_symptoms: List of symptom strings
+            user_symptoms: NormalizedSymptoms, or list of symptom strings
             min_score: Minimum score to include
             min_matches: Minimum number of matched symptoms
         
         Returns:
             List of dictionaries with disease, score, matched, missing
         """
-        # Normalize symptoms
-        normalized = self.normalizer.normalize_symptoms(user_symptoms)
+        # Normalize symptoms (no-op for NormalizedSymptoms)
+        normalized = self.normalizer.prepare(user_symptoms)
+        return self.profiles.rank(normalized, min_score, min_matches)
+    
+    def new_state(self, user_symptoms=(), profiles=None):
+        """
+        Start an incremental scoring session
         
-        # Safety check
-        if len(normalized) < min_matches:
-            return []
+        Args:
+            user_symptoms: Initial symptom strings (will be normalized)
+            profiles: CompiledProfiles to score against (default: the
+                current ones)
         
-        results = []
-        for disease in self.disease_profiles:
-            score, matched, missing = self.score_disease(disease, normalized)
-            
-            if len(matched) < min_matches:
-                continue
-            
-            if score >= min_score:
-                results.append({
-                    "disease": disease,
-                    "score": round(score, 3),
-                    "matched_symptoms": matched,
-                    "missing_symptoms": missing
-                })
+        Returns:
+            ScoringState holding per-disease accumulators over those
+            profiles (a later refresh does not affect it)
+        """
+        normalized = self.normalizer.prepare(user_symptoms) if user_symptoms else set()
+        return ScoringState(profiles or self.profiles, normalized)
+
+
+def _copy_result(result):
+    """
+    Copy a score_all_diseases()/rank_diseases() output down to its lists
+    (score_arrays() tuples are read-only and shared as they are)
+    """
+    if isinstance(result, tuple):
+        return result
+    
+    def copy_entry(entry):
+        return {k: list(v) if isinstance(v, list) else v for k, v in entry.items()}
+    
+    if isinstance(result, dict):
+        return {disease: copy_entry(entry) for disease, entry in result.items()}
+    return [copy_entry(entry) for entry in result]
+
+
+class ScoringState:
+    """
+    Incremental rule-based scores for one patient session
+    
+    Holds per-disease matched-weight and match-count accumulators. Adding or
+    removing a canonical symptom walks that symptom's posting list only,
+    so each update costs O(diseases containing the symptom) instead of a
+    full rescore. The state is tied to the CompiledProfiles it was started
+    on, so its indices stay valid if the scorer swaps in new profiles.
+    """
+    
+    def __init__(self, profiles, symptoms=()):
+        self.profiles = profiles
+        self.symptoms = set()
+        n_diseases = len(profiles.disease_names)
+        self.matched_weight = np.zeros(n_diseases)
+        self.match_counts = np.zeros(n_diseases, dtype=np.int64)
+        self.scores = np.zeros(n_diseases)
         
-        return sorted(results, key=lambda x: x["score"], reverse=True)
+        for s in symptoms:
+            self.add(s)
+    
+    def _apply(self, symptom, sign):
+        j = self.profiles.symptom_to_idx.get(symptom)
+        if j is None:
+            return
+        
+        postings = self.profiles.postings
+        lo, hi = postings.indptr[j], postings.indptr[j + 1]
+        diseases = postings.indices[lo:hi]
+        
+        self.matched_weight[diseases] += sign * postings.data[lo:hi]
+        self.match_counts[diseases] += sign
+        # Clear float residue left by add/remove round trips
+        self.matched_weight[diseases[self.match_counts[diseases] == 0]] = 0.0
+        self.scores[diseases] = self.profiles._combine(
+            self.matched_weight[diseases], self.match_counts[diseases], diseases
+        )
+    
+    def add(self, symptom):
+        """
+        Add a canonical symptom
+        
+        Returns:
+            True if the state changed
+        """
+        if symptom in self.symptoms:
+            return False
+        self.symptoms.add(symptom)
+        self._apply(symptom, 1)
+        return True
+    
+    def remove(self, symptom):
+        """
+        Remove (reject) a canonical symptom
+        
+        Returns:
+            True if the state changed
+        """
+        if symptom not in self.symptoms:
+            return False
+        self.symptoms.discard(symptom)
+        self._apply(symptom, -1)
+        return True
+    
+    def _filter(self, min_score, min_matches):
+        diseases, scores, _ = self.score_arrays(min_score, min_matches)
+        return diseases, scores
+    
+    def score_arrays(self, min_score=0.0, min_matches=0):
+        """Same output as RuleBasedScorer.score_arrays for the current symptoms"""
+        keep = np.flatnonzero(
+            (self.match_counts >= min_matches) & (self.scores >= min_score)
+        )
+        return keep, self.scores[keep], self.match_counts[keep]
+    
+    def score_all(self, min_score=0.0, min_matches=0):
+        """Same output as RuleBasedScorer.score_all_diseases for the current symptoms"""
+        diseases, scores = self._filter(min_score, min_matches)
+        return self.profiles._score_details(diseases, scores, self.symptoms)
+    
+    def rank(self, min_score=0.1, min_matches=2):
+        """Same output as RuleBasedScorer.rank_diseases for the current symptoms"""
+        if len(self.symptoms) < min_matches:
+            return []
+        diseases, scores = self._filter(min_score, min_matches)
+        return self.profiles._ranked_results(diseases, scores, self.symptoms)
 
 
 # Global instance
@@ -0,0 +1,200 @@
+"""
+Static token-embedding normalizer backend
+Distills the SentenceTransformer into a per-token embedding table offline so
+phrases are embedded by table lookup + mean pooling, with no transformer
+forward pass at request time
+"""
+
+import json
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(__file__))
+from embedding_store import embedding_key, file_digest
+from vector_index import FlatIndex
+
+DEFAULT_STATIC_DIR = "models/static_embeddings"
+
+
+def build_static_table(model_name="all-MiniLM-L6-v2", out_dir=DEFAULT_STATIC_DIR,
+                       batch_size=1024):
+    """
+    Derive a static token-embedding table from a SentenceTransformer
+
+    Every vocabulary token is run through the model on its own
+    ([CLS] token [SEP]) with the model's own pooling, giving one vector per
+    token. This runs once, offline.
+
+    Args:
+        model_name: SentenceTransformer to distill
+        out_dir: Output directory (table.npy, tokenizer files, manifest.json)
+        batch_size: Tokens per forward pass
+
+    Returns:
+        Path to the output directory
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    tokenizer = model.tokenizer
+    dim = model.get_sentence_embedding_dimension()
+    vocab_size = len(tokenizer)
+
+    special = set(tokenizer.all_special_ids)
+    token_ids = [i for i in range(vocab_size) if i not in special]
+    table = np.zeros((vocab_size, dim), dtype=np.float32)
+
+    print(f"Embedding {len(token_ids)} tokens with {model_name}...")
+    with torch.no_grad():
+        for start in range(0, len(token_ids), batch_size):
+            batch = token_ids[start:start + batch_size]
+            input_ids = torch.tensor(
+                [[tokenizer.cls_token_id, i, tokenizer.sep_token_id] for i in batch]
+            )
+            features = {
+                "input_ids": input_ids,
+                "attention_mask": torch.ones_like(input_ids),
+            }
+            if "token_type_ids" in tokenizer.model_input_names:
+                features["token_type_ids"] = torch.zeros_like(input_ids)
+            table[batch] = model(features)["sentence_embedding"].cpu().numpy()
+
+    os.makedirs(out_dir, exist_ok=True)
+    table_path = os.path.join(out_dir, "table.npy")
+    np.save(table_path, table)
+    tokenizer.save_pretrained(out_dir)
+
+    manifest = {
+        "model_name": model_name,
+        "dim": dim,
+        "vocab_size": vocab_size,
+        "table_sha256": file_digest(table_path),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Static embedding table saved to: {out_dir}")
+    return out_dir
+
+
+def static_table_key(static_dir=DEFAULT_STATIC_DIR):
+    """
+    Identify a static embedding table by its model and table hash
+
+    Returns:
+        "<model_name>:static:<table sha256 prefix>", or None if no table has
+        been built in static_dir
+    """
+    manifest_path = os.path.join(static_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return _table_key(json.load(f))
+
+
+def _table_key(manifest):
+    return f"{manifest['model_name']}:static:{manifest['table_sha256'][:12]}"
+
+
+class StaticEmbedder:
+    """Drop-in replacement for SentenceTransformer.encode backed by a token table"""
+
+    def __init__(self, static_dir=DEFAULT_STATIC_DIR):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(static_dir, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.table = np.load(os.path.join(static_dir, "table.npy"), mmap_mode="r")
+        self.tokenizer = Tokenizer.from_file(os.path.join(static_dir, "tokenizer.json"))
+        self.tokenizer.no_truncation()
+        self.dim = self.manifest["dim"]
+        self.key = _table_key(self.manifest)
+
+    def encode(self, texts, normalize_embeddings=True):
+        """
+        Mean-pool table rows over each text's tokens
+
+        Args:
+            texts: List of strings
+            normalize_embeddings: L2-normalize the pooled vectors
+
+        Returns:
+            (len(texts), dim) float32 array; texts with no known tokens are zero
+        """
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, encoding in enumerate(
+            self.tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        ):
+            if encoding.ids:
+                out[row] = self.table[encoding.ids].mean(axis=0)
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.maximum(norms, 1e-12)
+        return out
+
+
+class StaticMatcher:
+    """
+    Nearest-canonical search in the static embedding space
+
+    Index rows (canonical texts and synonyms) are embedded with the static
+    table and stored alongside the transformer embeddings in the same
+    EmbeddingStore, under a key that includes the table hash.
+    """
+
+    def __init__(self, embedder, texts, labels, keys, dataset_path, store=None):
+        """
+        Args:
+            embedder: StaticEmbedder
+            texts: Index row texts (SymptomNormalizer.index_texts)
+            labels: Canonical key index per row (SymptomNormalizer.index_labels)
+            keys: Canonical keys
+            dataset_path: Dataset the texts came from (part of the store key)
+            store: Optional EmbeddingStore
+        """
+        self.embedder = embedder
+        self.labels = labels
+        self.keys = keys
+
+        self.key = embedding_key(embedder.key, file_digest(dataset_path), texts)
+
+        def encode():
+            return embedder.encode(texts, normalize_embeddings=True)
+
+        if store is None:
+            embeddings = encode()
+        else:
+            embeddings, _ = store.get_or_create(self.key, encode)
+        self.index = FlatIndex(embeddings)
+
+    def match(self, texts, k=8):
+        """
+        Best canonical match per text plus its margin over the runner-up
+
+        Args:
+            texts: Cleaned symptom strings
+            k: Rows searched per text (synonym rows may share a label)
+
+        Returns:
+            List of (canonical_name, similarity_score, margin)
+        """
+        emb = self.embedder.encode(texts, normalize_embeddings=True)
+        scores, rows = self.index.search(emb, min(k, len(self.labels)))
+
+        results = []
+        for row_scores, row_ids in zip(scores, rows):
+            best_label, best, second = None, -1.0, -1.0
+            for score, row in zip(row_scores, row_ids):
+                label = self.labels[row]
+                if best_label is None:
+                    best_label, best = label, float(score)
+                elif label != best_label:
+                    second = float(score)
+                    break
+            results.append((self.keys[best_label], best, best - second))
+        return results
+
+
+if __name__ == "__main__":
+    build_static_table()
@@ -0,0 +1,136 @@
+"""
+Free-text symptom extraction
+Finds canonical symptoms in sentences such as
+"I've had a high fever and a bad cough since Monday, also chest pain"
+"""
+
+import re
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+from symptom_normalizer import get_normalizer
+from lexical_index import STOPWORDS
+
+# Punctuation and conjunctions that end a phrase; spans never cross them
+CLAUSE_BREAK = re.compile(r"[.,;:!?()/\n]+|\b(?:and|also|but|plus|then|or)\b")
+
+# Words a candidate span may not start or end with
+FILLER = STOPWORDS | {
+    "ive", "ve", "been", "had", "got", "get", "getting", "am", "is", "are",
+    "was", "be", "it", "its", "me", "this", "that", "there", "since", "for",
+    "from", "after", "before", "very", "really", "quite", "bad", "little",
+    "bit", "lot", "lots", "kind", "sort", "like", "day", "days", "week",
+    "weeks", "today", "yesterday", "monday", "tuesday", "wednesday",
+    "thursday", "friday", "saturday", "sunday", "morning", "night", "ago",
+}
+
+
+class SymptomExtractor:
+    """Extracts canonical symptoms from raw text using a SymptomNormalizer"""
+
+    def __init__(self, normalizer=None, max_ngram=4, threshold=0.55):
+        """
+        Args:
+            normalizer: SymptomNormalizer (default: the global instance)
+            max_ngram: Longest candidate span in words
+            threshold: Minimum similarity for embedding-matched spans
+        """
+        self.normalizer = normalizer or get_normalizer()
+        self.max_ngram = max_ngram
+        self.threshold = threshold
+
+    def candidate_spans(self, text):
+        """
+        Generate candidate spans from raw text
+
+        Returns:
+            List of (start, end, phrase) with start/end as word positions
+        """
+        text = text.lower().replace("'", "")
+        spans = []
+        offset = 0
+        for chunk in CLAUSE_BREAK.split(text):
+            words = re.findall(r"[a-z]+", chunk)
+            for i in range(len(words)):
+                if words[i] in FILLER:
+                    continue
+                for n in range(1, self.max_ngram + 1):
+                    j = i + n
+                    if j > len(words):
+                        break
+                    if words[j - 1] in FILLER:
+                        continue
+                    spans.append((offset + i, offset + j, " ".join(words[i:j])))
+            # Keep positions from different chunks apart
+            offset += len(words) + 1
+        return spans
+
+    def extract(self, text, return_spans=False, threshold=None):
+        """
+        Extract canonical symptoms from a sentence or paragraph
+
+        All candidate spans are normalized in one batch (lexical hits first,
+        then a single encode call for the rest). Matches are then chosen
+        greedily by score, longer spans first on ties, without overlap.
+
+        Args:
+            text: Raw free text
+            return_spans: Also return the chosen spans
+            threshold: Override the extractor's similarity threshold
+
+        Returns:
+            Set of canonical symptom names, or a tuple of (set, spans) where
+            spans is a list of dicts with text, canonical, score, start, end
+        """
+        threshold = self.threshold if threshold is None else threshold
+        spans = self.candidate_spans(text)
+
+        matches = self.normalizer.normalize_batch(
+            [phrase for _, _, phrase in spans], threshold
+        )
+
+        scored = [
+            (score, end - start, start, end, phrase, canon)
+            for (start, end, phrase), (canon, score) in zip(spans, matches)
+            if canon
+        ]
+        scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
+
+        taken = set()
+        chosen = []
+        for score, length, start, end, phrase, canon in scored:
+            positions = set(range(start, end))
+            if positions & taken:
+                continue
+            taken |= positions
+            chosen.append({
+                "text": phrase,
+                "canonical": canon,
+                "score": round(score, 3),
+                "start": start,
+                "end": end,
+            })
+
+        chosen.sort(key=lambda x: x["start"])
+        symptoms = {c["canonical"] for c in chosen}
+        if return_spans:
+            return symptoms, chosen
+        return symptoms
+
+
+# Global instance
+_extractor = None
+
+
+def get_extractor():
+    """Get or create the global extractor instance"""
+    global _extractor
+    if _extractor is None:
+        _extractor = SymptomExtractor()
+    return _extractor
+
+
+def extract_symptoms(text, return_spans=False):
+    """Convenience function to extract symptoms from free text"""
+    extractor = get_extractor()
+    return extractor.extract(text, return_spans)
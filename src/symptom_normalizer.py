@@ -2,15 +2,44 @@ import pandas as pd
 import re
 import json
 import numpy as np
-from functools import lru_cache
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
+import threading
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+from embedding_store import EmbeddingStore, DEFAULT_STORE_DIR, embedding_key, file_digest
+from lexical_index import EXACT_SCORE, LexicalIndex
+from normalization_cache import NormalizationCache
+from vector_index import build_vector_index, DEFAULT_INDEX_DIR
+from static_embedder import DEFAULT_STATIC_DIR, static_table_key
 
 
 class SymptomNormalizer:
+    """
+    Maps free-text symptoms onto the canonical symptom vocabulary
+
+    Lookups go exact map -> lexical index -> embedding model. The
+    SentenceTransformer (and torch) is only imported when a string misses
+    both lexical tiers. With lexical_only=True it is never loaded and such
+    strings normalize to (None, None); use this for training and batch
+    scoring of dataset rows, which only contain canonical names.
+
+    An optional synonyms CSV (columns: phrase, canonical) extends the
+    vocabulary with lay phrasings. Synonyms are exact/token-set aliases in
+    the lexical index and extra rows in the nearest-neighbour index, which
+    is flat for small vocabularies and FAISS HNSW/IVF for large ones.
+
+    embedding_backend="static" embeds phrases with a precomputed token table
+    (see static_embedder.py) instead of a transformer forward pass. Matches
+    whose top-1 margin over the runner-up is below fallback_margin are
+    re-scored with the full model; fallback_margin=None never loads it.
+    """
     
-    def __init__(self, dataset_path=None, model_name="all-MiniLM-L6-v2"):
+    def __init__(self, dataset_path=None, model_name="all-MiniLM-L6-v2",
+                 embedding_cache_dir=DEFAULT_STORE_DIR,
+                 cache_size=5000, cache_path=None, lexical_only=False,
+                 synonyms_path=None, index_kind="auto", index_dir=DEFAULT_INDEX_DIR,
+                 embedding_backend="transformer", static_dir=DEFAULT_STATIC_DIR,
+                 fallback_margin=0.05):
         # Handle default path - try current dir, then parent dir
         if dataset_path is None:
             if os.path.exists("data/dataset.csv"):
@@ -21,8 +50,21 @@ class SymptomNormalizer:
                 raise FileNotFoundError("Could not find dataset.csv in current or parent directory")
         
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        self.lexical_only = lexical_only
+        self._model = None
+        self._index_embeddings = None
+        self._vector_index = None
+        self._model_lock = threading.Lock()
         self.dataset_path = dataset_path
+        self.synonyms_path = synonyms_path
+        self.index_kind = index_kind
+        self.index_dir = index_dir
+        self.embedding_backend = embedding_backend
+        self.static_dir = static_dir
+        self.fallback_margin = fallback_margin
+        self._static_matcher = None
+        # None disables the on-disk embedding store
+        self.embedding_store = EmbeddingStore(embedding_cache_dir) if embedding_cache_dir else None
         
         # Load data
         print("DEBUG dataset_path =", dataset_path)
@@ -31,9 +73,25 @@ class SymptomNormalizer:
         # Build canonical symptoms
         self._build_canonical_symptoms()
         
-        # Create embeddings
+        # Lay synonyms mapped onto canonical keys
+        self._load_synonyms()
+        
+        # Lexical fast path over every alias
+        self.lexical_index = LexicalIndex(self.canonical_symptoms, self.synonyms)
+        
+        # Create embeddings (loaded from the store, or deferred until needed)
         self._create_embeddings()
         
+        # Resolved free-text -> canonical matches; cache_path adds a SQLite
+        # tier shared across processes and restarts. Under the static
+        # backend the matches also depend on the table and the margin
+        namespace = self.embedding_key
+        if embedding_backend == "static":
+            namespace = f"{namespace}:{static_table_key(static_dir)}:{fallback_margin}"
+        self.cache = NormalizationCache(
+            maxsize=cache_size, db_path=cache_path, namespace=namespace
+        )
+        
         # Build symptom map
         self._build_symptom_map()
     
@@ -67,26 +125,114 @@ class SymptomNormalizer:
             aliases.add(symptom.replace(" ache", " pain"))
             return list(aliases)
         
-        # Create canonical mappings
+        # Create canonical mappings (sorted so key order and alias order are
+        # stable across processes - stored embeddings are row-aligned to them)
         self.canonical_symptoms = {}
-        for symptom in raw_symptoms:
+        for symptom in sorted(raw_symptoms):
             key = symptom.upper().replace(" ", "_")
-            self.canonical_symptoms[key] = expand_aliases(symptom)
+            self.canonical_symptoms[key] = sorted(expand_aliases(symptom))
         
         # Save for reference
         os.makedirs("models", exist_ok=True)
         with open("models/canonical_symptoms.json", "w") as f:
             json.dump(self.canonical_symptoms, f, indent=2)
     
+    def _load_synonyms(self):
+        """Load phrase -> canonical synonyms, dropping unknown canonical keys"""
+        self.synonyms = {}
+        if not self.synonyms_path:
+            return
+        
+        df = pd.read_csv(self.synonyms_path)
+        skipped = 0
+        for phrase, canonical in zip(df["phrase"], df["canonical"]):
+            key = str(canonical).strip().upper().replace(" ", "_")
+            phrase = self.clean_symptom(phrase)
+            if key not in self.canonical_symptoms or not phrase:
+                skipped += 1
+                continue
+            self.synonyms.setdefault(key, set()).add(phrase)
+        
+        self.synonyms = {k: sorted(v) for k, v in sorted(self.synonyms.items())}
+        count = sum(len(v) for v in self.synonyms.values())
+        print(f"Loaded {count} synonyms ({skipped} skipped)")
+    
     def _create_embeddings(self):
-        """Create embeddings for all canonical symptoms"""
+        """
+        Create embeddings for all canonical symptoms
+
+        Embeddings are L2-normalized and, when a store is configured, loaded
+        memory-mapped from disk. The store key covers the model name, the
+        dataset contents and the alias-expanded texts, so re-encoding only
+        happens when one of those changes. A store miss does not encode here;
+        encoding waits for the first lookup that needs the model.
+        """
         self.canonical_keys = list(self.canonical_symptoms.keys())
-        canonical_texts = [
+        self.canonical_index = {k: i for i, k in enumerate(self.canonical_keys)}
+        key_to_idx = self.canonical_index
+        
+        # One index row per canonical symptom, then one per synonym phrase;
+        # index_labels maps each row back to its canonical key
+        self.index_texts = [
             k.replace("_", " ").lower() + " " + " ".join(self.canonical_symptoms[k])
             for k in self.canonical_keys
         ]
-        self.canonical_embeddings = self.model.encode(canonical_texts)
-        print(f"Created embeddings for {len(self.canonical_keys)} canonical symptoms")
+        labels = list(range(len(self.canonical_keys)))
+        for key, phrases in self.synonyms.items():
+            self.index_texts.extend(phrases)
+            labels.extend([key_to_idx[key]] * len(phrases))
+        self.index_labels = np.array(labels, dtype=np.int64)
+
+        self.embedding_key = embedding_key(
+            self.model_name, file_digest(self.dataset_path), self.index_texts
+        )
+
+        if self.embedding_store is not None and not self.lexical_only:
+            self._index_embeddings = self.embedding_store.load(self.embedding_key)
+            if self._index_embeddings is not None:
+                print(f"Loaded cached embeddings for {len(self.index_texts)} symptom phrases")
+    
+    @property
+    def model(self):
+        """SentenceTransformer, imported and loaded on first use"""
+        if self._model is None:
+            if self.lexical_only:
+                raise RuntimeError("Embedding model is disabled in lexical-only mode")
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    print(f"Loading embedding model {self.model_name}")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+    
+    @property
+    def index_embeddings(self):
+        """Unit-length embeddings of every index row, encoded on first use if not stored"""
+        if self._index_embeddings is None:
+            def encode():
+                return self.model.encode(self.index_texts, normalize_embeddings=True)
+
+            if self.embedding_store is None:
+                embeddings = encode()
+            else:
+                embeddings, _ = self.embedding_store.get_or_create(self.embedding_key, encode)
+            self._index_embeddings = embeddings
+            print(f"Created embeddings for {len(self.index_texts)} symptom phrases")
+        return self._index_embeddings
+    
+    @property
+    def canonical_embeddings(self):
+        """Embeddings of the canonical symptoms (the first index rows)"""
+        return self.index_embeddings[:len(self.canonical_keys)]
+    
+    @property
+    def vector_index(self):
+        """Nearest-neighbour index over index_embeddings, built on first use"""
+        if self._vector_index is None:
+            self._vector_index = build_vector_index(
+                self.index_embeddings, self.index_kind, self.index_dir, self.embedding_key
+            )
+        return self._vector_index
     
     def _build_symptom_map(self):
         """Build mapping from raw symptoms to canonical form"""
@@ -95,11 +241,12 @@ class SymptomNormalizer:
         for col in symptom_cols:
             unique_symptoms.update(self.df_disease[col].dropna().astype(str))
         
+        # Keyed on the cleaned form, which is what lookups use
         self.symptom_map = {}
-        for s in unique_symptoms:
-            canon, _ = self.normalize_symptom(s)
+        unique_symptoms = sorted(unique_symptoms)
+        for s, (canon, _) in zip(unique_symptoms, self.normalize_batch(unique_symptoms)):
             if canon:
-                self.symptom_map[s] = canon
+                self.symptom_map[self.clean_symptom(s)] = canon
     
     def clean_symptom(self, s):
         """Clean a symptom string"""
@@ -107,14 +254,14 @@ class SymptomNormalizer:
         s = re.sub(r"[^a-z\s]", "", s.lower())
         return s.strip()
     
-    @lru_cache(maxsize=5000)
     def normalize_symptom(self, symptom, threshold=0.45):
         """
         Normalize a symptom to canonical form
         
         Args:
             symptom: Raw symptom string
-            threshold: Minimum similarity threshold (default: 0.45)
+            threshold: Minimum similarity threshold (default: 0.45); applies
+                to token-set and typo matches as well as embedding matches
         
         Returns:
             Tuple of (canonical_name, similarity_score) or (None, None)
@@ -127,42 +274,314 @@ class SymptomNormalizer:
         if symptom in self.symptom_map:
             return self.symptom_map[symptom], 1.0
         
-        # Use semantic matching
-        emb = self.model.encode([symptom])
-        sims = cosine_similarity(emb, self.canonical_embeddings)[0]
-        idx = np.argmax(sims)
+        # Aliases, reordered words and small typos
+        canon, score = self._lexical_match(symptom, threshold)
+        if canon:
+            return canon, score
         
-        if sims[idx] >= threshold:
-            return self.canonical_keys[idx], float(sims[idx])
+        # Use semantic matching (fallback)
+        return self._match_embeddings([symptom], threshold)[0]
+    
+    def _lexical_match(self, text, threshold):
+        """
+        Lexical index hit for a cleaned text, if it scores at least threshold
+
+        Exact alias hits always pass. A weaker token-set or typo hit is
+        dropped, leaving the text to the embedding model.
+
+        Returns:
+            Tuple of (canonical_name, score) or (None, None)
+        """
+        canon, score = self.lexical_index.lookup(text)
+        if canon and (score == EXACT_SCORE or score >= threshold):
+            return canon, score
         return None, None
     
-    def normalize_symptoms(self, symptom_list):
+    def _search(self, texts, k):
+        """
+        Encode cleaned texts in one model call and query the vector index
+
+        Embeddings are unit length, so inner-product scores are cosine
+        similarities.
+
+        Returns:
+            Tuple of (scores, row_ids), each (len(texts), k)
+        """
+        emb = np.asarray(self.model.encode(texts, normalize_embeddings=True))
+        return self.vector_index.search(emb, k)
+    
+    @property
+    def static_matcher(self):
+        """StaticMatcher over index_texts, loaded on first use"""
+        if self._static_matcher is None:
+            from static_embedder import StaticEmbedder, StaticMatcher
+            self._static_matcher = StaticMatcher(
+                StaticEmbedder(self.static_dir), self.index_texts, self.index_labels,
+                self.canonical_keys, self.dataset_path, self.embedding_store
+            )
+        return self._static_matcher
+    
+    def _best_embedding_matches(self, texts):
+        """
+        Best canonical match for each cleaned text, ignoring any threshold
+
+        Returns:
+            List of (canonical_name, similarity_score) per text
+        """
+        if self.embedding_backend != "static":
+            return self._transformer_matches(texts)
+        
+        matches = []
+        unsure = []
+        for i, (canon, score, margin) in enumerate(self.static_matcher.match(texts)):
+            matches.append((canon, score))
+            if self.fallback_margin is not None and margin < self.fallback_margin:
+                unsure.append(i)
+        
+        if unsure:
+            full = self._transformer_matches([texts[i] for i in unsure])
+            for i, match in zip(unsure, full):
+                matches[i] = match
+        return matches
+    
+    def _transformer_matches(self, texts):
+        """Best canonical match per text using the full SentenceTransformer"""
+        scores, rows = self._search(texts, 1)
+        return [
+            (self.canonical_keys[self.index_labels[row]], float(score))
+            if row >= 0 else (None, -1.0)
+            for score, row in zip(scores[:, 0], rows[:, 0])
+        ]
+    
+    def candidates(self, symptom, k=5):
+        """
+        Top-k canonical candidates for a symptom from the vector index
+
+        Several synonym rows can point at the same canonical symptom, so
+        extra rows are fetched and collapsed to the best score per symptom.
+
+        Args:
+            symptom: Raw symptom string
+            k: Number of canonical candidates
+
+        Returns:
+            List of (canonical_name, similarity_score), best first
+        """
+        symptom = self.clean_symptom(symptom)
+        if not symptom or self.lexical_only:
+            return []
+        
+        scores, rows = self._search([symptom], min(4 * k, len(self.index_texts)))
+        results = []
+        seen = set()
+        for score, row in zip(scores[0], rows[0]):
+            if row < 0:
+                continue
+            canon = self.canonical_keys[self.index_labels[row]]
+            if canon not in seen:
+                seen.add(canon)
+                results.append((canon, float(score)))
+            if len(results) == k:
+                break
+        return results
+    
+    def _match_embeddings(self, texts, threshold):
+        """
+        Semantic matching through the normalization cache
+
+        Only texts missing from the cache are encoded. Cached entries hold
+        the best match, so the threshold is applied here on every call.
+
+        Returns:
+            List of (canonical_name, similarity_score) or (None, None) per text
+        """
+        if self.lexical_only:
+            return [(None, None)] * len(texts)
+
+        best = {}
+        uncached = []
+        for text in texts:
+            match = self.cache.get(text)
+            if match is None:
+                uncached.append(text)
+            else:
+                best[text] = match
+
+        if uncached:
+            for text, match in zip(uncached, self._best_embedding_matches(uncached)):
+                self.cache.put(text, match)
+                best[text] = match
+
+        results = []
+        for text in texts:
+            canon, sim = best[text]
+            results.append((canon, sim) if sim >= threshold else (None, None))
+        return results
+    
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the normalization cache"""
+        return self.cache.stats()
+    
+    def normalize_batch(self, symptom_list, threshold=0.45):
+        """
+        Normalize many symptoms with at most one model call
+
+        Exact-map and lexical hits (token-set and typo hits only at or above
+        threshold) are resolved first; the remaining unique strings are
+        encoded together and scored in one matrix product.
+
+        Args:
+            symptom_list: List of raw symptom strings
+            threshold: Minimum similarity threshold (default: 0.45)
+
+        Returns:
+            List of (canonical_name, similarity_score) aligned with symptom_list
+        """
+        results = [(None, None)] * len(symptom_list)
+        pending = {}
+        for i, symptom in enumerate(symptom_list):
+            cleaned = self.clean_symptom(symptom)
+            if not cleaned:
+                continue
+            if cleaned in self.symptom_map:
+                results[i] = (self.symptom_map[cleaned], 1.0)
+                continue
+            canon, score = self._lexical_match(cleaned, threshold)
+            if canon:
+                results[i] = (canon, score)
+            else:
+                pending.setdefault(cleaned, []).append(i)
+
+        if pending:
+            texts = list(pending)
+            for text, match in zip(texts, self._match_embeddings(texts, threshold)):
+                for i in pending[text]:
+                    results[i] = match
+
+        return results
+    
+    def normalize_symptoms(self, symptom_list, return_scores=False, threshold=0.45):
         """
         Normalize a list of symptoms
         
         Args:
             symptom_list: List of symptom strings
+            return_scores: Also return the per-item matches
+            threshold: Minimum similarity threshold (default: 0.45)
         
         Returns:
-            Set of canonical symptom names
+            Set of canonical symptom names, or a tuple of (set, matches) where
+            matches is a list of (canonical_name, similarity_score) aligned
+            with symptom_list when return_scores is True
         """
-        normalized = set()
-        for symptom in symptom_list:
-            canon, _ = self.normalize_symptom(symptom)
-            if canon:
-                normalized.add(canon)
+        if isinstance(symptom_list, NormalizedSymptoms):
+            normalized = set(symptom_list.symptoms)
+            if return_scores:
+                return normalized, [(s, 1.0) for s in sorted(normalized)]
+            return normalized
+        
+        matches = self.normalize_batch(list(symptom_list), threshold)
+        normalized = {canon for canon, _ in matches if canon}
+        if return_scores:
+            return normalized, matches
         return normalized
+    
+    def prepare(self, symptom_list, threshold=0.45):
+        """
+        Normalize once into a NormalizedSymptoms for the prediction hot path
+        
+        Args:
+            symptom_list: List of symptom strings (a NormalizedSymptoms is
+                returned unchanged)
+            threshold: Minimum similarity threshold (default: 0.45)
+        
+        Returns:
+            NormalizedSymptoms
+        """
+        if isinstance(symptom_list, NormalizedSymptoms):
+            return symptom_list
+        return self.wrap(self.normalize_symptoms(symptom_list, threshold=threshold))
+    
+    def wrap(self, canonical_symptoms):
+        """Wrap already-canonical symptom names without normalizing them"""
+        return NormalizedSymptoms(canonical_symptoms, self.canonical_index)
+
+
+class NormalizedSymptoms:
+    """
+    A request's canonical symptom set, normalized once
+    
+    Behaves like a read-only set of canonical names and carries a bitmask
+    over the normalizer vocabulary. Feature vectors for a given
+    symptom -> column mapping are built on first use and reused, so the
+    ensemble, the prior predictors and the rule scorer can all consume the
+    same object without normalizing or re-encoding anything.
+    """
+    
+    def __init__(self, symptoms, vocabulary_index):
+        """
+        Args:
+            symptoms: Iterable of canonical symptom names
+            vocabulary_index: Dict of canonical name -> bit position
+        """
+        self.symptoms = frozenset(symptoms)
+        self.bitmask = 0
+        for s in self.symptoms:
+            idx = vocabulary_index.get(s)
+            if idx is not None:
+                self.bitmask |= 1 << idx
+        self._vectors = {}
+    
+    def __iter__(self):
+        return iter(self.symptoms)
+    
+    def __len__(self):
+        return len(self.symptoms)
+    
+    def __contains__(self, symptom):
+        return symptom in self.symptoms
+    
+    def __repr__(self):
+        return f"NormalizedSymptoms({sorted(self.symptoms)})"
+    
+    def feature_vector(self, symptom_to_idx):
+        """
+        Binary feature vector for a model's symptom -> column mapping
+        
+        Args:
+            symptom_to_idx: Dict of canonical name -> column (kept alive by
+                the caller; vectors are cached per mapping object)
+        
+        Returns:
+            1-D float array with ones at the present symptoms' columns
+        """
+        key = id(symptom_to_idx)
+        cached = self._vectors.get(key)
+        if cached is not None and cached[0] is symptom_to_idx:
+            return cached[1]
+        
+        vec = np.zeros(len(symptom_to_idx))
+        for s in self.symptoms:
+            idx = symptom_to_idx.get(s)
+            if idx is not None:
+                vec[idx] = 1
+        self._vectors[key] = (symptom_to_idx, vec)
+        return vec
 
 
 # Global instance (will be initialized when needed)
 _normalizer = None
 
 
-def get_normalizer(dataset_path=None):
-    """Get or create the global normalizer instance"""
+def get_normalizer(dataset_path=None, lexical_only=False):
+    """
+    Get or create the global normalizer instance
+
+    lexical_only only applies when the instance is first created.
+    """
     global _normalizer
     if _normalizer is None:
-        _normalizer = SymptomNormalizer(dataset_path)
+        _normalizer = SymptomNormalizer(dataset_path, lexical_only=lexical_only)
     return _normalizer
 
 
@@ -172,8 +591,14 @@ def normalize_symptom(symptom, threshold=0.45):
     return normalizer.normalize_symptom(symptom, threshold)
 
 
-def normalize_symptoms(symptom_list):
+def normalize_symptoms(symptom_list, return_scores=False):
     """Convenience function to normalize a list of symptoms"""
     normalizer = get_normalizer()
-    return normalizer.normalize_symptoms(symptom_list)
+    return normalizer.normalize_symptoms(symptom_list, return_scores)
+
+
+def prepare_symptoms(symptom_list):
+    """Convenience function to normalize once into a NormalizedSymptoms"""
+    normalizer = get_normalizer()
+    return normalizer.prepare(symptom_list)
 
@@ -2,16 +2,13 @@
 Phase 2: Train Random Forest Model on dataset.csv
 """
 
-import pandas as pd
-import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-import pickle
 import os
 import sys
 sys.path.insert(0, os.path.dirname(__file__))
-from symptom_normalizer import get_normalizer
+from feature_builder import build_features, collapse_duplicates, find_dataset
+from model_artifact import save_model
 
 
 def prepare_data(dataset_path=None):
@@ -19,7 +16,8 @@ def prepare_data(dataset_path=None):
     Transform dataset.csv into binary feature matrix for Random Forest
     
     Args:
-        dataset_path: Path to dataset.csv (default: looks in current dir or parent)
+        dataset_path: Path to dataset.csv (default: data/dataset.csv, then
+            the current or parent directory)
     
     Returns:
         X: Binary feature matrix (n_samples, n_symptoms)
@@ -27,74 +25,45 @@ def prepare_data(dataset_path=None):
         symptom_names: List of symptom names (columns)
         label_encoder: LabelEncoder for diseases
     """
-    # Handle default path - try current dir, then parent dir
-    if dataset_path is None:
-        if os.path.exists("dataset.csv"):
-            dataset_path = "dataset.csv"
-        elif os.path.exists("../dataset.csv"):
-            dataset_path = "../dataset.csv"
-        else:
-            raise FileNotFoundError("Could not find dataset.csv in current or parent directory")
-    
-    print("Loading dataset...")
-    df = pd.read_csv(dataset_path)
-    
-    # Get symptom columns
-    symptom_cols = [c for c in df.columns if "Symptom" in c]
-    
-    # Normalize symptoms
-    normalizer = get_normalizer(dataset_path)
-    
-    # Collect all unique symptoms (canonical)
-    all_symptoms = set()
-    for _, row in df.iterrows():
-        for col in symptom_cols:
-            if pd.notna(row[col]):
-                canon, _ = normalizer.normalize_symptom(row[col])
-                if canon:
-                    all_symptoms.add(canon)
-    
-    symptom_names = sorted(list(all_symptoms))
-    print(f"Found {len(symptom_names)} unique symptoms")
-    
-    # Create binary feature matrix
-    X = []
-    y = []
-    
-    for _, row in df.iterrows():
-        disease = row["Disease"]
-        symptom_vector = [0] * len(symptom_names)
-        
-        for col in symptom_cols:
-            if pd.notna(row[col]):
-                canon, _ = normalizer.normalize_symptom(row[col])
-                if canon and canon in symptom_names:
-                    idx = symptom_names.index(canon)
-                    symptom_vector[idx] = 1
-        
-        # Only add if at least one symptom is present
-        if sum(symptom_vector) > 0:
-            X.append(symptom_vector)
-            y.append(disease)
-    
-    X = np.array(X)
-    y = np.array(y)
-    
-    print(f"Created feature matrix: {X.shape}")
-    print(f"Number of diseases: {len(set(y))}")
-    
-    # Encode disease labels
-    label_encoder = LabelEncoder()
-    y_encoded = label_encoder.fit_transform(y)
-    
-    return X, y_encoded, symptom_names, label_encoder
+    return build_features(dataset_path)
+
+
+def build_classifier(n_jobs=-1, random_state=42, **params):
+    """Random Forest prior configuration; extra params override the defaults"""
+    config = dict(
+        n_estimators=150,
+        max_depth=None,
+        random_state=random_state,
+        n_jobs=n_jobs,
+        class_weight='balanced',
+        # Bootstrap size relative to the weight sum: same draws as with
+        # every duplicate row present (identical to None without weights)
+        max_samples=1.0
+    )
+    config.update(params)
+    return RandomForestClassifier(**config)
+
+
+def fit_collapsed(clf, X, y):
+    """
+    Fit on unique rows weighted by their number of copies
+
+    Balanced class weights and bootstrap draws (max_samples=1.0) both
+    account for sample_weight, so the weighted rows stand in for the copies.
+    Needs scikit-learn >= 1.9: earlier versions draw the bootstrap
+    uniformly over the unique rows
+    """
+    X, y, sample_weight = collapse_duplicates(X, y)
+    return clf.fit(X, y, sample_weight=sample_weight)
 
 
 def train_random_forest(dataset_path=None, 
                         n_estimators=150,
                         test_size=0.2,
                         random_state=42,
-                        save_path="models/rf_model.pkl"):
+                        save_path="models/rf_model",
+                        collapse=False,
+                        model_seed=None):
     """
     Train Random Forest classifier
     
@@ -102,8 +71,12 @@ def train_random_forest(dataset_path=None,
         dataset_path: Path to dataset.csv
         n_estimators: Number of trees
         test_size: Test set size
-        random_state: Random seed
-        save_path: Where to save the model
+        random_state: Random seed of the split (and of the trees unless
+            model_seed is given)
+        save_path: Artifact directory to save the model to (a path
+            ending in .pkl writes the legacy pickle instead)
+        collapse: Fit on unique rows weighted by their number of copies
+        model_seed: Random seed of the trees only, keeping the split fixed
     
     Returns:
         Trained model, label_encoder, symptom_names
@@ -113,13 +86,7 @@ def train_random_forest(dataset_path=None,
     print("="*60)
     
     # Handle default path
-    if dataset_path is None:
-        if os.path.exists("dataset.csv"):
-            dataset_path = "dataset.csv"
-        elif os.path.exists("../dataset.csv"):
-            dataset_path = "../dataset.csv"
-        else:
-            raise FileNotFoundError("Could not find dataset.csv in current or parent directory")
+    dataset_path = find_dataset(dataset_path)
     
     # Prepare data
     X, y, symptom_names, label_encoder = prepare_data(dataset_path)
@@ -134,15 +101,13 @@ def train_random_forest(dataset_path=None,
     
     # Train model
     print("\nTraining Random Forest...")
-    clf = RandomForestClassifier(
-        n_estimators=n_estimators,
-        max_depth=None,
-        random_state=random_state,
-        n_jobs=-1,
-        class_weight='balanced'
-    )
+    clf = build_classifier(n_estimators=n_estimators,
+                           random_state=random_state if model_seed is None else model_seed)
 
-    clf.fit(X_train, y_train)
+    if collapse:
+        fit_collapsed(clf, X_train, y_train)
+    else:
+        clf.fit(X_train, y_train)
     
     # Evaluate
     
@@ -150,22 +115,15 @@ def train_random_forest(dataset_path=None,
     print("RF internal sanity check accuracy (not diagnostic performance)")
     print(f"{'='*60}")
     
-    # Save model
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    
-    model_data = {
-        'model': clf,
-        'label_encoder': label_encoder,
-        'symptom_names': symptom_names
-    }
-    
-    with open(save_path, 'wb') as f:
-        pickle.dump(model_data, f)
-    
-    print(f"\nModel saved to: {save_path}")
+    # Save model (artifact directory; a *.pkl path writes the legacy pickle)
+    print()
+    training = {"mode": "collapsed", "sample_weight": "copies"} if collapse else None
+    save_model(clf, label_encoder, symptom_names, save_path, dataset_path, training)
     
     # Print classification report
 
+    return clf, label_encoder, symptom_names
+
 
 
 if __name__ == "__main__":
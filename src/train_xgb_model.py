@@ -1,94 +1,91 @@
-import pandas as pd
-import numpy as np
-import pickle
-import os
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
 
-from symptom_normalizer import get_normalizer
+from feature_builder import build_features, collapse_duplicates, find_dataset
+from model_artifact import save_model
 
 
 def prepare_data(dataset_path=None):
-    if dataset_path is None:
-        if os.path.exists("dataset.csv"):
-            dataset_path = "dataset.csv"
-        else:
-            dataset_path = "../dataset.csv"
+    return build_features(dataset_path)
 
-    df = pd.read_csv(dataset_path)
-    symptom_cols = [c for c in df.columns if "Symptom" in c]
 
-    normalizer = get_normalizer(dataset_path)
+def build_classifier(n_classes,n_jobs=-1,random_state=None,**params):
+    """XGBoost prior configuration; extra params override the defaults"""
+    config = dict(
+        objective="multi:softprob",
+        num_class=n_classes,
+        max_depth=4,
+        learning_rate=0.05,
+        n_estimators=250,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        eval_metric="mlogloss",
+        n_jobs=n_jobs,
+        random_state=random_state
+    )
+    config.update(params)
+    return XGBClassifier(**config)
+
+
+def fit_collapsed(model,X,y):
+    """
+    Fit a copy of model on unique rows weighted by their number of copies
 
-    # collect canonical symptoms
-    all_symptoms = set()
-    for _, row in df.iterrows():
-        for col in symptom_cols:
-            if pd.notna(row[col]):
-                canon, _ = normalizer.normalize_symptom(row[col])
-                if canon:
-                    all_symptoms.add(canon)
+    Row subsampling would drop whole symptom patterns from a tree instead
+    of thinning their copies, so it is folded into the weights: every
+    gradient/hessian sum is scaled by subsample, as it is in expectation.
+    model itself is left as configured.
 
-    symptom_names = sorted(list(all_symptoms))
-    symptom_to_idx = {s:i for i,s in enumerate(symptom_names)}
+    Returns:
+        The fitted copy (subsample=1.0)
+    """
+    from sklearn.base import clone
 
-    X = []
-    y = []
+    X,y,counts = collapse_duplicates(X,y)
+    fitted = clone(model).set_params(subsample=1.0)
+    return fitted.fit(X,y,sample_weight=counts*_subsample(model))
 
-    for _, row in df.iterrows():
-        vec = [0]*len(symptom_names)
-        for col in symptom_cols:
-            if pd.notna(row[col]):
-                canon,_ = normalizer.normalize_symptom(row[col])
-                if canon in symptom_to_idx:
-                    vec[symptom_to_idx[canon]] = 1
-        if sum(vec)>0:
-            X.append(vec)
-            y.append(row["Disease"])
 
-    X = np.array(X)
-    y = np.array(y)
+def collapsed_training(model):
+    """Manifest training record of fit_collapsed(model, ...)"""
+    return {
+        "mode":"collapsed",
+        "sample_weight":"copies * subsample",
+        "subsample":_subsample(model),
+    }
 
-    le = LabelEncoder()
-    y_enc = le.fit_transform(y)
 
-    return X, y_enc, symptom_names, le
+def _subsample(model):
+    # None is XGBoost's default of 1
+    return 1.0 if model.subsample is None else model.subsample
 
 
-def train_xgb_model(save_path="models/xgb_model.pkl"):
+def train_xgb_model(dataset_path=None,save_path="models/xgb_model",collapse=False,model_seed=None):
     print("\nTraining XGBoost Prior Model")
 
-    X,y,symptom_names,label_encoder = prepare_data()
+    dataset_path = find_dataset(dataset_path)
+
+    X,y,symptom_names,label_encoder = prepare_data(dataset_path)
 
     X_train,X_test,y_train,y_test = train_test_split(
         X,y,test_size=0.2,random_state=42,stratify=y
     )
 
-    model = XGBClassifier(
-        objective="multi:softprob",
-        num_class=len(label_encoder.classes_),
-        max_depth=4,
-        learning_rate=0.05,
-        n_estimators=250,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        eval_metric="mlogloss",
-        n_jobs=-1
-    )
-
-    model.fit(X_train,y_train)
+    # model_seed only seeds the boosting; the split stays fixed
+    model = build_classifier(len(label_encoder.classes_),random_state=model_seed)
 
-    os.makedirs("models",exist_ok=True)
+    # collapse=True fits unique rows weighted by their number of copies
+    training = None
+    if collapse:
+        training = collapsed_training(model)
+        model = fit_collapsed(model,X_train,y_train)
+    else:
+        model.fit(X_train,y_train)
 
-    with open(save_path,"wb") as f:
-        pickle.dump({
-            "model":model,
-            "label_encoder":label_encoder,
-            "symptom_names":symptom_names
-        },f)
+    # artifact directory; a *.pkl path writes the legacy pickle
+    save_model(model,label_encoder,symptom_names,save_path,dataset_path,training)
 
-    print("XGBoost model saved:",save_path)
+    return model,label_encoder,symptom_names
 
 
 if __name__=="__main__":
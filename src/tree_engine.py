@@ -0,0 +1,314 @@
+"""
+Compiled tree-ensemble inference
+Flattens trained RandomForest / XGBoost models into contiguous NumPy node
+arrays and evaluates every tree at once, for one or many rows, without the
+per-call dispatch overhead of the library predict_proba
+"""
+
+import json
+import os
+import numpy as np
+
+# Bump when the array layout changes
+ENGINE_VERSION = 1
+
+RF_PROBA = "rf_proba"
+XGB_SOFTMAX = "xgb_softmax"
+
+
+class CompiledForest:
+    """
+    Tree ensemble as flat node arrays over binary features
+
+    Every tree's nodes are concatenated. Because the features are 0/1
+    indicators, each split is precompiled into the child taken when the
+    feature is 0 and the child taken when it is 1, so traversal is a pure
+    gather with no threshold comparisons. Leaves point at themselves and
+    have feature -1 (which reads a padding column that is always 0).
+
+    Arrays:
+        feature: (n_nodes,) int32 split feature, -1 for leaves
+        child_zero, child_one: (n_nodes,) int32 next node for x=0 / x=1
+        value: RF - (n_nodes, n_classes) leaf class distribution, float64
+               XGB - (n_nodes,) leaf margin
+        roots: (n_trees,) int32 root node of each tree
+        tree_class: (n_trees,) int32 class each XGB tree contributes to
+            (always tree index % n_classes)
+        base_margin: (n_classes,) XGB starting margin
+    """
+
+    def __init__(self, kind, n_features, n_classes, max_depth, arrays):
+        self.kind = kind
+        self.n_features = n_features
+        self.n_classes = n_classes
+        self.max_depth = max_depth
+        self.feature = arrays["feature"]
+        self.child_zero = arrays["child_zero"]
+        self.child_one = arrays["child_one"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.tree_class = arrays.get("tree_class")
+        self.base_margin = arrays.get("base_margin")
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def arrays(self):
+        arrays = {
+            "feature": self.feature,
+            "child_zero": self.child_zero,
+            "child_one": self.child_one,
+            "value": self.value,
+            "roots": self.roots,
+        }
+        if self.kind == XGB_SOFTMAX:
+            arrays["tree_class"] = self.tree_class
+            arrays["base_margin"] = self.base_margin
+        return arrays
+
+    def leaves(self, X):
+        """
+        Leaf node reached in every tree for every row
+
+        Args:
+            X: (n_rows, n_features) binary matrix
+
+        Returns:
+            (n_rows, n_trees) int array of node ids
+        """
+        X = np.asarray(X)
+        # Padding column at index -1 is read by leaves (feature == -1)
+        X_pad = np.zeros((X.shape[0], self.n_features + 1), dtype=bool)
+        X_pad[:, :self.n_features] = X > 0.5
+
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            if (feature < 0).all():
+                break
+            node = np.where(X_pad[rows, feature], self.child_one[node], self.child_zero[node])
+        return node
+
+    def predict_proba(self, X):
+        """
+        Class probabilities, same contract as the library predict_proba
+
+        Args:
+            X: (n_rows, n_features) binary matrix (a single 1-D row is accepted)
+
+        Returns:
+            (n_rows, n_classes) probabilities in the model's class order
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[None, :]
+        node = self.leaves(X)
+
+        if self.kind == RF_PROBA:
+            # Summed tree by tree, in the order the library accumulates them
+            proba = self.value[node.T].sum(axis=0, dtype=np.float64)
+            return proba / self.n_trees
+
+        # Trees are stored round by round, one per class
+        leaf_values = self.value[node].reshape(len(X), -1, self.n_classes)
+        margins = leaf_values.sum(axis=1, dtype=np.float64) + self.base_margin
+        margins = margins - margins.max(axis=1, keepdims=True)
+        exp = np.exp(margins)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def save(self, path):
+        """Write the arrays and metadata to a single .npz file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {
+            "engine_version": ENGINE_VERSION,
+            "kind": self.kind,
+            "n_features": self.n_features,
+            "n_classes": self.n_classes,
+            "max_depth": self.max_depth,
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), **self.arrays())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a compiled model written by save()
+
+        Returns:
+            CompiledForest, or None if the file was written by another
+            engine version
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("engine_version") != ENGINE_VERSION:
+                return None
+            arrays = {k: data[k] for k in data.files if k != "meta"}
+        return cls(meta["kind"], meta["n_features"], meta["n_classes"],
+                   meta["max_depth"], arrays)
+
+
+def _binary_children(left, right, goes_left_if_zero, goes_left_if_one, is_leaf, offset):
+    """Resolve left/right children into x=0 / x=1 children (global node ids)"""
+    node_ids = np.arange(len(left)) + offset
+    child_zero = np.where(goes_left_if_zero, left + offset, right + offset)
+    child_one = np.where(goes_left_if_one, left + offset, right + offset)
+    child_zero[is_leaf] = node_ids[is_leaf]
+    child_one[is_leaf] = node_ids[is_leaf]
+    return child_zero, child_one
+
+
+def compile_sklearn_forest(model):
+    """
+    Flatten a fitted sklearn RandomForestClassifier
+
+    sklearn sends a sample left when x <= threshold.
+
+    Returns:
+        CompiledForest
+    """
+    features, zeros, ones, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+
+        zero, one = _binary_children(
+            tree.children_left, tree.children_right,
+            0.0 <= tree.threshold, 1.0 <= tree.threshold, is_leaf, offset
+        )
+        # Classifier trees store normalized class fractions, which is what
+        # the tree's predict_proba returns
+        leaf_value = tree.value[:, 0, :].astype(np.float64)
+
+        features.append(np.where(is_leaf, -1, tree.feature))
+        zeros.append(zero)
+        ones.append(one)
+        values.append(leaf_value)
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "child_zero": np.concatenate(zeros).astype(np.int32),
+        "child_one": np.concatenate(ones).astype(np.int32),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+    return CompiledForest(RF_PROBA, model.n_features_in_, model.n_classes_, max_depth, arrays)
+
+
+def _xgb_base_margin(booster, n_classes):
+    """Starting margin per class from the booster config"""
+    params = json.loads(booster.save_config())["learner"]["learner_model_param"]
+    raw = params["base_score"].strip("[]")
+    base = np.array([float(v) for v in raw.split(",")], dtype=np.float32)
+    if base.size == 1:
+        base = np.repeat(base, n_classes)
+    return base
+
+
+def compile_xgb_model(model):
+    """
+    Flatten a fitted multi:softprob XGBClassifier
+
+    XGBoost sends a sample to "yes" when x < split_condition. Boosting
+    round r holds one tree per class, so tree i adds to class i % n_classes.
+
+    Returns:
+        CompiledForest
+    """
+    booster = model.get_booster()
+    n_classes = int(model.n_classes_)
+    n_features = int(booster.num_features())
+
+    features, zeros, ones, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for dump in booster.get_dump(dump_format="json"):
+        nodes = {}
+        stack = [(json.loads(dump), 0)]
+        while stack:
+            node, depth = stack.pop()
+            nodes[node["nodeid"]] = node
+            max_depth = max(max_depth, depth)
+            for child in node.get("children", []):
+                stack.append((child, depth + 1))
+
+        # Renumber node ids densely in id order
+        order = sorted(nodes)
+        local = {node_id: i for i, node_id in enumerate(order)}
+        n = len(order)
+        feature = np.full(n, -1, dtype=np.int64)
+        left = np.zeros(n, dtype=np.int64)
+        right = np.zeros(n, dtype=np.int64)
+        threshold = np.zeros(n)
+        value = np.zeros(n, dtype=np.float32)
+
+        for node_id in order:
+            node = nodes[node_id]
+            i = local[node_id]
+            if "leaf" in node:
+                value[i] = node["leaf"]
+                continue
+            feature[i] = int(str(node["split"]).lstrip("f"))
+            threshold[i] = node["split_condition"]
+            left[i] = local[node["yes"]]
+            right[i] = local[node["no"]]
+
+        is_leaf = feature < 0
+        zero, one = _binary_children(left, right, 0.0 < threshold, 1.0 < threshold, is_leaf, offset)
+        features.append(feature)
+        zeros.append(zero)
+        ones.append(one)
+        values.append(value)
+        roots.append(offset + local[0])
+        offset += n
+
+    roots = np.array(roots, dtype=np.int32)
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "child_zero": np.concatenate(zeros).astype(np.int32),
+        "child_one": np.concatenate(ones).astype(np.int32),
+        "value": np.concatenate(values),
+        "roots": roots,
+        "tree_class": (np.arange(len(roots)) % n_classes).astype(np.int32),
+        "base_margin": _xgb_base_margin(booster, n_classes),
+    }
+    return CompiledForest(XGB_SOFTMAX, n_features, n_classes, max_depth, arrays)
+
+
+def compile_model(model):
+    """Flatten a fitted RandomForestClassifier or XGBClassifier"""
+    if hasattr(model, "get_booster"):
+        return compile_xgb_model(model)
+    return compile_sklearn_forest(model)
+
+
+def compiled_path_for(model_path):
+    """Where the compiled arrays for a pickled model are stored"""
+    root, _ = os.path.splitext(model_path)
+    return root + ".trees.npz"
+
+
+def export_compiled(model, model_path):
+    """
+    Compile a trained model and save it next to its pickle
+
+    Args:
+        model: Fitted RandomForestClassifier or XGBClassifier
+        model_path: Path of the legacy pickled model (e.g. models/rf_model.pkl)
+
+    Returns:
+        Path of the compiled .npz
+    """
+    path = compiled_path_for(model_path)
+    compile_model(model).save(path)
+    print(f"Compiled tree arrays saved to: {path}")
+    return path
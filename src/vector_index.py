@@ -0,0 +1,148 @@
+"""
+Nearest-neighbour backends for symptom embeddings
+Flat inner-product search for small vocabularies, FAISS IVF/HNSW indexes
+for large synonym tables
+"""
+
+import os
+import numpy as np
+
+DEFAULT_INDEX_DIR = "models/vector_index"
+
+# Above this many rows "auto" switches from flat search to HNSW
+LARGE_VOCABULARY = 20000
+
+
+class FlatIndex:
+    """Exact inner-product search over an (optionally memory-mapped) matrix"""
+
+    kind = "flat"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, k=1):
+        """
+        Top-k rows by inner product
+
+        Args:
+            queries: (n, dim) array of unit-length query vectors
+            k: Number of neighbours per query
+
+        Returns:
+            Tuple of (scores, ids), each (n, k), best first
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        sims = queries @ self.vectors.T
+        k = min(k, sims.shape[1])
+        if k == 1:
+            ids = sims.argmax(axis=1)[:, None]
+        else:
+            ids = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(sims, ids, axis=1), axis=1)
+            ids = np.take_along_axis(ids, order, axis=1)
+        return np.take_along_axis(sims, ids, axis=1), ids
+
+
+class FaissIndex:
+    """Approximate inner-product search backed by a FAISS IVF or HNSW index"""
+
+    def __init__(self, index, kind):
+        self.index = index
+        self.kind = kind
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @classmethod
+    def build(cls, vectors, kind="hnsw", hnsw_m=32, ef_search=64, nprobe=8):
+        """
+        Build an index over unit-length vectors
+
+        Args:
+            vectors: (n, dim) float array
+            kind: "hnsw" or "ivf"
+            hnsw_m: HNSW graph degree
+            ef_search: HNSW search breadth
+            nprobe: IVF lists visited per query
+        """
+        import faiss
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = ef_search
+        elif kind == "ivf":
+            # ~4*sqrt(n) lists, with enough points per list to train on
+            nlist = max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // 39))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = min(nprobe, nlist)
+        else:
+            raise ValueError(f"Unknown FAISS index kind: {kind}")
+
+        index.add(vectors)
+        return cls(index, kind)
+
+    @classmethod
+    def load(cls, path, kind):
+        import faiss
+        return cls(faiss.read_index(path), kind)
+
+    def save(self, path):
+        import faiss
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, path)
+
+    def search(self, queries, k=1):
+        """Same contract as FlatIndex.search; missing neighbours have id -1"""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        return self.index.search(queries, min(k, len(self)))
+
+
+def build_vector_index(vectors, kind="auto", index_dir=DEFAULT_INDEX_DIR, key=None):
+    """
+    Create (or load a persisted) nearest-neighbour index
+
+    Args:
+        vectors: (n, dim) unit-length embeddings
+        kind: "flat", "hnsw", "ivf" or "auto" (flat below LARGE_VOCABULARY rows)
+        index_dir: Where FAISS indexes are persisted (None = do not persist)
+        key: Embedding key of the vectors; part of the persisted file name so
+             a vocabulary change never loads a stale index
+
+    Returns:
+        FlatIndex or FaissIndex
+    """
+    if kind == "auto":
+        kind = "flat" if len(vectors) < LARGE_VOCABULARY else "hnsw"
+
+    if kind == "flat":
+        return FlatIndex(vectors)
+
+    try:
+        import faiss  # noqa: F401
+    except ImportError:
+        print(f"faiss not installed; using flat search instead of {kind}")
+        return FlatIndex(vectors)
+
+    path = None
+    if index_dir and key:
+        path = os.path.join(index_dir, f"{key}.{kind}.faiss")
+        if os.path.exists(path):
+            return FaissIndex.load(path, kind)
+
+    index = FaissIndex.build(vectors, kind)
+    if path:
+        index.save(path)
+    print(f"Built {kind} index over {len(vectors)} embeddings")
+    return index
@@ -1,51 +1,28 @@
-import pickle
-import numpy as np
+import sys
 import os
-from symptom_normalizer import normalize_symptoms
+sys.path.insert(0, os.path.dirname(__file__))
+from prior_predictor import PriorPredictor
 
 
-class XGBPredictor:
+class XGBPredictor(PriorPredictor):
 
-    def __init__(self,model_path="models/xgb_model.pkl"):
-        with open(model_path,"rb") as f:
-            data = pickle.load(f)
+    # soften probabilities slightly
+    softening = 0.8
 
-        self.model = data["model"]
-        self.label_encoder = data["label_encoder"]
-        self.symptom_names = data["symptom_names"]
-        self.symptom_to_idx = {s:i for i,s in enumerate(self.symptom_names)}
+    # sparse zeros would be treated as missing values
+    supports_sparse = False
 
-        print(f"Loaded XGB model with {len(self.symptom_names)} symptoms")
-
-    def predict(self,user_symptoms):
-        normalized = normalize_symptoms(user_symptoms)
-
-        vec = np.zeros(len(self.symptom_names))
-        for s in normalized:
-            if s in self.symptom_to_idx:
-                vec[self.symptom_to_idx[s]] = 1
-
-        if vec.sum()==0:
-            return {}
+    def __init__(self,model_path="models/xgb_model",use_compiled=True,cache_size=1024):
+        super().__init__(model_path,use_compiled,cache_size)
 
-        probs = self.model.predict_proba([vec])[0]
-
-        # soften probabilities slightly
-        probs = probs**0.8
-        probs = probs/probs.sum()
-
-        out = {}
-        for idx,p in enumerate(probs):
-            disease = self.label_encoder.inverse_transform([idx])[0]
-            out[disease] = float(p)
-
-        return dict(sorted(out.items(),key=lambda x:x[1],reverse=True))
+        print(f"Loaded XGB model with {len(self.symptom_names)} symptoms")
 
 
-_predictor=None
+# one instance per model path, kept current by the model registry
+def get_predictor(model_path="models/xgb_model"):
+    from model_registry import get_registry
 
-def get_predictor(model_path="models/xgb_model.pkl"):
-    global _predictor
-    if _predictor is None:
-        _predictor = XGBPredictor(model_path)
-    return _predictor
\ No newline at end of file
+    registry = get_registry()
+    if model_path not in registry.names():
+        registry.register(model_path, model_path, "xgb")
+    return registry.get(model_path)
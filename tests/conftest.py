@@ -0,0 +1,89 @@
+"""
+Shared fixtures: a small copy of the data files, so models train in seconds
+"""
+
+import contextlib
+import os
+import shutil
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# Diseases kept in the test dataset
+N_DISEASES = 8
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory):
+    """data/ directory holding the rows of the first N_DISEASES diseases"""
+    out = tmp_path_factory.mktemp("data")
+    df = pd.read_csv(os.path.join(ROOT, "data", "dataset.csv"))
+    df[df["Disease"].isin(df["Disease"].unique()[:N_DISEASES])].to_csv(
+        out / "dataset.csv", index=False
+    )
+    shutil.copy(os.path.join(ROOT, "data", "Symptom-severity.csv"), out)
+    return out
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """Run a block in path (the code base writes models/ relative to it)"""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def normalizer(data_dir):
+    """Global symptom normalizer over data_dir, lexical only (no model download)"""
+    from symptom_normalizer import get_normalizer
+
+    with working_directory(data_dir):
+        return get_normalizer(str(data_dir / "dataset.csv"), lexical_only=True)
+
+
+@pytest.fixture(scope="session")
+def scorer(data_dir, normalizer):
+    """Rule scorer over data_dir, without its score cache"""
+    from rule_based_scorer import RuleBasedScorer
+
+    with working_directory(data_dir):
+        return RuleBasedScorer(str(data_dir / "dataset.csv"),
+                               str(data_dir / "Symptom-severity.csv"), cache_size=0)
+
+
+@pytest.fixture(scope="session")
+def features(data_dir, normalizer):
+    """(X, y) feature matrix and encoded labels of data_dir"""
+    from feature_builder import build_features
+
+    with working_directory(data_dir):
+        X, y, _, _ = build_features(str(data_dir / "dataset.csv"), cache_dir=None)
+    return X, y
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory, data_dir, normalizer):
+    """RF and XGB artifacts (rf_model, xgb_model) trained on data_dir"""
+    from train_rf_model import train_random_forest
+    from train_xgb_model import train_xgb_model
+
+    out = tmp_path_factory.mktemp("models")
+    with working_directory(out):
+        train_random_forest(str(data_dir / "dataset.csv"), n_estimators=30,
+                            save_path=str(out / "rf_model"))
+        train_xgb_model(str(data_dir / "dataset.csv"), save_path=str(out / "xgb_model"))
+    return out
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch, data_dir):
+    """Empty working directory (trainers write models/ relative to it)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,58 @@
+import itertools
+import random
+import pytest
+from answer_table import build_answer_table
+from ensemble_predictor import EnsemblePredictor
+from model_registry import ModelRegistry
+
+PRIORS = {"rf": 1.0, "xgb": 0.5}
+FILTERS = [(0.1, 2), (0.0, 1), (0.3, 1), (0.05, 3)]
+
+
+@pytest.fixture(scope="module")
+def registry(model_dir):
+    registry = ModelRegistry()
+    for name in PRIORS:
+        registry.register(name, str(model_dir / f"{name}_model"))
+    return registry
+
+
+def ensemble(data_dir, registry, table_dir=None, priors=PRIORS):
+    return EnsemblePredictor(priors, str(data_dir / "dataset.csv"),
+                             str(data_dir / "Symptom-severity.csv"),
+                             answer_table_dir=table_dir and str(table_dir), registry=registry)
+
+
+@pytest.fixture(scope="module")
+def table_dir(tmp_path_factory, data_dir, registry, scorer):
+    out = tmp_path_factory.mktemp("answer_table") / "answer_table"
+    build_answer_table(ensemble(data_dir, registry), str(out))
+    return out
+
+
+def test_lookup_matches_live_predict(data_dir, registry, table_dir):
+    live = ensemble(data_dir, registry)
+    tabled = ensemble(data_dir, registry, table_dir)
+    assert tabled.answer_table is not None
+
+    names = tabled.rule_scorer.symptom_names
+    rng = random.Random(0)
+    symptom_sets = [[s] for s in names] + [list(c) for c in itertools.combinations(names, 2)]
+    symptom_sets += [rng.sample(names, 3) for _ in range(500)]
+    for symptoms in symptom_sets:
+        assert tabled.answer_table.lookup(set(symptoms)) is not None
+        for min_score, min_matches in FILTERS:
+            assert (tabled.predict(symptoms, min_score, min_matches)
+                    == live.predict(symptoms, min_score, min_matches)), symptoms
+
+
+def test_larger_sets_run_live(data_dir, registry, table_dir):
+    tabled = ensemble(data_dir, registry, table_dir)
+    live = ensemble(data_dir, registry)
+    symptoms = tabled.rule_scorer.profiles.disease_profiles[tabled.rule_scorer.disease_names[0]][:4]
+    assert tabled.answer_table.lookup(set(symptoms)) is None
+    assert tabled.predict(symptoms) == live.predict(symptoms)
+
+
+def test_stale_table_is_not_loaded(data_dir, registry, table_dir):
+    assert ensemble(data_dir, registry, table_dir, {"rf": 1.0}).answer_table is None
@@ -0,0 +1,32 @@
+import json
+import os
+import shutil
+from distilled_prior import DistilledPrior, distill_prior
+from model_artifact import MANIFEST_FILE
+
+
+def test_manifest_records_metrics_and_latency(workdir, data_dir, model_dir):
+    # The rule scorer finds the severity weights under data/
+    (workdir / "data").mkdir()
+    shutil.copy(data_dir / "Symptom-severity.csv", workdir / "data")
+    out = str(workdir / "distilled_prior")
+    # Left behind by a crashed run with this pid
+    stale = f"{out}.tmp-{os.getpid()}"
+    os.makedirs(stale)
+    with open(os.path.join(stale, "stale.npy"), "w") as f:
+        f.write("stale")
+
+    metrics = distill_prior(str(model_dir / "rf_model"), out, eval_size=2,
+                            dataset_samples=200, max_iter=50,
+                            dataset_path=str(data_dir / "dataset.csv"))
+
+    with open(os.path.join(out, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    assert manifest["metrics"] == json.loads(json.dumps(metrics))
+    assert manifest["metrics"]["teacher_latency_us"] > 0
+    assert manifest["metrics"]["student_latency_us"] > 0
+    assert sorted(os.listdir(out)) == ["bias.npy", MANIFEST_FILE, "weights.npy"]
+    assert not os.path.exists(stale)
+
+    student = DistilledPrior(out, cache_size=0)
+    assert student.class_names.tolist() == manifest["classes"]
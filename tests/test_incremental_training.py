@@ -0,0 +1,60 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from feature_builder import build_features
+from incremental_training import DRIFT_TOLERANCE, train_incremental
+from model_artifact import ModelArtifact
+from train_rf_model import train_random_forest
+from train_xgb_model import train_xgb_model
+
+TRAINERS = {"rf": train_random_forest, "xgb": train_xgb_model}
+
+
+def _append_rows(dataset_path, disease, n_rows=10):
+    """Append n_rows copies of one existing row of disease"""
+    df = pd.read_csv(dataset_path)
+    rows = df[df["Disease"] == disease].head(1)
+    rows = pd.concat([rows] * n_rows)
+    with open(dataset_path, "a") as f:
+        rows.to_csv(f, header=False, index=False)
+
+
+@pytest.mark.parametrize("kind", sorted(TRAINERS))
+def test_appended_rows_keep_unrelated_priors(kind, workdir, data_dir):
+    dataset_path = workdir / "dataset.csv"
+    dataset_path.write_bytes((data_dir / "dataset.csv").read_bytes())
+    model_path = str(workdir / f"{kind}_model")
+    TRAINERS[kind](str(dataset_path), save_path=model_path)
+
+    X, y, _, label_encoder = build_features(str(dataset_path))
+    before = ModelArtifact(model_path).load_estimator().predict_proba(X)
+    appended = label_encoder.classes_[0]
+    _append_rows(dataset_path, appended)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        training = train_incremental(model_path, str(dataset_path), kind)
+    assert training["mode"] == "incremental"
+
+    after = ModelArtifact(model_path).load_estimator().predict_proba(X)
+    unrelated = y != 0
+    assert np.abs(after[unrelated] - before[unrelated]).max() <= DRIFT_TOLERANCE
+    # The appended disease does not leak into other symptom patterns
+    assert after[unrelated, 0].max() <= before[unrelated, 0].max() + DRIFT_TOLERANCE
+
+
+def test_new_disease_rebuilds(workdir, data_dir):
+    dataset_path = workdir / "dataset.csv"
+    dataset_path.write_bytes((data_dir / "dataset.csv").read_bytes())
+    model_path = str(workdir / "rf_model")
+    train_random_forest(str(dataset_path), save_path=model_path)
+
+    df = pd.read_csv(dataset_path)
+    extra = df.head(5).assign(Disease="Test disease")
+    with open(dataset_path, "a") as f:
+        extra.to_csv(f, header=False, index=False)
+
+    training = train_incremental(model_path, str(dataset_path), "rf")
+    assert training["mode"] == "full"
+    assert "Test disease" in ModelArtifact(model_path).class_names
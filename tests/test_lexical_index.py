@@ -0,0 +1,93 @@
+import random
+import pytest
+from lexical_index import EXACT_SCORE, TOKEN_SET_SCORE, LexicalIndex, edit_distance
+from symptom_normalizer import SymptomNormalizer
+
+
+@pytest.fixture
+def lexical_normalizer(workdir, data_dir):
+    return SymptomNormalizer(str(data_dir / "dataset.csv"),
+                             embedding_cache_dir=None, lexical_only=True)
+
+
+@pytest.fixture
+def canonical_symptoms(lexical_normalizer):
+    return lexical_normalizer.canonical_symptoms
+
+
+def _brute_force(index, text):
+    """Closest alias over the whole vocabulary, None on a tie between symptoms"""
+    allowed = index._allowed_edits(text)
+    best_distance, best_keys = allowed + 1, set()
+    for alias, key in index.exact.items():
+        distance = edit_distance(text, alias, allowed)
+        if distance < best_distance:
+            best_distance, best_keys = distance, {key}
+        elif distance == best_distance:
+            best_keys.add(key)
+    if best_distance > allowed or len(best_keys) != 1:
+        return None
+    return best_keys.pop()
+
+
+def _typo(word, rng):
+    """One random substitution, insertion, deletion or adjacent swap"""
+    i = rng.randrange(len(word) - 1)
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return rng.choice([
+        word[:i] + letter + word[i + 1:],
+        word[:i] + letter + word[i:],
+        word[:i] + word[i + 1:],
+        word[:i] + word[i + 1] + word[i] + word[i + 2:],
+    ])
+
+
+def test_exact_and_token_set(canonical_symptoms):
+    index = LexicalIndex(canonical_symptoms)
+    assert index.lookup("skin rash") == ("SKIN_RASH", EXACT_SCORE)
+    assert index.lookup("  skin   rash ") == ("SKIN_RASH", EXACT_SCORE)
+    assert index.lookup("rash on my skin") == ("SKIN_RASH", TOKEN_SET_SCORE)
+
+
+def test_typos(canonical_symptoms):
+    index = LexicalIndex(canonical_symptoms)
+    assert index.lookup("itchign") == ("ITCHING", round(1 - 1 / 7, 3))
+    assert index.lookup("skin rsah")[0] == "SKIN_RASH"
+    # Too short for typo matching
+    assert index.lookup("ich") == (None, None)
+
+
+def test_typos_match_brute_force(canonical_symptoms):
+    index = LexicalIndex(canonical_symptoms)
+    rng = random.Random(0)
+    aliases = sorted(a for a in index.exact if len(a) >= index.min_typo_length)
+    for _ in range(500):
+        text = _typo(rng.choice(aliases), rng)
+        if text in index.exact or text in index.token_sets:
+            continue
+        assert index.lookup(text)[0] == _brute_force(index, text), text
+
+
+def test_ties_are_unresolved():
+    index = LexicalIndex({"COLD": [], "BOLD": []})
+    assert index.lookup("cold") == ("COLD", EXACT_SCORE)
+    assert index.lookup("gold") == (None, None)
+    assert index.lookup("colds") == ("COLD", 0.8)
+
+
+def test_shared_alias_is_unresolved():
+    index = LexicalIndex({"CHEST_PAIN": ["pain"], "JOINT_PAIN": ["pain"]})
+    assert index.lookup("pain") == (None, None)
+    assert index.lookup("chest pain") == ("CHEST_PAIN", EXACT_SCORE)
+
+
+def test_threshold_applies_to_scored_lexical_matches(lexical_normalizer):
+    typo = round(1 - 1 / 7, 3)
+    assert lexical_normalizer.normalize_symptom("itchign") == ("ITCHING", typo)
+    assert lexical_normalizer.normalize_symptom("itchign", threshold=0.95) == (None, None)
+    assert lexical_normalizer.normalize_symptom("rash on my skin", threshold=0.99) == (None, None)
+    # Exact aliases pass any threshold
+    assert lexical_normalizer.normalize_symptom("skin rash", threshold=0.99) == ("SKIN_RASH", 1.0)
+    assert lexical_normalizer.normalize_batch(["itchign", "skin rash"], threshold=0.95) == [
+        (None, None), ("SKIN_RASH", 1.0)
+    ]
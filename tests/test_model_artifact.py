@@ -0,0 +1,122 @@
+import json
+import os
+import numpy as np
+import pytest
+from sklearn.preprocessing import LabelEncoder
+from model_artifact import MANIFEST_FILE, ModelArtifact, resolve_model_path, save_model
+from rf_predictor import RFPredictor
+from tree_engine import compile_model, compiled_path_for
+from xgb_predictor import XGBPredictor
+
+PREDICTORS = {"rf": RFPredictor, "xgb": XGBPredictor}
+
+
+@pytest.fixture(params=sorted(PREDICTORS))
+def trained(request, model_dir):
+    """(kind, fitted estimator, label encoder, symptom names) of a saved prior"""
+    artifact = ModelArtifact(str(model_dir / f"{request.param}_model"))
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.asarray(artifact.class_names)
+    return request.param, artifact.load_estimator(), label_encoder, artifact.symptom_names
+
+
+def rows(n_features, n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n_rows, n_features)) < 0.05).astype(np.float32)
+
+
+def symptom_sets(symptom_names):
+    return [symptom_names[i:i + 3] for i in range(0, len(symptom_names), 2)]
+
+
+def test_artifact_round_trip(trained, data_dir, tmp_path):
+    kind, model, label_encoder, symptom_names = trained
+    out = str(tmp_path / f"{kind}_model")
+    save_model(model, label_encoder, symptom_names, out, str(data_dir / "dataset.csv"))
+    assert sorted(os.listdir(tmp_path)) == [f"{kind}_model"]
+
+    artifact = ModelArtifact(out)
+    assert artifact.kind == kind
+    assert artifact.symptom_names == list(symptom_names)
+    assert artifact.class_names.tolist() == label_encoder.classes_.tolist()
+    assert artifact.manifest["dataset_revision"]["rows"] > 0
+
+    # Compiled arrays are memory-mapped and equal to a fresh compile
+    for name, array in compile_model(model).arrays().items():
+        loaded = getattr(artifact.compiled, name)
+        assert isinstance(loaded, np.memmap)
+        assert np.array_equal(loaded, array)
+
+    X = rows(len(symptom_names))
+    assert np.array_equal(artifact.load_estimator().predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(artifact.compiled.predict_proba(X), compile_model(model).predict_proba(X))
+
+
+def test_legacy_pickle_fallback(trained, tmp_path, model_dir):
+    kind, model, label_encoder, symptom_names = trained
+    pkl = str(tmp_path / f"{kind}_model.pkl")
+    save_model(model, label_encoder, symptom_names, pkl)
+    assert os.path.exists(compiled_path_for(pkl))
+
+    # A directory path with no artifact falls back to <path>.pkl
+    assert resolve_model_path(str(tmp_path / f"{kind}_model")) == (pkl, False)
+    legacy = PREDICTORS[kind](str(tmp_path / f"{kind}_model"))
+    current = PREDICTORS[kind](str(model_dir / f"{kind}_model"))
+    assert legacy.artifact is None and legacy.label_encoder is not None
+    assert legacy.class_names.tolist() == current.class_names.tolist()
+    for symptoms in symptom_sets(symptom_names):
+        assert legacy.predict(symptoms) == current.predict(symptoms)
+
+    # Missing compiled arrays are rebuilt from the estimator
+    os.remove(compiled_path_for(pkl))
+    rebuilt = PREDICTORS[kind](pkl)
+    for symptoms in symptom_sets(symptom_names):
+        assert rebuilt.predict(symptoms) == current.predict(symptoms)
+
+
+def test_library_predict_proba_matches_compiled(trained, model_dir):
+    kind, _, _, symptom_names = trained
+    compiled = PREDICTORS[kind](str(model_dir / f"{kind}_model"))
+    library = PREDICTORS[kind](str(model_dir / f"{kind}_model"), use_compiled=False)
+    for symptoms in symptom_sets(symptom_names):
+        assert np.allclose(compiled.predict_proba(symptoms), library.predict_proba(symptoms),
+                           rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("field,value", [("schema_version", 0), ("engine", {"version": 0})])
+def test_unsupported_versions_are_rejected(model_dir, tmp_path, field, value):
+    out = tmp_path / "rf_model"
+    artifact = ModelArtifact(str(model_dir / "rf_model"))
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.asarray(artifact.class_names)
+    save_model(artifact.load_estimator(), label_encoder, artifact.symptom_names, str(out))
+
+    manifest = json.loads((out / MANIFEST_FILE).read_text())
+    manifest[field] = value
+    (out / MANIFEST_FILE).write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        ModelArtifact(str(out))
+
+
+def test_estimator_from_a_replaced_artifact_is_rejected(model_dir, features, tmp_path):
+    from train_rf_model import build_classifier
+
+    X, y = features
+    out = str(tmp_path / "rf_model")
+    artifact = ModelArtifact(str(model_dir / "rf_model"))
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.asarray(artifact.class_names)
+    save_model(artifact.load_estimator(), label_encoder, artifact.symptom_names, out)
+
+    loaded = ModelArtifact(out)
+    library = RFPredictor(out, use_compiled=False)
+    save_model(build_classifier(n_estimators=5).fit(X, y), label_encoder,
+               artifact.symptom_names, out)
+
+    with pytest.raises(ValueError):
+        loaded.load_estimator()
+    # Loaded with the manifest, so it still serves the model it was built on
+    original = RFPredictor(str(model_dir / "rf_model"), use_compiled=False)
+    symptoms = artifact.symptom_names[:2]
+    assert library.predict(symptoms) == original.predict(symptoms)
+    assert ModelArtifact(out).load_estimator().n_estimators == 5
@@ -0,0 +1,53 @@
+import random
+import numpy as np
+import pytest
+from rf_predictor import RFPredictor
+from xgb_predictor import XGBPredictor
+
+PREDICTORS = {"rf": RFPredictor, "xgb": XGBPredictor}
+
+
+@pytest.fixture(params=sorted(PREDICTORS))
+def predictor(request, model_dir):
+    return PREDICTORS[request.param](str(model_dir / f"{request.param}_model"))
+
+
+def full_sort(predictor, user_symptoms):
+    """Every (disease, probability), sorted as predict() did before top-k selection"""
+    probs = predictor.predict_proba(user_symptoms)
+    if probs is None:
+        return []
+    return sorted(zip(predictor.class_names.tolist(), probs.tolist()),
+                  key=lambda x: x[1], reverse=True)
+
+
+def symptom_sets(predictor, n_sets=100, seed=0):
+    rng = random.Random(seed)
+    return [rng.sample(predictor.symptom_names, rng.randint(1, 5)) for _ in range(n_sets)]
+
+
+def test_predict_matches_full_sort(predictor):
+    for symptoms in symptom_sets(predictor):
+        expected = full_sort(predictor, symptoms)
+        assert list(predictor.predict(symptoms).items()) == expected
+        for k in (1, 3, 5, len(expected) + 1):
+            assert predictor.predict_top_k(symptoms, k) == expected[:k]
+
+
+def test_ties_break_in_class_order(predictor):
+    n = len(predictor.class_names)
+    probs = np.zeros(n)
+    probs[[1, 3, n - 1]] = 0.3
+    probs[0] = 0.1
+    predictor.predict_proba = lambda user_symptoms: probs
+    for k in range(n + 1):
+        indices, values = predictor.predict_arrays(["any"], k)
+        expected = np.argsort(-probs, kind="stable")[:k]
+        assert np.array_equal(indices, expected)
+        assert np.array_equal(values, probs[expected])
+
+
+def test_unknown_symptoms(predictor):
+    indices, probs = predictor.predict_arrays(["not a symptom"], 3)
+    assert len(indices) == len(probs) == 0
+    assert predictor.predict(["not a symptom"]) == {}
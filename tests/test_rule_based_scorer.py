@@ -0,0 +1,113 @@
+import random
+import numpy as np
+import pytest
+
+
+def loop_score(profiles, disease, symptoms):
+    """Per-disease loop the compiled matrices replaced"""
+    total_weight = matched_weight = 0
+    matched = []
+    for s in profiles.disease_profiles[disease]:
+        w = profiles.symptom_weight(s)
+        total_weight += w
+        if s in symptoms:
+            matched_weight += w
+            matched.append(s)
+    if total_weight == 0:
+        return 0, 0
+    size = len(profiles.disease_profiles[disease])
+    return matched_weight / total_weight * (1 - 0.3 * (size - len(matched)) / size), len(matched)
+
+
+def loop_rank(profiles, symptoms, min_score, min_matches):
+    """(disease, score) pairs rank_diseases() returned before vectorization"""
+    results = []
+    for disease in profiles.disease_profiles:
+        score, n_matched = loop_score(profiles, disease, symptoms)
+        if score >= min_score and n_matched >= min_matches:
+            results.append((disease, round(score, 3)))
+    return sorted(results, key=lambda x: x[1], reverse=True)
+
+
+def symptom_sets(profiles, n_sets=200, seed=0):
+    rng = random.Random(seed)
+    return [set(rng.sample(profiles.symptom_names, rng.randint(1, 6))) for _ in range(n_sets)]
+
+
+def test_score_all_matches_loop(scorer):
+    profiles = scorer.profiles
+    for symptoms in symptom_sets(profiles):
+        scores = scorer.score_all_diseases(sorted(symptoms))
+        assert list(scores) == profiles.disease_names
+        for disease, entry in scores.items():
+            expected, _ = loop_score(profiles, disease, symptoms)
+            assert entry["score"] == pytest.approx(expected, abs=1e-12)
+            assert set(entry["matched"]) == symptoms & set(profiles.disease_profiles[disease])
+
+
+def test_rank_matches_loop(scorer):
+    profiles = scorer.profiles
+    for symptoms in symptom_sets(profiles):
+        ranked = [(r["disease"], r["score"]) for r in scorer.rank_diseases(sorted(symptoms))]
+        assert sorted(ranked) == sorted(loop_rank(profiles, symptoms, 0.1, 2))
+        assert [s for _, s in ranked] == sorted((s for _, s in ranked), reverse=True)
+
+
+def test_score_vector_matches_score_disease(scorer):
+    profiles = scorer.profiles
+    for symptoms in symptom_sets(profiles, 50):
+        scores, counts = profiles.score_vector(symptoms)
+        for d, disease in enumerate(profiles.disease_names):
+            expected, n_matched = loop_score(profiles, disease, symptoms)
+            assert scores[d] == pytest.approx(expected, abs=1e-12)
+            assert counts[d] == n_matched
+            assert profiles.score_disease(disease, symptoms)[0] == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize("min_score,min_matches", [(0.0, 1), (0.1, 2), (0.3, 1), (0.5, 3)])
+def test_candidate_scores_match_full_recompute(scorer, min_score, min_matches):
+    profiles = scorer.profiles
+    for symptoms in symptom_sets(profiles):
+        diseases, scores, counts = profiles.candidate_scores(symptoms, min_score, min_matches)
+        all_scores, all_counts = profiles.score_vector(symptoms)
+        expected = np.flatnonzero((all_scores >= min_score) & (all_counts >= min_matches))
+        order = np.argsort(diseases)
+        assert np.array_equal(diseases[order], expected)
+        assert np.allclose(scores[order], all_scores[expected], rtol=0, atol=1e-12)
+        assert np.array_equal(counts[order], all_counts[expected])
+
+
+def test_scoring_state_matches_full_recompute(scorer):
+    profiles = scorer.profiles
+    rng = random.Random(1)
+    state = scorer.new_state()
+    symptoms = set()
+    for _ in range(300):
+        symptom = rng.choice(profiles.symptom_names)
+        if symptom in symptoms and rng.random() < 0.5:
+            assert state.remove(symptom)
+            symptoms.discard(symptom)
+        else:
+            assert state.add(symptom) == (symptom not in symptoms)
+            symptoms.add(symptom)
+
+        scores, counts = profiles.score_vector(symptoms)
+        assert np.allclose(state.scores, scores, rtol=0, atol=1e-12)
+        assert np.array_equal(state.match_counts, counts)
+        details, expected = state.score_all(), profiles.score_all(symptoms)
+        assert list(details) == list(expected)
+        for disease, entry in details.items():
+            assert entry["score"] == pytest.approx(expected[disease]["score"], abs=1e-12)
+            assert entry["matched"] == expected[disease]["matched"]
+        assert state.rank() == profiles.rank(symptoms)
+
+
+def test_scoring_state_keeps_its_profiles(scorer):
+    profiles = scorer.profiles
+    state = scorer.new_state(profiles.disease_profiles[profiles.disease_names[0]][:2])
+    try:
+        scorer.compile_profiles(severity_map={})
+        assert state.profiles is profiles
+        assert state.rank() == profiles.rank(state.symptoms)
+    finally:
+        scorer.profiles = profiles
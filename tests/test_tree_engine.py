@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from model_artifact import ModelArtifact
+from train_rf_model import build_classifier
+from tree_engine import CompiledForest, compile_model
+
+
+def random_rows(n_features, n_rows=300, seed=0):
+    """Random 0-6 symptom rows"""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    for row in X:
+        row[rng.choice(n_features, rng.integers(0, 7), replace=False)] = 1
+    return X
+
+
+def inputs(X):
+    return np.vstack([np.unique(X, axis=0), random_rows(X.shape[1])])
+
+
+@pytest.mark.parametrize("params", [{}, {"max_depth": 3}, {"class_weight": None}])
+def test_rf_matches_predict_proba(features, params):
+    X, y = features
+    # One job: with several, the library adds the trees in thread order
+    model = build_classifier(n_jobs=1, n_estimators=40, **params).fit(X, y)
+    rows = inputs(X)
+    compiled = compile_model(model)
+    assert np.array_equal(compiled.predict_proba(rows), model.predict_proba(rows))
+    assert np.array_equal(compiled.predict_proba(rows[0]), model.predict_proba(rows[:1]))
+
+
+def test_xgb_matches_predict_proba(features, model_dir):
+    X, _ = features
+    model = ModelArtifact(str(model_dir / "xgb_model")).load_estimator()
+    rows = inputs(X)
+    compiled = compile_model(model).predict_proba(rows)
+    assert np.abs(compiled - model.predict_proba(rows)).max() <= 1e-6
+
+
+@pytest.mark.parametrize("kind", ["rf", "xgb"])
+def test_saved_arrays_round_trip(features, model_dir, tmp_path, kind):
+    X, _ = features
+    model = ModelArtifact(str(model_dir / f"{kind}_model")).load_estimator()
+    compiled = compile_model(model)
+    compiled.save(str(tmp_path / "trees.npz"))
+    loaded = CompiledForest.load(str(tmp_path / "trees.npz"))
+    rows = inputs(X)
+    assert np.array_equal(loaded.predict_proba(rows), compiled.predict_proba(rows))
+    # A single 1-D row is accepted
+    assert np.array_equal(loaded.predict_proba(rows[0]), compiled.predict_proba(rows[:1]))